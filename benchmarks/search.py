@@ -0,0 +1,537 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------------------------------------
+## Search benchmark for ggd search
+##
+## Generates synthetic channeldata.json catalogs with realistic package names, keywords, and identifiers, runs a
+##  fixed set of queries through filter_by_identifiers, search_packages, and print_summary, and reports the p50
+##  and p99 latency and the peak memory for each catalog size. The top results of every query are checked
+##  against the reference search (the ggd search before the catalog index and batch scoring), and the
+##  benchmark exits with an error if any of them differ. No network is used.
+##
+## Usage:
+##   python benchmarks/search.py                       ## 1k, 10k, and 100k package catalogs
+##   python benchmarks/search.py --sizes 1000 --runs 5 ## A quick run
+##   python benchmarks/search.py --skip-reference      ## Only measure, do not check the results
+# -------------------------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import contextlib
+import copy
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+# -------------------------------------------------------------------------------------------------------------
+## Global Variables
+# -------------------------------------------------------------------------------------------------------------
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+## The match score cutoff and number of results of 'ggd search' (See search.add_search)
+MATCH_SCORE = 90
+TOP_N = 5
+
+## The benchmarked queries: (name, search terms, search type, species, genome builds)
+QUERIES = [
+    ("reference-genome", ["reference", "genome"], "both", [], []),
+    ("build-gaps", ["gaps"], "both", [], ["hg38"]),
+    ("species-cpg", ["cpg", "islands"], "both", ["Homo_sapiens"], []),
+    ("gene-annotation", ["gene", "annotation"], "non-combined-only", [], ["GRCh38"]),
+    ("misspelled", ["refrence", "genom"], "both", [], []),
+    ("package-name", ["hg19-gaps-ucsc-v1"], "combined-only", [], []),
+    ("provider", ["gencode"], "both", ["Mus_musculus"], []),
+    ("no-match", ["zzqxvj"], "both", [], []),
+]
+
+## The species and genome builds of the synthetic packages
+SPECIES_BUILDS = {
+    "Homo_sapiens": ["hg19", "hg38", "GRCh37", "GRCh38"],
+    "Mus_musculus": ["mm10", "mm39", "GRCm38"],
+    "Drosophila_melanogaster": ["dm6", "BDGP6"],
+    "Danio_rerio": ["danRer11", "GRCz11"],
+    "Canis_familiaris": ["canFam3"],
+}
+
+## The data topics of the synthetic packages: (name part, keywords, file types)
+TOPICS = [
+    ("gaps", ["gaps", "assembly-gaps", "region"], ["bed"]),
+    ("cpg-islands", ["cpg", "cpg-islands", "region"], ["bed"]),
+    ("rmsk", ["repeat-masker", "repeats", "rmsk"], ["bed"]),
+    ("simple-repeats", ["simple_repeats", "tandem-repeats", "repeats"], ["bed"]),
+    ("segmental-dups", ["segmental-duplications", "duplications"], ["bed"]),
+    ("self-chain", ["self-chain", "alignment"], ["bed"]),
+    ("cytoband", ["cytoband", "ideogram", "karyotype"], ["bed"]),
+    ("reference-genome", ["reference", "genome", "fasta", "ref"], ["fa", "fai"]),
+    ("genes", ["genes", "gene-annotation", "gtf"], ["gtf"]),
+    ("transcripts", ["transcripts", "gene-annotation"], ["gtf", "bed"]),
+    ("exons", ["exons", "coding", "gene-annotation"], ["bed"]),
+    ("dbsnp", ["dbsnp", "snp", "variants"], ["vcf"]),
+    ("clinvar", ["clinvar", "clinical", "variants"], ["vcf"]),
+    ("gnomad-exomes", ["gnomad", "exomes", "allele-frequency"], ["vcf"]),
+    ("phylop", ["conservation", "phylop", "scores"], ["bigwig"]),
+    ("phastcons", ["conservation", "phastcons", "scores"], ["bigwig"]),
+    ("blacklist", ["blacklist", "problematic-regions"], ["bed"]),
+    ("chrom-sizes", ["chrom-sizes", "genome-file", "chromosome"], ["genome"]),
+    ("bwa-index", ["bwa", "aligner-index", "reference"], ["amb", "ann", "bwt"]),
+    ("mappability", ["mappability", "umap", "scores"], ["bigwig"]),
+]
+
+## The data providers of the synthetic packages, and the qualifiers used to make more packages per topic
+PROVIDERS = [
+    "ucsc",
+    "ensembl",
+    "gencode",
+    "ncbi",
+    "1000g",
+    "gnomad",
+    "encode",
+    "refseq",
+]
+QUALIFIERS = (
+    [""]
+    + ["chr{}".format(i) for i in range(1, 23)]
+    + ["k562", "hela", "hepg2", "gm12878", "liver", "brain", "heart", "lung"]
+    + ["primary", "alt", "decoy", "masked", "soft-masked", "filtered", "lifted"]
+)
+
+
+# -------------------------------------------------------------------------------------------------------------
+## Functions/Methods
+# -------------------------------------------------------------------------------------------------------------
+
+
+def synthetic_channeldata(size, seed=42):
+    """Method to create a synthetic channeldata dictionary
+
+    synthetic_channeldata
+    =====================
+    This method is used to create a channeldata.json dictionary with a number of packages named like ggd
+     packages (<build>-<topic>[-<qualifier>]-<provider>-v<version>) with the keywords, identifiers, and tags
+     of their topic. The same size and seed always give the same packages in the same order.
+
+    Parameters:
+    -----------
+    1) size: (int) The number of packages
+    2) seed: (int) The random seed. (Default = 42)
+
+    Returns:
+    ++++++++
+    1) (dict) The channeldata dictionary
+    """
+
+    rng = random.Random(seed)
+    builds = [
+        (species, build)
+        for species in sorted(SPECIES_BUILDS)
+        for build in SPECIES_BUILDS[species]
+    ]
+
+    packages = {}
+    while len(packages) < size:
+        species, build = rng.choice(builds)
+        topic, keywords, file_types = rng.choice(TOPICS)
+        provider = rng.choice(PROVIDERS)
+        qualifier = rng.choice(QUALIFIERS) if rng.random() < 0.7 else ""
+        version = rng.randint(1, 3)
+        name = "-".join(
+            x
+            for x in [build.lower(), topic, qualifier, provider, "v{}".format(version)]
+            if x
+        )
+        if name in packages:
+            continue
+
+        final_files = ["{}.{}".format(name, file_type) for file_type in file_types]
+        packages[name] = {
+            "version": str(version),
+            "summary": " ".join(
+                x
+                for x in [topic.replace("-", " ").capitalize(), qualifier]
+                + ["from", provider.upper(), "for", build]
+                if x
+            ),
+            "keywords": keywords + [provider] + ([qualifier] if qualifier else []),
+            "identifiers": {"species": species, "genome-build": build},
+            "tags": {
+                "ggd-channel": "genomics",
+                "data-provider": provider.upper(),
+                "data-version": "release-{}".format(rng.randint(1, 110)),
+                "file-type": file_types,
+                "genomic-coordinate-base": rng.choice(
+                    ["0-based-inclusive", "1-based-inclusive"]
+                ),
+                "final-files": final_files,
+                "final-file-sizes": dict(
+                    (x, "{}M".format(rng.randint(1, 900))) for x in final_files
+                ),
+            },
+        }
+
+    return {"channeldata_version": 1, "packages": packages}
+
+
+def reference_filter(iden_keys, json_dict, filter_terms):
+    """
+    The filter_by_identifiers of ggd search before the field index, used as the reference for the results
+    """
+
+    keys_to_keep = set()
+    for key in json_dict["packages"]:
+        identifiers = json_dict["packages"][key]["identifiers"]
+        for i, iden_key in enumerate(iden_keys):
+            if iden_key in identifiers and filter_terms[i]:
+                if filter_terms[i] in identifiers[iden_key]:
+                    keys_to_keep.add(key)
+
+    new_json_dict = copy.deepcopy(json_dict)
+    if keys_to_keep:
+        for key in json_dict["packages"]:
+            if key not in keys_to_keep:
+                del new_json_dict["packages"][key]
+
+    return new_json_dict
+
+
+def reference_search(json_dict, search_terms, search_type, score_cutoff):
+    """
+    The search_packages of ggd search before the catalog index and batch scoring, used as the reference for the
+     results. Every package is scored one at a time with fuzzywuzzy.
+    """
+    from fuzzywuzzy import fuzz
+
+    pkg_score = defaultdict(lambda: defaultdict(float))
+
+    final_search_terms = []
+    if search_type == "both":
+        final_search_terms.append(" ".join(search_terms))
+        final_search_terms.extend(search_terms)
+    if search_type == "combined-only":
+        final_search_terms.append(" ".join(search_terms))
+    if search_type == "non-combined-only":
+        final_search_terms = search_terms
+
+    for term in final_search_terms:
+        for pkg in json_dict["packages"].keys():
+            score = fuzz.partial_ratio(term.lower(), pkg.lower())
+            keyword_max_score = max(
+                [
+                    fuzz.ratio(term.lower(), x.lower())
+                    for x in [
+                        subkeyword
+                        for keyword in json_dict["packages"][pkg]["keywords"]
+                        for subkeyword in re.split("-|_", keyword.strip())
+                    ]
+                    + json_dict["packages"][pkg]["keywords"]
+                ]
+            )
+            if score < score_cutoff and keyword_max_score < score_cutoff:
+                continue
+            if float(pkg_score[pkg]["pkg_score"]) < float(score):
+                pkg_score[pkg]["pkg_score"] = float(score)
+            if float(pkg_score[pkg]["keyword_score"]) < float(keyword_max_score):
+                pkg_score[pkg]["keyword_score"] = float(keyword_max_score)
+
+    return [
+        pkg
+        for pkg, score in sorted(
+            [
+                [pkg, float(max_scores["pkg_score"])]
+                for pkg, max_scores in pkg_score.items()
+                if float(max_scores["pkg_score"]) >= float(score_cutoff)
+                or float(max_scores["keyword_score"]) >= float(score_cutoff)
+            ],
+            key=lambda x: x[1],
+            reverse=True,
+        )
+    ]
+
+
+def identifier_filters(species, builds):
+    """
+    Method to get the filter_by_identifiers arguments for a query
+    """
+
+    return (
+        ["species"] * len(species) + ["genome-build"] * len(builds),
+        species + builds,
+    )
+
+
+def run_query(search, json_dict, index, query, top_n):
+    """Method to run a query the way 'ggd search' does and time each step
+
+    run_query
+    =========
+    This method is used to filter the packages by the query species and genome builds (filter_by_identifiers),
+     rank the top matches (search_packages), and print them (print_summary, to /dev/null).
+
+    Parameters:
+    -----------
+    1) search:    (module)  The ggd.search module
+    2) json_dict: (dict)    The channeldata dictionary
+    3) index:     (Catalog) The catalog built from the channeldata
+    4) query:     (tuple)   A query from QUERIES
+    5) top_n:     (int)     The number of results
+
+    Returns:
+    ++++++++
+    1) (list) The top results
+    2) (dict) key = step, value = the wall time of the step in milliseconds
+    """
+
+    name, terms, search_type, species, builds = query
+    iden_keys, filter_terms = identifier_filters(species, builds)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        if iden_keys:
+            json_dict = search.filter_by_identifiers(
+                iden_keys, json_dict, filter_terms, index.field_index()
+            )
+        filtered = time.perf_counter()
+        matches = search.search_packages(
+            json_dict, terms, search_type, MATCH_SCORE, index, top_n
+        )
+        searched = time.perf_counter()
+        search.print_summary(terms, json_dict, matches, set(), {})
+        printed = time.perf_counter()
+
+    return (
+        matches,
+        {
+            "filter": (filtered - start) * 1000.0,
+            "search": (searched - filtered) * 1000.0,
+            "print": (printed - searched) * 1000.0,
+            "total": (printed - start) * 1000.0,
+        },
+    )
+
+
+def percentile(values, pct):
+    """
+    Method to get a percentile of a list of values (nearest rank)
+    """
+
+    values = sorted(values)
+    rank = max(int(round(pct / 100.0 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def benchmark_size(size, runs, top_n, check_reference, work_dir):
+    """Method to benchmark the queries against a synthetic catalog
+
+    benchmark_size
+    ==============
+    This method is used to write a synthetic channeldata.json file and build its catalog, time each query
+     (after a warm-up run), measure the peak python memory of loading the channeldata and running every query
+     once, and check the top results against the reference search.
+
+    Parameters:
+    -----------
+    1) size:            (int)  The number of packages
+    2) runs:            (int)  The number of timed runs of each query
+    3) top_n:           (int)  The number of results of each query
+    4) check_reference: (bool) Whether or not to check the results against the reference search
+    5) work_dir:        (str)  The dir to write the channeldata.json file and catalog to
+
+    Returns:
+    ++++++++
+    1) (dict) The results for the catalog size
+    """
+    from ggd import catalog, search
+
+    channel_dir = os.path.join(work_dir, "channeldata", "genomics-{}".format(size))
+    os.makedirs(channel_dir)
+    channeldata_path = os.path.join(channel_dir, "channeldata.json")
+    with open(channeldata_path, "w") as f:
+        json.dump(synthetic_channeldata(size), f)
+
+    start = time.perf_counter()
+    catalog.build_catalog(channeldata_path)
+    build_ms = (time.perf_counter() - start) * 1000.0
+
+    ## Peak memory of a search process: load the channeldata and run each query once
+    tracemalloc.start()
+    with open(channeldata_path) as f:
+        json_dict = json.load(f)
+    index = catalog.Catalog(catalog.catalog_path(channeldata_path))
+    for query in QUERIES:
+        run_query(search, json_dict, index, query, top_n)
+    peak_mb = tracemalloc.get_traced_memory()[1] / float(1024 * 1024)
+    tracemalloc.stop()
+
+    ## Timed runs
+    times = defaultdict(list)
+    queries = {}
+    for query in QUERIES:
+        matches, _ = run_query(search, json_dict, index, query, top_n)
+        query_times = []
+        for _ in range(runs):
+            _, step_times = run_query(search, json_dict, index, query, top_n)
+            for step, ms in step_times.items():
+                times[step].append(ms)
+            query_times.append(step_times["total"])
+        queries[query[0]] = {
+            "top": matches,
+            "p50_ms": round(percentile(query_times, 50), 3),
+            "p99_ms": round(percentile(query_times, 99), 3),
+        }
+
+        ## Results of the reference search
+        if check_reference:
+            iden_keys, filter_terms = identifier_filters(query[3], query[4])
+            start = time.perf_counter()
+            reference_dict = (
+                reference_filter(iden_keys, json_dict, filter_terms)
+                if iden_keys
+                else json_dict
+            )
+            reference = reference_search(
+                reference_dict, query[1], query[2], MATCH_SCORE
+            )[:top_n]
+            queries[query[0]].update(
+                {
+                    "reference_ms": round((time.perf_counter() - start) * 1000.0, 3),
+                    "reference_top": reference,
+                    "stable": reference == matches,
+                }
+            )
+
+    index.close()
+
+    return {
+        "packages": size,
+        "catalog_build_ms": round(build_ms, 2),
+        "peak_memory_mb": round(peak_mb, 2),
+        "steps": dict(
+            (
+                step,
+                {
+                    "p50_ms": round(percentile(values, 50), 3),
+                    "p99_ms": round(percentile(values, 99), 3),
+                },
+            )
+            for step, values in times.items()
+        ),
+        "queries": queries,
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark ggd search with synthetic catalogs and check the results against the reference search"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="The number of packages of each synthetic catalog. (Default = 1000 10000 100000)",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=10,
+        help="The number of timed runs per query. (Default = 10)",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=TOP_N,
+        help="The number of results per query that must match the reference search. (Default = 5)",
+    )
+    parser.add_argument(
+        "--skip-reference",
+        action="store_true",
+        help="Do not run the reference search. (The reference search is slow for large catalogs)",
+    )
+    parser.add_argument(
+        "--output",
+        default="search_results.json",
+        help="The file to write the results to. (Default = search_results.json)",
+    )
+    args = parser.parse_args(args)
+
+    ## Use an empty GGD_LOCAL and no network
+    work_dir = tempfile.mkdtemp(prefix="ggd-search-bench-")
+    os.environ["GGD_LOCAL"] = work_dir
+    os.environ["GGD_OFFLINE"] = "1"
+    sys.path.insert(0, REPO_DIR)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "top": args.top,
+        "sizes": {},
+    }
+    try:
+        for size in args.sizes:
+            result = benchmark_size(
+                size, args.runs, args.top, not args.skip_reference, work_dir
+            )
+            results["sizes"][str(size)] = result
+            stable = [x.get("stable") for x in result["queries"].values()]
+            print(
+                "{:>7} packages   p50 {:>8.2f} ms   p99 {:>8.2f} ms   peak memory {:>7.1f} MB   catalog {:>8.1f} ms   stable: {}".format(
+                    size,
+                    result["steps"]["total"]["p50_ms"],
+                    result["steps"]["total"]["p99_ms"],
+                    result["peak_memory_mb"],
+                    result["catalog_build_ms"],
+                    "{}/{}".format(stable.count(True), len(stable))
+                    if not args.skip_reference
+                    else "not checked",
+                )
+            )
+            print(
+                "          "
+                + "   ".join(
+                    "{} p50 {:.2f} ms".format(step, result["steps"][step]["p50_ms"])
+                    for step in ["filter", "search", "print"]
+                )
+            )
+    finally:
+        shutil.rmtree(work_dir)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print("\nResults written to: {}".format(args.output))
+
+    unstable = [
+        "{} packages, {}: {} != reference {}".format(
+            size, name, query["top"], query["reference_top"]
+        )
+        for size, result in results["sizes"].items()
+        for name, query in result["queries"].items()
+        if query.get("stable") is False
+    ]
+    if unstable:
+        print("\nSearch results differ from the reference search:")
+        for message in unstable:
+            print("  " + message)
+        return 1
+
+    if not args.skip_reference:
+        print(
+            "\nThe top {} results of every query match the reference search".format(
+                args.top
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,470 @@
+#!/usr/bin/env python
+# -------------------------------------------------------------------------------------------------------------
+## Startup benchmark for the ggd command line
+##
+## Measures the cold and warm wall time and the -X importtime breakdown of the argument parsing path of
+##  each benchmarked ggd sub-command, compares the results with a stored baseline, and exits with an error
+##  if startup regressed past the threshold. Each warm run is paired with a run of a bare python interpreter,
+##  and the startup is compared as a multiple of the python startup measured in the same run, so a slower
+##  or busier machine does not look like a regression.
+##
+## Usage:
+##   python benchmarks/startup.py                    ## Run and compare with benchmarks/startup_baseline.json
+##   python benchmarks/startup.py --update-baseline  ## Run and store the results as the new baseline
+# -------------------------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess as sp
+import sys
+import tempfile
+import time
+
+# -------------------------------------------------------------------------------------------------------------
+## Global Variables
+# -------------------------------------------------------------------------------------------------------------
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "startup_baseline.json")
+
+## The benchmarked commands. Options with choices from the ggd metadata are given before --help so the
+##  metadata is read from the fixture GGD_LOCAL while the arguments are parsed. predict-path runs a full
+##  command: the ggd serve daemon probe (with no daemon), the default channel option, and the fixture metadata
+CASES = [
+    ("version", ["--version"]),
+    (
+        "search",
+        ["search", "-c", "genomics", "-s", "Homo_sapiens", "-g", "hg19", "--help"],
+    ),
+    ("list", ["list", "--help"]),
+    (
+        "get-files",
+        ["get-files", "-c", "genomics", "-s", "Homo_sapiens", "-g", "hg19", "--help"],
+    ),
+    ("show-env", ["show-env", "--help"]),
+    (
+        "predict-path",
+        [
+            "predict-path",
+            "-pn",
+            "hg19-gaps-ucsc-v1",
+            "--file-name",
+            "hg19-gaps-ucsc-v1.bed.gz",
+        ],
+    ),
+]
+
+## The reference command timed next to each warm run: the startup of the python interpreter alone
+REFERENCE_COMMAND = [sys.executable, "-c", "pass"]
+
+## Modules that should only be imported by the commands that need them
+HEAVY_MODULES = ["conda", "requests", "fuzzywuzzy", "rapidfuzz", "yaml", "numpy"]
+
+## Fixture metadata for the hermetic GGD_LOCAL
+FIXTURE_METADATA = {
+    "genome_metadata/species_to_build.json": {
+        "Homo_sapiens": ["hg19", "hg38", "GRCh37", "GRCh38"],
+        "Mus_musculus": ["mm10", "GRCm38"],
+    },
+    "genome_metadata/build_to_species.json": {
+        "hg19": "Homo_sapiens",
+        "hg38": "Homo_sapiens",
+        "GRCh37": "Homo_sapiens",
+        "GRCh38": "Homo_sapiens",
+        "mm10": "Mus_musculus",
+        "GRCm38": "Mus_musculus",
+    },
+    "genome_metadata/ggd_channels.json": {"channels": ["genomics", "dev"]},
+    "channeldata/genomics/channeldata.json": {
+        "channeldata_version": 1,
+        "packages": {
+            "hg19-gaps-ucsc-v1": {
+                "version": "1",
+                "summary": "Assembly gaps from UCSC",
+                "keywords": ["gaps", "region"],
+                "identifiers": {"species": "Homo_sapiens", "genome-build": "hg19"},
+                "tags": {
+                    "data-provider": "UCSC",
+                    "file-type": ["bed"],
+                    "final-files": [
+                        "hg19-gaps-ucsc-v1.bed.gz",
+                        "hg19-gaps-ucsc-v1.bed.gz.tbi",
+                    ],
+                },
+            }
+        },
+    },
+}
+
+
+# -------------------------------------------------------------------------------------------------------------
+## Functions/Methods
+# -------------------------------------------------------------------------------------------------------------
+
+
+def make_ggd_local():
+    """Method to create a hermetic GGD_LOCAL dir with the fixture metadata
+
+    make_ggd_local
+    ==============
+    This method is used to create a temporary ggd metadata dir with the FIXTURE_METADATA files. The
+     files are new, so ggd uses them as is without checking for updates.
+
+    Returns:
+    ++++++++
+    1) (str) The path to the new dir
+    """
+
+    ggd_local = tempfile.mkdtemp(prefix="ggd-startup-")
+    for file_name, content in FIXTURE_METADATA.items():
+        file_path = os.path.join(ggd_local, file_name)
+        if not os.path.isdir(os.path.dirname(file_path)):
+            os.makedirs(os.path.dirname(file_path))
+        with open(file_path, "w") as f:
+            json.dump(content, f)
+
+    return ggd_local
+
+
+def benchmark_env(ggd_local, pycache_dir=None):
+    """Method to get the environment the ggd commands are run with
+
+    benchmark_env
+    =============
+    This method is used to get an environment that uses the ggd code in this repo, the hermetic GGD_LOCAL
+     dir, no network access (GGD_OFFLINE), and a ggd serve socket in GGD_LOCAL, where no daemon is running.
+
+    Parameters:
+    -----------
+    1) ggd_local:   (str) The GGD_LOCAL dir to use
+    2) pycache_dir: (str) A dir to store the python bytecode in. An empty dir gives a cold start
+                           (Default = None, use the normal bytecode cache)
+
+    Returns:
+    ++++++++
+    1) (dict) The environment
+    """
+
+    env = dict(os.environ)
+    env["GGD_LOCAL"] = ggd_local
+    env["GGD_OFFLINE"] = "1"
+    env["GGD_SERVE_SOCKET"] = os.path.join(ggd_local, "ggd-serve.sock")
+    env.pop("GGD_SERVE", None)
+    env.pop("GGD_NETWORK_REPORT", None)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [REPO_DIR] + [x for x in [env.get("PYTHONPATH")] if x]
+    )
+    if pycache_dir is not None:
+        env["PYTHONPYCACHEPREFIX"] = pycache_dir
+
+    return env
+
+
+def run_ggd(args, env, importtime=False):
+    """Method to run a ggd command and time it
+
+    run_ggd
+    =======
+    This method is used to run 'python -m ggd' with a set of arguments and get the wall time
+
+    Parameters:
+    -----------
+    1) args:       (list) The ggd arguments
+    2) env:        (dict) The environment to run the command with
+    3) importtime: (bool) Whether or not to run with '-X importtime'. (Default = False)
+
+    Returns:
+    ++++++++
+    1) (float) The wall time in milliseconds
+    2) (str)   The stderr of the command
+    """
+
+    cmd = (
+        [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-m", "ggd"]
+    )
+    elapsed, proc, stderr = time_command(cmd + args, env)
+
+    if proc.returncode != 0:
+        sys.exit(
+            "\n:ggd:benchmark: !!ERROR!! 'ggd {}' failed:\n{}".format(
+                " ".join(args), stderr.decode("utf-8", "replace")
+            )
+        )
+
+    return (elapsed, stderr.decode("utf-8", "replace"))
+
+
+def time_command(cmd, env):
+    """
+    Method to run a command and get its wall time in milliseconds, the finished process, and its stderr
+    """
+
+    start = time.perf_counter()
+    proc = sp.Popen(cmd, env=env, stdout=sp.DEVNULL, stderr=sp.PIPE)
+    _, stderr = proc.communicate()
+    elapsed = (time.perf_counter() - start) * 1000.0
+
+    return (elapsed, proc, stderr)
+
+
+def parse_importtime(stderr, top=10):
+    """Method to parse the output of '-X importtime'
+
+    parse_importtime
+    ================
+    This method is used to summarize the import times written to stderr by 'python -X importtime'
+
+    Parameters:
+    -----------
+    1) stderr: (str) The stderr of the command
+    2) top:    (int) The number of modules to report. (Default = 10)
+
+    Returns:
+    ++++++++
+    1) (dict) A dictionary with the total import time, the number of modules imported, the top-level modules
+               with the largest cumulative import time, and the HEAVY_MODULES that were imported
+    """
+
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        ## Nested imports are indented below the module that imported them
+        modules.append((name.rstrip()[1:], int(self_us), int(cumulative_us)))
+
+    top_level = [x for x in modules if not x[0].startswith(" ")]
+    imported = set(x[0].strip().split(".")[0] for x in modules)
+
+    return {
+        "total_ms": round(sum(x[1] for x in modules) / 1000.0, 2),
+        "modules": len(modules),
+        "top": [
+            [name.strip(), round(cumulative / 1000.0, 2)]
+            for name, _, cumulative in sorted(top_level, key=lambda x: -x[2])[:top]
+        ],
+        "heavy_imports": sorted(x for x in HEAVY_MODULES if x in imported),
+    }
+
+
+def median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2.0
+
+
+def benchmark_case(args, runs):
+    """Method to benchmark a single ggd command
+
+    benchmark_case
+    ==============
+    This method is used to get the cold wall time (new GGD_LOCAL and no python bytecode cache), the warm
+     wall times (after a warm-up run), and the import time breakdown for a ggd command.
+
+     Each warm run is paired with a run of REFERENCE_COMMAND right before it. The relative startup is the
+      median of the warm time / reference time of each pair, so noise that slows down both runs of a pair
+      (a busy or slower machine) cancels out.
+
+    Parameters:
+    -----------
+    1) args: (list) The ggd arguments
+    2) runs: (int)  The number of warm runs
+
+    Returns:
+    ++++++++
+    1) (dict) The results for the command
+    """
+
+    ggd_local = make_ggd_local()
+    pycache_dir = tempfile.mkdtemp(prefix="ggd-startup-pycache-")
+    try:
+        cold_ms, _ = run_ggd(args, benchmark_env(ggd_local, pycache_dir))
+
+        env = benchmark_env(ggd_local)
+        run_ggd(args, env)
+        reference = []
+        warm = []
+        for _ in range(runs):
+            reference.append(time_command(REFERENCE_COMMAND, env)[0])
+            warm.append(run_ggd(args, env)[0])
+        _, stderr = run_ggd(args, env, importtime=True)
+
+    finally:
+        shutil.rmtree(ggd_local)
+        shutil.rmtree(pycache_dir)
+
+    return {
+        "args": args,
+        "cold_ms": round(cold_ms, 2),
+        "warm_ms": round(median(warm), 2),
+        "warm_min_ms": round(min(warm), 2),
+        "warm_max_ms": round(max(warm), 2),
+        "python_ms": round(median(reference), 2),
+        "relative": round(median([w / r for w, r in zip(warm, reference)]), 4),
+        "importtime": parse_importtime(stderr),
+    }
+
+
+def compare_to_baseline(results, baseline, threshold, slack_ms):
+    """Method to compare benchmark results with the baseline
+
+    compare_to_baseline
+    ===================
+    This method is used to find the commands whose startup regressed. A command regressed if its relative
+     startup (the warm wall time as a multiple of the python startup in the same run, See benchmark_case) is
+     more than the threshold (a fraction) plus the slack above the baseline, or if it now imports a
+     HEAVY_MODULES module that it did not import in the baseline. The limit is reported in milliseconds of
+     the python startup measured in this run.
+
+    Parameters:
+    -----------
+    1) results:   (dict)  The benchmark results
+    2) baseline:  (dict)  The baseline results
+    3) threshold: (float) The allowed slowdown as a fraction of the baseline. (Example: 0.25)
+    4) slack_ms:  (float) The allowed slowdown in milliseconds on top of the threshold, to absorb noise
+
+    Returns:
+    ++++++++
+    1) (list) A list of messages, one for each regression
+    """
+
+    regressions = []
+    for name, result in results["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        base = baseline["cases"][name]
+
+        python_ms = result["python_ms"]
+        limit = base["relative"] * (1.0 + threshold) + slack_ms / python_ms
+        if result["relative"] > limit:
+            regressions.append(
+                "{}: warm startup {:.2f}x > {:.2f}x the python startup ({:.1f} ms > {:.1f} ms, baseline {:.2f}x)".format(
+                    name,
+                    result["relative"],
+                    limit,
+                    result["relative"] * python_ms,
+                    limit * python_ms,
+                    base["relative"],
+                )
+            )
+
+        new_imports = sorted(
+            set(result["importtime"]["heavy_imports"])
+            - set(base["importtime"]["heavy_imports"])
+        )
+        if new_imports:
+            regressions.append(
+                "{}: now imports {}".format(name, ", ".join(new_imports))
+            )
+
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the startup time of the ggd command line and compare it with a baseline"
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=20,
+        help="The number of warm runs per command. (Default = 20)",
+    )
+    parser.add_argument(
+        "--case",
+        action="append",
+        default=[],
+        choices=[name for name, _ in CASES],
+        help="The command to benchmark. Use the flag multiple times to benchmark multiple commands. (Default = all commands)",
+    )
+    parser.add_argument(
+        "--output",
+        default="startup_results.json",
+        help="The file to write the results to. (Default = startup_results.json)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_FILE,
+        help="The baseline results file. (Default = benchmarks/startup_baseline.json)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="The allowed slowdown of the relative warm startup as a fraction of the baseline. (Default = 0.25)",
+    )
+    parser.add_argument(
+        "--slack-ms",
+        type=float,
+        default=5.0,
+        help="The allowed slowdown in milliseconds on top of the threshold. (Default = 5)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results as the new baseline instead of comparing with it",
+    )
+    args = parser.parse_args(args)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "cases": {},
+    }
+    for name, ggd_args in CASES:
+        if args.case and name not in args.case:
+            continue
+        result = benchmark_case(ggd_args, args.runs)
+        results["cases"][name] = result
+        print(
+            "{:<12} cold {:>8.1f} ms   warm {:>8.1f} ms ({:.2f}x python)   imports {:>8.1f} ms ({} modules)   heavy: {}".format(
+                name,
+                result["cold_ms"],
+                result["warm_ms"],
+                result["relative"],
+                result["importtime"]["total_ms"],
+                result["importtime"]["modules"],
+                ", ".join(result["importtime"]["heavy_imports"]) or "none",
+            )
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print("\nResults written to: {}".format(args.output))
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("Baseline updated: {}".format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(
+            "No baseline found at {}. Run with --update-baseline to create one".format(
+                args.baseline
+            )
+        )
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare_to_baseline(results, baseline, args.threshold, args.slack_ms)
+    if regressions:
+        print("\nStartup regressions:")
+        for message in regressions:
+            print("  " + message)
+        return 1
+
+    print("\nNo startup regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,17 +2,6 @@ import argparse
 import sys
 
 from .__init__ import __version__
-from .check_recipe import add_check_recipe
-from .install import add_install
-from .list_files import add_list_files
-from .list_installed_pkgs import add_list_installed_packages
-from .list_pkg_info import add_pkg_info
-from .make_bash import add_make_bash
-from .make_meta_recipe import add_make_metarecipe
-from .predict_path import add_predict_path
-from .search import add_search
-from .show_env import add_show_env
-from .uninstall import add_uninstall
 
 if sys.version_info[0] < 3:
     print(
@@ -23,10 +12,149 @@ if sys.version_info[0] < 3:
     )
 
 
+## The sub-commands in the order they are listed in the help message.
+##  (name, module, argument parser function, help message)
+## Only the module of the sub-command being run is imported. (See add_sub_commands)
+SUB_COMMANDS = [
+    ("search", "search", "add_search", "Search for a ggd data package"),
+    (
+        "predict-path",
+        "predict_path",
+        "add_predict_path",
+        "Predict the install file path of a data package that hasn't been installed yet. (Use for workflows, such as Snakemake)",
+    ),
+    ("install", "install", "add_install", "Install a ggd data package"),
+    ("uninstall", "uninstall", "add_uninstall", "Uninstall a ggd data package"),
+    (
+        "list",
+        "list_installed_pkgs",
+        "add_list_installed_packages",
+        "List the ggd data package(s) that are currently installed in a specific conda environment",
+    ),
+    (
+        "get-files",
+        "list_files",
+        "add_list_files",
+        "Get the data files for a specific installed ggd data package",
+    ),
+    (
+        "pkg-info",
+        "list_pkg_info",
+        "add_pkg_info",
+        "List data package info for a specific installed ggd data package",
+    ),
+    (
+        "show-env",
+        "show_env",
+        "add_show_env",
+        "Show ggd data package environment variables available for the current conda environment",
+    ),
+    (
+        "make-recipe",
+        "make_bash",
+        "add_make_bash",
+        "Make a new ggd data recipe with a user developed bash script",
+    ),
+    (
+        "make-meta-recipe",
+        "make_meta_recipe",
+        "add_make_metarecipe",
+        "Make a new ggd data meta-recipe",
+    ),
+    (
+        "check-recipe",
+        "check_recipe",
+        "add_check_recipe",
+        "Build, install, check, and test a ggd data recipe",
+    ),
+    ("metadata", "metadata", "add_metadata", "Manage the local ggd metadata files"),
+    (
+        "bundle",
+        "bundle",
+        "add_bundle",
+        "Export or import ggd metadata and data packages for use without an internet connection",
+    ),
+    (
+        "serve",
+        "serve",
+        "add_serve",
+        "Run a ggd daemon that answers search, predict-path, and get-files commands for other ggd processes",
+    ),
+]
+
+## The sub-commands answered by a running 'ggd serve' daemon. (See serve.run_in_daemon)
+SERVED_COMMANDS = ["search", "predict-path", "get-files"]
+
+
+def selected_sub_command(args):
+    """
+    Method to get the name of the sub-command from the command line arguments, or None if there is no sub-command
+    """
+
+    names = set(name for name, module, add_function, help_message in SUB_COMMANDS)
+    for arg in args:
+        if not arg.startswith("-"):
+            ## The ggd options do not take values, so the first positional argument is the sub-command
+            return arg if arg in names else None
+
+    return None
+
+
+def add_sub_commands(sub, command):
+    """Method to add the sub-commands to the ggd argument parser
+
+    add_sub_commands
+    ================
+    This method is used to add the sub-command parsers. Only the module of the sub-command being run is
+     imported and adds its full argument parser. Every other sub-command is added with its help message
+     only, so 'ggd -h' still lists every sub-command without importing all of ggd.
+
+    Parameters:
+    -----------
+    1) sub:     (argparse subparsers) The ggd sub-command parsers
+    2) command: (str) The name of the sub-command being run, or None
+    """
+    import importlib
+
+    for name, module, add_function, help_message in SUB_COMMANDS:
+        if name == command:
+            getattr(
+                importlib.import_module(".{}".format(module), __package__ or "ggd"),
+                add_function,
+            )(sub)
+        else:
+            sub.add_parser(name, help=help_message)
+
+
 def main(args=None):
     if args is None:
         args = sys.argv[1:]
 
+    ## Use a running ggd serve daemon if there is one. (It is not used for the --network-report of a command)
+    if selected_sub_command(args) in SERVED_COMMANDS and "--network-report" not in args:
+        from .serve import run_in_daemon
+
+        exit_code = run_in_daemon(args)
+        if exit_code is not None:
+            return exit_code
+
+    run_command(args)
+
+
+def build_parser(command):
+    """Method to build the ggd argument parser
+
+    build_parser
+    ============
+    Parameters:
+    -----------
+    1) command: (str) The name of the sub-command being run, or None. (See add_sub_commands)
+
+    Returns:
+    ++++++++
+    1) (argparse.ArgumentParser) The ggd argument parser
+    """
+
     parser = argparse.ArgumentParser(
         prog="ggd", formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
@@ -37,33 +165,63 @@ def main(args=None):
         action="version",
         version="%(prog)s " + str(__version__),
     )
+    parser.add_argument(
+        "--network-report",
+        action="store_true",
+        help="(Optional) Print a report of the network requests made by the command (requests, bytes, and time) to stderr when the command finishes",
+    )
     sub = parser.add_subparsers(title="[sub-commands]", dest="command")
     sub.required = True
 
-    add_search(sub)
-
-    add_predict_path(sub)
+    add_sub_commands(sub, command)
 
-    add_install(sub)
+    return parser
 
-    add_uninstall(sub)
 
-    add_list_installed_packages(sub)
+def show_lazy_choices(parser):
+    """
+    Method to add the choices of the lazy_choice options of a parser, and of its sub-command parsers, so the 
+     help text lists them as it does for argparse "choices". The choices are loaded, so it is only used for -h
+    """
 
-    add_list_files(sub)
+    for action in parser._actions:
+        get_choices = getattr(action.type, "get_choices", None)
+        if get_choices is not None:
+            action.choices = [str(x) for x in get_choices()]
+        elif isinstance(action, argparse._SubParsersAction):
+            for sub_parser in action.choices.values():
+                show_lazy_choices(sub_parser)
 
-    add_pkg_info(sub)
 
-    add_show_env(sub)
+def run_command(args, parser=None):
+    """Method to parse the ggd command line arguments and run the sub-command in this process
 
-    add_make_bash(sub)
+    run_command
+    ===========
+    This method is used by main, and by the ggd serve daemon to run the commands sent by other ggd processes
 
-    add_make_metarecipe(sub)
+    Parameters:
+    -----------
+    1) args:   (list) The ggd command line arguments. (Example: ["search", "reference", "genome"])
+    2) parser: (argparse.ArgumentParser) The parser from build_parser for the sub-command. (Default = None, build it)
+    """
 
-    add_check_recipe(sub)
+    if "-h" in args or "--help" in args:
+        ## The help text lists the choices of the lazy_choice options. A new parser is used, so the parser
+        ##  of a ggd serve daemon does not keep the loaded choices
+        parser = build_parser(selected_sub_command(args))
+        show_lazy_choices(parser)
+    elif parser == None:
+        parser = build_parser(selected_sub_command(args))
 
     args = parser.parse_args(args)
-    args.func(parser, args)
+    try:
+        args.func(parser, args)
+    finally:
+        if args.network_report:
+            from .transport import print_network_report
+
+            print_network_report()
 
 
 if __name__ == "__main__":
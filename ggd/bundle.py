@@ -0,0 +1,530 @@
+# -------------------------------------------------------------------------------------------------------------
+## Import Statements
+# -------------------------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import json
+import os
+import sys
+
+## Version of the bundle layout
+BUNDLE_VERSION = 1
+BUNDLE_MANIFEST = "manifest.json"
+
+## Top level dirs of a bundle and the local dir each one is imported into (See bundle_destinations)
+BUNDLE_METADATA_DIRS = ("genome_metadata", "channeldata", "repodata", "meta-recipes")
+
+# -------------------------------------------------------------------------------------------------------------
+## Argument Parser
+# -------------------------------------------------------------------------------------------------------------
+def add_bundle(p):
+
+    c = p.add_parser(
+        "bundle",
+        help="Export or import ggd metadata and data packages for use without an internet connection",
+        description="Create a single archive of the ggd metadata and data packages on a host with an internet connection (export), and load it on a host without one (import)",
+    )
+    sub = c.add_subparsers(title="[bundle commands]", dest="bundle_command")
+    sub.required = True
+
+    e = sub.add_parser(
+        "export",
+        help="Create a bundle archive",
+        description="Create a bundle archive with the ggd genome metadata, the channel metadata for the ggd channels, and the package files for the data packages listed",
+    )
+    e.add_argument(
+        "-c",
+        "--channel",
+        default=[],
+        action="append",
+        help="(Optional) The ggd channel to add to the bundle. Use the flag multiple times to add multiple channels. (Default = genomics)",
+    )
+    e.add_argument(
+        "-p",
+        "--package",
+        default=[],
+        action="append",
+        help="(Optional) A data package to add the package file for. Use the flag multiple times to add multiple data packages",
+    )
+    e.add_argument(
+        "-o",
+        "--output",
+        default="ggd-bundle.tar.gz",
+        help="(Optional) The file path of the bundle archive to create. (Default = ggd-bundle.tar.gz)",
+    )
+    e.set_defaults(func=bundle_export)
+
+    i = sub.add_parser(
+        "import",
+        help="Load a bundle archive",
+        description="Load the metadata in a bundle archive into the local ggd metadata dir and the package files into the conda package cache",
+    )
+    i.add_argument("bundle", help="The file path of the bundle archive to load")
+    i.add_argument(
+        "--pkgs-dir",
+        default=None,
+        help="(Optional) The conda package cache dir to add the package files to. The package cache is used by every conda environment. (Default = the first writable conda package cache dir, See 'conda info')",
+    )
+    i.set_defaults(func=bundle_import)
+
+
+# -------------------------------------------------------------------------------------------------------------
+## Functions/Methods
+# -------------------------------------------------------------------------------------------------------------
+
+
+def add_bytes_to_tar(tar, arcname, content):
+    """
+    Method to add a file to an open tar archive from a bytes string
+    """
+    import io
+    import tarfile
+    import time
+
+    info = tarfile.TarInfo(arcname)
+    info.size = len(content)
+    info.mtime = int(time.time())
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(content))
+
+
+def download_package_file(channel_key, subdir, tar_file, md5, dest_dir):
+    """Method to download a package file (.tar.bz2) from a conda channel on the Anaconda Cloud
+
+    download_package_file
+    =====================
+    This method is used to download a package file and check it against the md5sum in the repodata
+
+    Parameters:
+    -----------
+    1) channel_key: (str) The conda channel. (Example: ggd-genomics)
+    2) subdir:      (str) The subdir (platform) of the package file
+    3) tar_file:    (str) The name of the package file
+    4) md5:         (str) The md5sum of the package file from the repodata
+    5) dest_dir:    (str) The dir to download the file into
+
+    Returns:
+    ++++++++
+    1) (str) The file path of the downloaded file
+    """
+    from . import transport
+    from .utils import CONDA_PKG_URL, STREAM_CHUNK_SIZE, get_file_md5sum
+
+    url = CONDA_PKG_URL.format(channel=channel_key, subdir=subdir, tar_file=tar_file)
+    file_path = os.path.join(dest_dir, tar_file)
+
+    response = transport.get(url, stream=True)
+    try:
+        response.raise_for_status()
+        with open(file_path, "wb") as out:
+            for chunk in transport.iter_content(response, STREAM_CHUNK_SIZE):
+                out.write(chunk)
+    finally:
+        response.close()
+
+    if md5 is not None and get_file_md5sum(file_path) != md5:
+        raise ValueError(
+            "The md5sum of the downloaded file {} does not match the repodata".format(
+                tar_file
+            )
+        )
+
+    return file_path
+
+
+def export_bundle(output, channels, packages):
+    """Method to create a bundle archive of ggd metadata and data package files
+
+    export_bundle
+    =============
+    This method is used to create a single archive (.tar.gz) with everything ggd needs to search, install,
+     predict paths, and get files without an internet connection:
+      * genome_metadata/:            The genome metadata files
+      * channeldata/<channel>/:      The channel metadata for each channel
+      * repodata/<channel>/<subdir>/: A slice of the conda repodata with only the package files in the bundle
+      * meta-recipes/<name>/:        The checksum file for each meta-recipe in the bundle
+      * pkgs/:                       The package files (.tar.bz2) for each data package in the bundle
+      * manifest.json:               A description of the bundle
+
+     The metadata is refreshed before the bundle is created.
+
+    Parameters:
+    -----------
+    1) output:   (str)  The file path of the bundle archive to create
+    2) channels: (list) The ggd channels to add. (Example: ["genomics"])
+    3) packages: (list) The data packages to add the package files for
+
+    Returns:
+    ++++++++
+    1) (dict) The bundle manifest
+    """
+    import shutil
+    import tarfile
+    import tempfile
+    import time
+    from collections import defaultdict
+
+    from . import transport
+    from .__init__ import __version__
+    from .metadata import refresh_metadata
+    from .utils import (
+        CHANNEL_DATA_DIR,
+        GENOME_METADATA_DIR,
+        GENOME_METADATA_FILES,
+        GGD_META_RECIPE_URL,
+        check_for_meta_recipes,
+        get_repodata_entries,
+        latest_repodata_entry,
+        load_channeldata,
+        load_repodata_packages,
+        repodata_cache_dir,
+    )
+
+    ## Update the local metadata
+    errors = refresh_metadata(channels)
+    failed = sorted(key for key, error in errors.items() if error is not None)
+    if failed:
+        sys.exit(
+            "\n:ggd:bundle: !!ERROR!! Unable to update the ggd metadata for: {}\n".format(
+                ", ".join(failed)
+            )
+        )
+
+    manifest = {
+        "bundle_version": BUNDLE_VERSION,
+        "ggd_version": __version__,
+        "created": time.time(),
+        "channels": list(channels),
+        "packages": [],
+    }
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        with tarfile.open(output, "w:gz") as tar:
+
+            ## Genome and channel metadata
+            for file_name in GENOME_METADATA_FILES:
+                tar.add(
+                    os.path.join(GENOME_METADATA_DIR, file_name),
+                    arcname="genome_metadata/{}".format(file_name),
+                )
+            for channel in channels:
+                tar.add(
+                    os.path.join(CHANNEL_DATA_DIR, channel, "channeldata.json"),
+                    arcname="channeldata/{}/channeldata.json".format(channel),
+                )
+
+            ## Data package files
+            repodata_slices = defaultdict(dict)
+            for pkg_name in packages:
+
+                ## Find the channel of the package
+                channel = None
+                for ggd_channel in channels:
+                    pkg = load_channeldata(ggd_channel).get_package(pkg_name)
+                    if pkg is not None:
+                        channel = ggd_channel
+                        break
+                if channel is None:
+                    sys.exit(
+                        "\n:ggd:bundle: !!ERROR!! The {} data package is not in the ggd channel(s): {}\n".format(
+                            pkg_name, ", ".join(channels)
+                        )
+                    )
+
+                ## Find the package file for the current version
+                channel_key = "ggd-{}".format(channel)
+                highest_build, subdir, md5, tar_file = latest_repodata_entry(
+                    get_repodata_entries(channel_key, pkg_name), pkg["version"]
+                )
+                if highest_build == -1:
+                    sys.exit(
+                        "\n:ggd:bundle: !!ERROR!! Unable to find the package file for {} in the {} repodata\n".format(
+                            pkg_name, channel_key
+                        )
+                    )
+
+                print(":ggd:bundle: Adding {}".format(tar_file))
+                file_path = download_package_file(
+                    channel_key, subdir, tar_file, md5, tmp_dir
+                )
+                tar.add(file_path, arcname="pkgs/{}".format(tar_file))
+                os.remove(file_path)
+
+                ## Keep the repodata record for the package file
+                repodata_slices[(channel_key, subdir)][tar_file] = None
+
+                ## Meta-recipes need the checksum file
+                if check_for_meta_recipes(pkg_name, {"packages": {pkg_name: pkg}}):
+                    response = transport.get(
+                        GGD_META_RECIPE_URL.format(
+                            meta_recipe_name=pkg_name, file_name="checksums.json"
+                        )
+                    )
+                    response.raise_for_status()
+                    add_bytes_to_tar(
+                        tar,
+                        "meta-recipes/{}/checksums.json".format(pkg_name),
+                        response.content,
+                    )
+
+                manifest["packages"].append(
+                    {
+                        "name": pkg_name,
+                        "channel": channel,
+                        "subdir": subdir,
+                        "tar_file": tar_file,
+                        "md5": md5,
+                    }
+                )
+
+            ## One pass over each repodata file for all the package files in it
+            for (channel_key, subdir), records in repodata_slices.items():
+                repodata_packages = load_repodata_packages(
+                    os.path.join(repodata_cache_dir(channel_key, subdir), "repodata.json")
+                )
+                for record_tar in list(records):
+                    records[record_tar] = repodata_packages[record_tar]
+                del repodata_packages
+
+                add_bytes_to_tar(
+                    tar,
+                    "repodata/{}/{}/repodata.json".format(channel_key, subdir),
+                    json.dumps(
+                        {"info": {"subdir": subdir}, "packages": records}
+                    ).encode("utf-8"),
+                )
+
+            add_bytes_to_tar(
+                tar, BUNDLE_MANIFEST, json.dumps(manifest, indent=2).encode("utf-8")
+            )
+
+    except:
+        if os.path.exists(output):
+            os.remove(output)
+        raise
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    return manifest
+
+
+def bundle_destinations(pkgs_dir):
+    """
+    Method to get the local dir each top level bundle dir is imported into
+    """
+    from .utils import (
+        CHANNEL_DATA_DIR,
+        GENOME_METADATA_DIR,
+        META_RECIPE_CACHE_DIR,
+        REPODATA_CACHE_DIR,
+    )
+
+    return {
+        "genome_metadata": GENOME_METADATA_DIR,
+        "channeldata": CHANNEL_DATA_DIR,
+        "repodata": REPODATA_CACHE_DIR,
+        "meta-recipes": META_RECIPE_CACHE_DIR,
+        "pkgs": pkgs_dir,
+    }
+
+
+def merge_repodata_slice(repodata_path, repodata_slice):
+    """
+    Method to add the package records of a bundle repodata slice to a cached repodata.json file. The records 
+     of the other packages in the cache are kept. Returns the merged repodata as bytes
+    """
+    import io
+
+    try:
+        with io.open(repodata_path, encoding="utf-8") as r:
+            repodata = json.load(r)
+    except (IOError, OSError, ValueError):
+        repodata = {"info": repodata_slice.get("info", {}), "packages": {}}
+
+    repodata.setdefault("packages", {}).update(repodata_slice.get("packages", {}))
+
+    return json.dumps(repodata).encode("utf-8")
+
+
+def import_bundle(bundle_path, pkgs_dir):
+    """Method to load a bundle archive
+
+    import_bundle
+    =============
+    This method is used to load the files in a bundle archive (see export_bundle) into the local ggd metadata
+     dirs, and the package files into a conda package cache (pkgs dir). Each file is written atomically
+     (see utils.atomic_write) while holding the metadata lock. The http validators of each metadata file are replaced with the content hash
+     of the bundle file, so the file is fully downloaded, not revalidated, the next time ggd has an internet
+     connection. The repodata records in the bundle are added to the cached repodata (see merge_repodata_slice) 
+     rather than replacing it. The channel catalogs and the repodata name indexes are rebuilt.
+
+    Parameters:
+    -----------
+    1) bundle_path: (str) The file path of the bundle archive
+    2) pkgs_dir:    (str) The conda package cache dir to add the package files to
+
+    Returns:
+    ++++++++
+    1) (dict) The bundle manifest
+    """
+    import hashlib
+    import io
+    import tarfile
+
+    from .catalog import refresh_catalog
+    from .utils import (
+        METADATA_LOCK,
+        STREAM_CHUNK_SIZE,
+        VALIDATORS_SUFFIX,
+        atomic_write,
+        build_repodata_index,
+        cache_lock,
+    )
+
+    destinations = bundle_destinations(pkgs_dir)
+
+    with tarfile.open(bundle_path, "r:*") as tar, cache_lock(METADATA_LOCK):
+        try:
+            manifest = json.loads(
+                tar.extractfile(BUNDLE_MANIFEST).read().decode("utf-8")
+            )
+        except KeyError:
+            sys.exit(
+                "\n:ggd:bundle: !!ERROR!! {} is not a ggd bundle. The manifest is missing\n".format(
+                    bundle_path
+                )
+            )
+
+        if manifest.get("bundle_version", 0) > BUNDLE_VERSION:
+            sys.exit(
+                "\n:ggd:bundle: !!ERROR!! The bundle was created by a newer version of ggd ({}). Please update ggd and try again\n".format(
+                    manifest.get("ggd_version")
+                )
+            )
+
+        imported = []
+        for member in tar.getmembers():
+            if not member.isfile() or member.name == BUNDLE_MANIFEST:
+                continue
+
+            ## Only files inside the known bundle dirs are imported
+            parts = member.name.split("/")
+            if (
+                parts[0] not in destinations
+                or os.path.isabs(member.name)
+                or ".." in parts
+                or len(parts) < 2
+            ):
+                print(
+                    ":ggd:bundle: Skipping unexpected file in bundle: {}".format(
+                        member.name
+                    )
+                )
+                continue
+
+            dest_path = os.path.join(destinations[parts[0]], *parts[1:])
+
+            sha256 = hashlib.sha256()
+            source = tar.extractfile(member)
+            if parts[0] == "repodata" and parts[-1] == "repodata.json":
+                source = io.BytesIO(
+                    merge_repodata_slice(
+                        dest_path, json.loads(source.read().decode("utf-8"))
+                    )
+                )
+
+            with atomic_write(dest_path, "wb") as out:
+                for chunk in iter(lambda: source.read(STREAM_CHUNK_SIZE), b""):
+                    sha256.update(chunk)
+                    out.write(chunk)
+
+            ## Replace the validators of the old file. Without an ETag the file is fully downloaded, not revalidated, once online
+            if parts[0] in BUNDLE_METADATA_DIRS:
+                with atomic_write(dest_path + VALIDATORS_SUFFIX) as v:
+                    json.dump({"url": None, "sha256": sha256.hexdigest()}, v)
+
+            imported.append((parts, dest_path))
+
+        ## Rebuild the indexes for the new files
+        for parts, dest_path in imported:
+            if parts[0] == "channeldata" and parts[-1] == "channeldata.json":
+                refresh_catalog(dest_path)
+            elif parts[0] == "repodata" and parts[-1] == "repodata.json":
+                build_repodata_index(dest_path, parts[-2])
+
+    return manifest
+
+
+def bundle_export(parser, args):
+    """Main method for the bundle export command
+
+    bundle_export
+    =============
+    Main method used to create a bundle archive
+    """
+    from .utils import check_for_internet_connection
+
+    if not check_for_internet_connection():
+        sys.exit(
+            "\n:ggd:bundle: !!ERROR!! An internet connection is required to export a bundle. Please try again when you have secured an internet connection\n"
+        )
+
+    channels = args.channel if args.channel else ["genomics"]
+
+    print("\n:ggd:bundle: Creating the bundle: {}".format(args.output))
+    manifest = export_bundle(args.output, channels, args.package)
+
+    print(
+        "\n:ggd:bundle: The bundle has the metadata for the {} channel(s) and {} data package(s)".format(
+            ", ".join(manifest["channels"]), len(manifest["packages"])
+        )
+    )
+    print(
+        ":ggd:bundle: To use it, copy {} to a host without an internet connection and run 'ggd bundle import {}'".format(
+            args.output, os.path.basename(args.output)
+        )
+    )
+    print("\n:ggd:bundle: DONE\n")
+
+    return True
+
+
+def bundle_import(parser, args):
+    """Main method for the bundle import command
+
+    bundle_import
+    =============
+    Main method used to load a bundle archive
+    """
+    from .utils import conda_pkgs_dir
+
+    if not os.path.isfile(args.bundle):
+        sys.exit(
+            "\n:ggd:bundle: !!ERROR!! The bundle file {} does not exist\n".format(
+                args.bundle
+            )
+        )
+
+    ## 'conda install --offline' only finds package files in the conda package cache
+    pkgs_dir = args.pkgs_dir if args.pkgs_dir != None else conda_pkgs_dir()
+
+    print("\n:ggd:bundle: Loading the bundle: {}".format(args.bundle))
+    manifest = import_bundle(args.bundle, pkgs_dir)
+
+    print(
+        "\n:ggd:bundle: Loaded the metadata for the {} channel(s)".format(
+            ", ".join(manifest["channels"])
+        )
+    )
+    for pkg in manifest["packages"]:
+        print(
+            ":ggd:bundle:\t Added {} to {}".format(pkg["tar_file"], pkgs_dir)
+        )
+    print(
+        "\n:ggd:bundle: Set GGD_OFFLINE=1 (export GGD_OFFLINE=1) to have ggd use the bundle without checking for an internet connection"
+    )
+    print("\n:ggd:bundle: DONE\n")
+
+    return True
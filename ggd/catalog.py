@@ -0,0 +1,813 @@
+# -------------------------------------------------------------------------------------------------------------
+## Import Statements
+# -------------------------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import binascii
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+from array import array
+from bisect import bisect_right
+from collections import Counter, defaultdict
+
+# -------------------------------------------------------------------------------------------------------------
+## Global Variables
+# -------------------------------------------------------------------------------------------------------------
+
+## The catalog is stored next to the channeldata.json file it was built from
+CATALOG_NAME = "catalog.sqlite"
+
+## Increase when the schema changes so older catalogs are rebuilt
+CATALOG_SCHEMA_VERSION = "5"
+
+CATALOG_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE packages (name TEXT PRIMARY KEY, version TEXT, data TEXT);
+CREATE TABLE keywords (name TEXT, keyword TEXT);
+CREATE TABLE identifiers (name TEXT, key TEXT, value TEXT);
+CREATE TABLE tags (name TEXT, key TEXT, value TEXT);
+CREATE TABLE final_files (name TEXT, file TEXT);
+CREATE TABLE search_arrays (key TEXT PRIMARY KEY, data BLOB);
+CREATE TABLE search_grams (gram TEXT PRIMARY KEY, tokens BLOB);
+CREATE TABLE field_bitmaps (field TEXT, value TEXT, bitmap BLOB, PRIMARY KEY (field, value));
+"""
+
+## The indexes are created after the rows are added, which is faster than updating them on every insert
+CATALOG_INDEXES = """
+CREATE INDEX keywords_keyword ON keywords (keyword);
+CREATE INDEX identifiers_key_value ON identifiers (key, value);
+CREATE INDEX tags_name_key ON tags (name, key);
+CREATE INDEX final_files_name ON final_files (name);
+"""
+
+## Search terms with more bigrams than this are not looked up in the search index (see Catalog.search_candidates)
+MAX_SEARCH_GRAMS = 500
+
+## The package fields in the field index (see FieldIndex). Key = field, value = the section of the package
+##  entry with the field
+INDEX_FIELDS = {
+    "species": "identifiers",
+    "genome-build": "identifiers",
+    "data-provider": "tags",
+    "file-type": "tags",
+    "genomic-coordinate-base": "tags",
+    "ggd-channel": "tags",
+}
+
+# -------------------------------------------------------------------------------------------------------------
+## Functions/Methods
+# -------------------------------------------------------------------------------------------------------------
+
+
+def catalog_path(channeldata_path):
+    """Method to get the file path of the catalog for a channeldata.json file
+
+    catalog_path
+    ============
+    This method is used to get the path of the SQLite catalog built from a channeldata.json file. The
+     catalog is stored in the same directory as the channeldata.json file.
+
+    Parameters:
+    -----------
+    1) channeldata_path: (str) The file path to a local channeldata.json file
+
+    Returns:
+    ++++++++
+    1) (str) The file path to the catalog
+    """
+
+    return os.path.join(os.path.dirname(channeldata_path), CATALOG_NAME)
+
+
+def source_stamp(channeldata_path):
+    """Method to get a stamp identifying the current contents of a channeldata.json file
+
+    source_stamp
+    ============
+    This method is used to get a string made from the size and the modification time of the channeldata.json
+     file. The stamp is stored in the catalog and is used to tell if the catalog is out of date.
+
+    Parameters:
+    -----------
+    1) channeldata_path: (str) The file path to a local channeldata.json file
+
+    Returns:
+    ++++++++
+    1) (str) The stamp for the file
+    """
+
+    stat = os.stat(channeldata_path)
+    return "{}:{}".format(stat.st_size, repr(stat.st_mtime))
+
+
+def bigrams(text):
+    """
+    Method to get the set of two character substrings (bigrams) of a string
+    """
+
+    return set(text[i : i + 2] for i in range(len(text) - 1))
+
+
+def search_tokens(name, pkg):
+    """Method to get the strings of a package that search terms are scored against
+
+    search_tokens
+    =============
+    This method is used to get the lower case strings of a package that 'ggd search' scores search terms 
+     against: the package name, and each keyword and each part of a keyword split on "-" or "_". 
+     (See search.search_packages)
+
+    Parameters:
+    -----------
+    1) name: (str)  The package name
+    2) pkg:  (dict) The channeldata entry for the package
+
+    Returns:
+    ++++++++
+    1) (list) A list of (kind, token) tuples, where kind is "name" or "keyword"
+    """
+
+    keywords = pkg.get("keywords", [])
+    tokens = set(x.lower() for x in keywords)
+    for keyword in keywords:
+        tokens.update(x.lower() for x in re.split("-|_", keyword.strip()))
+
+    return [("name", name.lower())] + [("keyword", x) for x in sorted(tokens)]
+
+
+def array_bytes(values):
+    """
+    Method to get the bytes of an array to store in the catalog. (array.tostring on Python 2)
+    """
+
+    return values.tobytes() if hasattr(values, "tobytes") else values.tostring()
+
+
+def bytes_array(typecode, data):
+    """
+    Method to get an array from the bytes stored in the catalog. (array.fromstring on Python 2)
+    """
+
+    values = array(typecode)
+    if hasattr(values, "frombytes"):
+        values.frombytes(bytes(data))
+    else:
+        values.fromstring(bytes(data))
+    return values
+
+
+def int_array(data):
+    """
+    Method to get an array of ints from the bytes stored in the search index
+    """
+
+    return bytes_array("i", data)
+
+
+def max_edits(score_cutoff, total_length):
+    """Method to get the most edits two strings can differ by and still reach a fuzzy match score
+
+    max_edits
+    =========
+    This method is used to get the largest number of character insertions and deletions between two 
+     strings with a combined length of total_length whose fuzz.ratio score is at least score_cutoff. 
+     fuzz.ratio is 100 * 2 * matches / total_length rounded to an int, so the strings differ by at most 
+     (1 - ratio) * total_length edits.
+
+    Parameters:
+    -----------
+    1) score_cutoff: (float) The lowest score to keep (0 - 100)
+    2) total_length: (int)   The combined length of the two strings
+
+    Returns:
+    ++++++++
+    1) (int) The largest number of edits
+    """
+
+    min_ratio = (float(score_cutoff) - 0.5) / 100.0
+    return int(math.floor((1.0 - min_ratio) * total_length + 1e-9))
+
+
+def build_catalog(channeldata_path):
+    """Method to build the SQLite catalog for a channeldata.json file
+
+    build_catalog
+    =============
+    This method is used to materialise the packages in a channeldata.json file into an indexed SQLite
+     catalog. The catalog is written to a temporary file first and then moved into place, so a reader
+     never sees a partially written catalog.
+
+     Tables:
+      * meta:        The schema version, and the stamp (see source_stamp) and sha256 hash of the channeldata.json file
+      * packages:    One row per package with the version and the full package entry as json
+      * keywords:    One row per package keyword
+      * identifiers: One row per package identifier (species, genome-build)
+      * tags:        One row per package tag, with the tag value stored as json
+      * final_files: One row per final file of a package
+     * search_grams:  An inverted bigram index of the package names and keywords used by 'ggd search' to
+                       find candidate packages, with the ids of the strings that contain each bigram
+     * search_arrays: The package names, and the package, kind, length, and number of bigrams of each
+                       indexed string (See Catalog.search_candidates)
+     * field_bitmaps: A bitmap of the packages with each value of the INDEX_FIELDS (See FieldIndex)
+
+     The shell completion index of the channel is written at the same time (See completion.write_name_index)
+
+    Parameters:
+    -----------
+    1) channeldata_path: (str) The file path to a local channeldata.json file
+
+    Returns:
+    ++++++++
+    1) (str) The file path to the new catalog
+    """
+
+    from .completion import write_name_index
+    from .utils import publish_file, temp_file_for
+
+    stamp = source_stamp(channeldata_path)
+    with open(channeldata_path, "rb") as j:
+        data = j.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+    packages = json.loads(data.decode("utf-8")).get("packages", {})
+
+    cat_path = catalog_path(channeldata_path)
+    tmp_path = temp_file_for(cat_path)
+
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(CATALOG_SCHEMA)
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [
+                    ("schema_version", CATALOG_SCHEMA_VERSION),
+                    ("source", stamp),
+                    ("content_hash", content_hash),
+                ],
+            )
+            ## The search index. Each indexed string has an id, which is its position in the token arrays
+            token_pkg, token_is_name, token_length, token_grams = (
+                array("i"),
+                array("i"),
+                array("i"),
+                array("i"),
+            )
+            postings = defaultdict(lambda: array("i"))
+            for pkg_order, (name, pkg) in enumerate(packages.items()):
+                conn.execute(
+                    "INSERT INTO packages VALUES (?, ?, ?)",
+                    (name, pkg.get("version"), json.dumps(pkg)),
+                )
+                conn.executemany(
+                    "INSERT INTO keywords VALUES (?, ?)",
+                    [(name, keyword) for keyword in pkg.get("keywords", [])],
+                )
+                conn.executemany(
+                    "INSERT INTO identifiers VALUES (?, ?, ?)",
+                    [
+                        (name, key, value)
+                        for key, value in pkg.get("identifiers", {}).items()
+                    ],
+                )
+                conn.executemany(
+                    "INSERT INTO tags VALUES (?, ?, ?)",
+                    [
+                        (name, key, json.dumps(value))
+                        for key, value in pkg.get("tags", {}).items()
+                    ],
+                )
+                conn.executemany(
+                    "INSERT INTO final_files VALUES (?, ?)",
+                    [
+                        (name, final_file)
+                        for final_file in pkg.get("tags", {}).get("final-files", [])
+                    ],
+                )
+                for kind, token in search_tokens(name, pkg):
+                    grams = bigrams(token)
+                    for gram in grams:
+                        postings[gram].append(len(token_pkg))
+                    token_pkg.append(pkg_order)
+                    token_is_name.append(kind == "name")
+                    token_length.append(len(token))
+                    token_grams.append(len(grams))
+
+            ## The name strings sorted by the number of distinct bigrams per character
+            name_tokens = sorted(
+                (token_grams[i] / float(max(token_length[i], 1)), i)
+                for i in range(len(token_pkg))
+                if token_is_name[i]
+            )
+
+            conn.executemany(
+                "INSERT INTO search_arrays VALUES (?, ?)",
+                [
+                    ("names", json.dumps(list(packages.keys()))),
+                    ("token_pkg", sqlite3.Binary(array_bytes(token_pkg))),
+                    ("token_is_name", sqlite3.Binary(array_bytes(token_is_name))),
+                    ("token_length", sqlite3.Binary(array_bytes(token_length))),
+                    ("token_grams", sqlite3.Binary(array_bytes(token_grams))),
+                    (
+                        "name_density",
+                        sqlite3.Binary(
+                            array_bytes(array("d", [x[0] for x in name_tokens]))
+                        ),
+                    ),
+                    (
+                        "name_tokens",
+                        sqlite3.Binary(
+                            array_bytes(array("i", [x[1] for x in name_tokens]))
+                        ),
+                    ),
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO field_bitmaps VALUES (?, ?, ?)",
+                FieldIndex.from_packages(packages).to_rows(),
+            )
+            conn.executemany(
+                "INSERT INTO search_grams VALUES (?, ?)",
+                [
+                    (gram, sqlite3.Binary(array_bytes(tokens)))
+                    for gram, tokens in postings.items()
+                ],
+            )
+            conn.executescript(CATALOG_INDEXES)
+            conn.commit()
+        finally:
+            conn.close()
+
+        publish_file(tmp_path, cat_path)
+
+        ## The package name index for shell completion (See completion.py). Completion is optional, so an
+        ##  index that can not be written is not an error
+        try:
+            write_name_index(channeldata_path, [x for x in packages if x != "ggd"])
+        except (IOError, OSError):
+            pass
+
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return cat_path
+
+
+def catalog_is_current(channeldata_path):
+    """Method to check if the catalog for a channeldata.json file is up to date
+
+    catalog_is_current
+    ==================
+    This method is used to check that the catalog exists, uses the current schema, and was built from the
+     current contents of the channeldata.json file.
+
+    Parameters:
+    -----------
+    1) channeldata_path: (str) The file path to a local channeldata.json file
+
+    Returns:
+    ++++++++
+    1) (bool) True if the catalog is up to date, False otherwise
+    """
+
+    cat_path = catalog_path(channeldata_path)
+    if not os.path.exists(cat_path) or not os.path.exists(channeldata_path):
+        return False
+
+    try:
+        conn = sqlite3.connect(cat_path)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+    return meta.get("schema_version") == CATALOG_SCHEMA_VERSION and meta.get(
+        "source"
+    ) == source_stamp(channeldata_path)
+
+
+def refresh_catalog(channeldata_path):
+    """Method to rebuild the catalog for a channeldata.json file if it is out of date
+
+    refresh_catalog
+    ===============
+    This method is used to build the catalog for a channeldata.json file if the catalog is missing or out
+     of date. A catalog that can not be built (for any reason) is not an error, the channeldata.json file is used instead.
+
+    Parameters:
+    -----------
+    1) channeldata_path: (str) The file path to a local channeldata.json file
+
+    Returns:
+    ++++++++
+    1) (bool) True if an up to date catalog is available, False otherwise
+    """
+
+    if catalog_is_current(channeldata_path):
+        return True
+
+    try:
+        build_catalog(channeldata_path)
+    except Exception:
+        return False
+
+    return True
+
+
+def open_catalog(channeldata_path):
+    """Method to open the catalog for a channeldata.json file
+
+    open_catalog
+    ============
+    This method is used to get a Catalog object for a channeldata.json file. The catalog is built first if
+     it is missing or out of date.
+
+    Parameters:
+    -----------
+    1) channeldata_path: (str) The file path to a local channeldata.json file
+
+    Returns:
+    ++++++++
+    1) (Catalog) The catalog, or None if there is no catalog available
+    """
+
+    if not refresh_catalog(channeldata_path):
+        return None
+
+    try:
+        return Catalog(catalog_path(channeldata_path))
+    except sqlite3.Error:
+        return None
+
+
+class Catalog(object):
+    """
+    An indexed SQLite catalog of the packages in a ggd channel
+
+    The catalog answers single package queries without loading the full channeldata.json file.
+     Package entries are returned in the same form as the "packages" entries of the channeldata.json file.
+
+    Useful attributes:
+    * path: The file path of the catalog
+    """
+
+    def __init__(self, path):
+        self.path = path
+        ## The catalog is only read. A ggd search of all channels opens and uses each catalog in a worker thread
+        ##  (See search.search_all_channels) and later uses of the catalog can be in any thread
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._search_arrays = None
+        self._field_index = None
+
+    def close(self):
+        self.conn.close()
+
+    def get_package(self, name):
+        """Method to get the metadata for a single package
+
+        get_package
+        ===========
+        This method is used to get the channeldata entry for a package
+
+        Parameters:
+        -----------
+        1) name: (str) The name of the package
+
+        Returns:
+        ++++++++
+        1) (dict) The package metadata, or None if the package is not in the catalog
+        """
+
+        row = self.conn.execute(
+            "SELECT data FROM packages WHERE name = ?", (name,)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def has_package(self, name):
+        return (
+            self.conn.execute(
+                "SELECT 1 FROM packages WHERE name = ?", (name,)
+            ).fetchone()
+            is not None
+        )
+
+    def package_names(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM packages")]
+
+    def final_files(self, name):
+        return [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT file FROM final_files WHERE name = ?", (name,)
+            )
+        ]
+
+    @property
+    def source(self):
+        """
+        The stamp of the channeldata.json file the catalog was built from (see source_stamp)
+        """
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        return row[0] if row is not None else None
+
+    @property
+    def content_hash(self):
+        """
+        The sha256 hash of the contents of the channeldata.json file the catalog was built from
+        """
+
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'content_hash'"
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def search_arrays(self):
+        """
+        Method to get the arrays of the search index. (Loaded once for each Catalog object)
+        """
+
+        if self._search_arrays is None:
+            self._search_arrays = {}
+            for key, data in self.conn.execute("SELECT key, data FROM search_arrays"):
+                if key == "names":
+                    self._search_arrays[key] = json.loads(data)
+                elif key == "name_density":
+                    self._search_arrays[key] = bytes_array("d", data)
+                else:
+                    self._search_arrays[key] = int_array(data)
+        return self._search_arrays
+
+    def field_index(self):
+        """
+        Method to get the FieldIndex of the packages in the catalog. (Loaded once for each Catalog object)
+        """
+
+        if self._field_index is None:
+            self._field_index = FieldIndex.from_rows(
+                self.search_arrays()["names"],
+                self.conn.execute("SELECT field, value, bitmap FROM field_bitmaps"),
+            )
+        return self._field_index
+
+    def search_candidates(self, term, score_cutoff):
+        """Method to get the packages that could match a search term
+
+        search_candidates
+        =================
+        This method is used to get a small set of packages to score for a 'ggd search' term, using the bigram
+         index of the package names and keywords. Every package whose name partial_ratio score or keyword 
+         ratio score could reach the score cutoff is included, so scoring only the candidates gives the same 
+         results as scoring every package. (See search.search_packages)
+
+         Two strings that are e edits apart share all but at most 2 * e of the distinct bigrams of either 
+          string, and max_edits gives the largest e for a score cutoff. A package is a candidate if one of its 
+          strings shares enough bigrams with the term. For a name partial_ratio the shorter of the term and the 
+          name is scored against a part of the longer string of at most the same length. 
+
+         If the score cutoff is too low for the bigrams to rule out a package, None is returned and every
+          package should be scored.
+
+        Parameters:
+        -----------
+        1) term:         (str)   The lower case search term
+        2) score_cutoff: (float) The lowest score to keep (0 - 100)
+
+        Returns:
+        ++++++++
+        1) (dict) A dictionary with the candidate package names as keys and the position of the package in 
+                   the channeldata.json file as values, or None if every package should be scored
+        """
+
+        term_grams = bigrams(term)
+        length = len(term)
+        if not term_grams or len(term_grams) > MAX_SEARCH_GRAMS:
+            return None
+
+        min_ratio = (float(score_cutoff) - 0.5) / 100.0
+        if min_ratio <= 0:
+            return None
+
+        ## A name at least as long as the term, or a keyword, that shares no bigrams with the term could match
+        longest_keyword = int(math.floor(length * (2.0 - min_ratio) / min_ratio))
+        if len(term_grams) - 2 * max_edits(score_cutoff, 2 * length) <= 0:
+            return None
+        if len(term_grams) - 2 * max_edits(score_cutoff, length + longest_keyword) <= 0:
+            return None
+
+        index = self.search_arrays()
+        names = index["names"]
+        candidates = {}
+
+        ## Names shorter than the term with few distinct bigrams could match without sharing any bigrams.
+        ##  (grams <= 2 * max_edits(score_cutoff, 2 * length) <= 4 * (1 - min_ratio) * length)
+        last = bisect_right(index["name_density"], 4.0 * (1.0 - min_ratio) + 1e-9)
+        for token_id in index["name_tokens"][:last]:
+            if index["token_length"][token_id] < length:
+                pkg_order = index["token_pkg"][token_id]
+                candidates[names[pkg_order]] = pkg_order
+
+        ## Count the bigrams each indexed string shares with the term
+        gram_list = sorted(term_grams)
+        shared_grams = Counter()
+        for (tokens,) in self.conn.execute(
+            "SELECT tokens FROM search_grams WHERE gram IN ({})".format(
+                ", ".join("?" * len(gram_list))
+            ),
+            gram_list,
+        ):
+            shared_grams.update(int_array(tokens))
+
+        for token_id, shared in shared_grams.items():
+            pkg_order = index["token_pkg"][token_id]
+            if names[pkg_order] in candidates:
+                continue
+            token_length = index["token_length"][token_id]
+            token_grams = index["token_grams"][token_id]
+
+            if index["token_is_name"][token_id]:
+                ## partial_ratio: the shorter string against a part of the longer string
+                shorter_length, shorter_grams = (
+                    (length, len(term_grams))
+                    if length <= token_length
+                    else (token_length, token_grams)
+                )
+                if shared >= shorter_grams - 2 * max_edits(
+                    score_cutoff, 2 * shorter_length
+                ):
+                    candidates[names[pkg_order]] = pkg_order
+
+            else:
+                ## ratio: the term against the full keyword
+                if 200.0 * min(length, token_length) / (length + token_length) < (
+                    float(score_cutoff) - 0.5
+                ):
+                    continue
+                if shared >= max(len(term_grams), token_grams) - 2 * max_edits(
+                    score_cutoff, length + token_length
+                ):
+                    candidates[names[pkg_order]] = pkg_order
+
+        return candidates
+
+    def packages_by_identifier(self, key, value):
+        """Method to get the packages with a specific identifier
+
+        packages_by_identifier
+        ======================
+        This method is used to get the names of the packages with an identifier value. For example,
+         all packages with a "genome-build" of "hg19"
+
+        Parameters:
+        -----------
+        1) key:   (str) The identifier. (species or genome-build)
+        2) value: (str) The identifier value
+
+        Returns:
+        ++++++++
+        1) (list) The names of the matching packages
+        """
+
+        return [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT name FROM identifiers WHERE key = ? AND value = ?",
+                (key, value),
+            )
+        ]
+
+
+def field_values(pkg, field):
+    """
+    Method to get the values of one of the INDEX_FIELDS for a package entry, as a list of strings
+    """
+
+    value = pkg.get(INDEX_FIELDS[field], {}).get(field)
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(x) for x in value]
+    return [str(value)]
+
+
+def bitmap_from_bytes(data):
+    """
+    Method to get a bitmap (an int) from its little-endian bytes. (int.from_bytes is not available on Python 2)
+    """
+
+    return int(binascii.hexlify(bytes(bytearray(data))[::-1]) or b"0", 16)
+
+
+def bitmap_to_bytes(bitmap, length):
+    """
+    Method to get the little-endian bytes, length bytes long, of a bitmap (an int). (int.to_bytes is not available on Python 2)
+    """
+
+    return binascii.unhexlify("%0*x" % (length * 2, bitmap))[::-1]
+
+
+class FieldIndex(object):
+    """
+    A bitmap index of the packages in a ggd channel for each value of the INDEX_FIELDS
+
+    Each package has a position (its position in the channeldata.json file), and each field value has a 
+     bitmap (an int) with the bits of the packages with that value set. Filters are answered with bitwise
+     and/or of the bitmaps, without going through or copying the package entries.
+
+    Useful attributes:
+    * names:   The package names, in position order
+    * bitmaps: A dictionary with a key for each field, and a dictionary of value: bitmap as the value
+    """
+
+    def __init__(self, names, bitmaps):
+        self.names = names
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def from_packages(cls, packages):
+        """
+        Method to build the FieldIndex for the "packages" dictionary of a channeldata.json file
+        """
+
+        positions = dict((field, defaultdict(list)) for field in INDEX_FIELDS)
+        for position, pkg in enumerate(packages.values()):
+            for field in INDEX_FIELDS:
+                for value in field_values(pkg, field):
+                    positions[field][value].append(position)
+
+        bitmaps = {}
+        for field, values in positions.items():
+            bitmaps[field] = {}
+            for value, value_positions in values.items():
+                bits = bytearray(len(packages) // 8 + 1)
+                for position in value_positions:
+                    bits[position >> 3] |= 1 << (position & 7)
+                bitmaps[field][value] = bitmap_from_bytes(bits)
+
+        return cls(list(packages.keys()), bitmaps)
+
+    @classmethod
+    def from_rows(cls, names, rows):
+        """
+        Method to load a FieldIndex from the package names and the (field, value, bitmap) rows of a catalog
+        """
+
+        bitmaps = dict((field, {}) for field in INDEX_FIELDS)
+        for field, value, bitmap in rows:
+            bitmaps.setdefault(field, {})[value] = bitmap_from_bytes(bitmap)
+        return cls(names, bitmaps)
+
+    def to_rows(self):
+        return [
+            (
+                field,
+                value,
+                sqlite3.Binary(bitmap_to_bytes(bitmap, len(self.names) // 8 + 1)),
+            )
+            for field, values in self.bitmaps.items()
+            for value, bitmap in values.items()
+        ]
+
+    def select(self, field, match):
+        """Method to get the bitmap of the packages with a field value
+
+        select
+        ======
+        This method is used to get the bitmap of the packages that have a value of a field accepted by the
+         match function
+
+        Parameters:
+        -----------
+        1) field: (str)      One of the INDEX_FIELDS
+        2) match: (function) A function that takes a field value and returns True if the value is wanted
+
+        Returns:
+        ++++++++
+        1) (int) The bitmap of the packages
+        """
+
+        bitmap = 0
+        for value, value_bitmap in self.bitmaps.get(field, {}).items():
+            if match(value):
+                bitmap |= value_bitmap
+        return bitmap
+
+    def package_names(self, bitmap):
+        """
+        Method to get the names of the packages in a bitmap, in position order
+        """
+
+        bits = bin(bitmap)[:1:-1]
+        names = []
+        position = bits.find("1")
+        while position != -1:
+            names.append(self.names[position])
+            position = bits.find("1", position + 1)
+        return names
@@ -18,16 +18,6 @@ from .utils import (
     literal_block,
 )
 
-# ---------------------------------------------------------------------------------------------------
-# urlib setup based on system version
-# ---------------------------------------------------------------------------------------------------
-if sys.version_info[0] < 3:
-    import urllib
-
-    urlopen = urllib.urlopen
-else:
-    from urllib.request import urlopen
-
 # ---------------------------------------------------------------------------------------------------
 # Argument parser
 # ---------------------------------------------------------------------------------------------------
@@ -114,12 +104,11 @@ def conda_platform():
     ==============
     This method is used to identify the system platform being used. Building and install a data
      package is dependent on the system platform. (OSX, Linux, etc.) The system platform will
-     be returned.
+     be returned. (See utils.get_conda_context)
     """
+    from .utils import get_conda_context
 
-    vs = [x for x in check_output(["conda", "info"]).split("\n") if "platform :" in x]
-    assert len(vs) == 1, vs
-    return vs[0].split("platform :")[1].strip()
+    return get_conda_context().subdir
 
 
 def _build(path, recipe, debug=False):
@@ -419,6 +408,7 @@ def _check_build(species, build):
     1) True if gnome build is correct, raises an error otherwise 
 
     """
+    from . import transport
     from .utils import check_for_internet_connection, get_species
 
     if check_for_internet_connection():
@@ -435,9 +425,9 @@ def _check_build(species, build):
             )
 
         try:
-            ret = urlopen(gf)
-            if ret.getcode() >= 400:
-                raise Exception("%s at url: %s" % (ret.getcode(), gf))
+            ret = transport.get(gf)
+            if ret.status_code >= 400:
+                raise Exception("%s at url: %s" % (ret.status_code, gf))
         except:
             sys.stderr.write(
                 "ERROR: genome-build: %s not found in github repo for the %s species.\n"
@@ -0,0 +1,543 @@
+# -------------------------------------------------------------------------------------------------------------
+## Import Statements
+# -------------------------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import json
+import os
+import sys
+
+## Shell completion for the ggd command line (ggd-complete). Completion runs on every <TAB> press, so this
+##  module only uses the python standard library and the completion index files written when the channel
+##  metadata is updated (See write_name_index). It must not import conda, requests, or ggd.utils.
+##
+## bash: complete -o default -C ggd-complete ggd
+
+# -------------------------------------------------------------------------------------------------------------
+## Global Variables
+# -------------------------------------------------------------------------------------------------------------
+
+## The local ggd metadata dirs. (The same as utils.LOCAL_REPO_DIR, utils.CHANNEL_DATA_DIR,
+##  utils.GENOME_METADATA_DIR, and utils.CONDA_CONTEXT_CACHE)
+LOCAL_REPO_DIR = os.getenv("GGD_LOCAL", os.path.expanduser("~/.config/ggd-info/"))
+CHANNEL_DATA_DIR = os.path.join(LOCAL_REPO_DIR, "channeldata")
+GENOME_METADATA_DIR = os.path.join(LOCAL_REPO_DIR, "genome_metadata")
+CONDA_CONTEXT_CACHE = os.path.join(
+    LOCAL_REPO_DIR, "conda_context-{}.json".format(getattr(os, "getuid", int)())
+)
+
+## The completion index files of a channel, stored next to its channeldata.json file:
+##  * NAMES_FILE:  The package names, sorted, one per line
+##  * TRIE_FILE:   The prefix trie of the first TRIE_DEPTH characters of the names. Key = prefix, value = the
+##                  [start, end] byte range of the names with the prefix in NAMES_FILE
+##  * BKTREE_FILE: A BK-tree of the names by edit distance, for suggestions when a word has a typo. Stored as
+##                  int arrays, which are read without parsing (See BKTREE_ARRAYS)
+NAMES_FILE = "completion_names.txt"
+TRIE_FILE = "completion_trie.json"
+BKTREE_FILE = "completion_bktree.bin"
+TRIE_DEPTH = 3
+
+## The arrays of a BK-tree, in file order. The children of node i are child_node[child_start[i]:child_start[i + 1]],
+##  at the edit distances in child_distance. node_name is the index in NAMES_FILE of the name of each node
+BKTREE_ARRAYS = ["node_name", "child_start", "child_distance", "child_node"]
+
+## Typo suggestions are made for words with at least TYPO_MIN_LENGTH characters that no package name starts with
+TYPO_MIN_LENGTH = 3
+TYPO_MAX_DISTANCE = 3
+
+## The sub-commands that complete package names. Key = sub-command, value = the options the package name is
+##  given with, or None if the package names are positional arguments
+NAME_COMMANDS = {
+    "install": None,
+    "uninstall": None,
+    "get-files": None,
+    "pkg-info": None,
+    "predict-path": ["-pn", "--package-name"],
+}
+
+## Options of the NAME_COMMANDS that take a value, so the word after them is not a package name
+VALUE_OPTIONS = [
+    "-c",
+    "--channel",
+    "--prefix",
+    "--id",
+    "--file",
+    "-s",
+    "--species",
+    "-g",
+    "--genome-build",
+    "-v",
+    "--version",
+    "-p",
+    "--pattern",
+    "-fn",
+    "--file-name",
+    "-pn",
+    "--package-name",
+    "--format",
+    "--fields",
+]
+CHANNEL_OPTIONS = ["-c", "--channel"]
+
+
+# -------------------------------------------------------------------------------------------------------------
+## Functions/Methods
+# -------------------------------------------------------------------------------------------------------------
+
+
+def levenshtein(a, b):
+    """
+    Method to get the Levenshtein edit distance between two strings
+    """
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def edit_distance_function():
+    """
+    Method to get the function used for edit distances: python-Levenshtein if it is installed, levenshtein otherwise
+    """
+
+    try:
+        from Levenshtein import distance
+
+        return distance
+    except ImportError:
+        return levenshtein
+
+
+def build_bktree(names):
+    """Method to build a BK-tree of package names
+
+    build_bktree
+    ============
+    Method used to build a BK-tree, a tree where each child of a node is keyed by its edit distance to the node.
+     The names are added in a fixed shuffled order, which keeps the tree shallow for sorted names.
+
+    Parameters:
+    -----------
+    1) names: (list) The sorted package names
+
+    Returns:
+    ++++++++
+    1) (dict) key = each of the BKTREE_ARRAYS, value = the int array
+    """
+    import random
+    from array import array
+
+    edit_distance = edit_distance_function()
+    order = list(range(len(names)))
+    random.Random(0).shuffle(order)
+
+    children = []
+    for node_index, name_index in enumerate(order):
+        children.append({})
+        node = 0
+        while node_index > 0:
+            distance = edit_distance(names[name_index], names[order[node]])
+            if distance not in children[node]:
+                children[node][distance] = node_index
+                break
+            node = children[node][distance]
+
+    bktree = dict((x, array("i")) for x in BKTREE_ARRAYS)
+    bktree["node_name"].extend(order)
+    bktree["child_start"].append(0)
+    for node_children in children:
+        for distance, child in sorted(node_children.items()):
+            bktree["child_distance"].append(distance)
+            bktree["child_node"].append(child)
+        bktree["child_start"].append(len(bktree["child_node"]))
+
+    return bktree
+
+
+def array_bytes(values):
+    """
+    Method to get the bytes of an array. (array.tostring on Python 2. The same as catalog.array_bytes)
+    """
+
+    return values.tobytes() if hasattr(values, "tobytes") else values.tostring()
+
+
+def bytes_array(data):
+    """
+    Method to get an int array from bytes. (array.fromstring on Python 2. The same as catalog.bytes_array)
+    """
+    from array import array
+
+    values = array("i")
+    if hasattr(values, "frombytes"):
+        values.frombytes(data)
+    else:
+        values.fromstring(data)
+    return values
+
+
+def write_bktree(bktree, f):
+    """
+    Method to write a BK-tree to a binary file: the length of each of the BKTREE_ARRAYS, then the arrays
+    """
+    from array import array
+
+    f.write(array_bytes(array("i", [len(bktree[x]) for x in BKTREE_ARRAYS])))
+    for x in BKTREE_ARRAYS:
+        f.write(array_bytes(bktree[x]))
+
+
+def read_bktree(f):
+    """
+    Method to read a BK-tree written by write_bktree
+    """
+
+    from array import array
+
+    data = f.read()
+    itemsize = array("i").itemsize
+    lengths = bytes_array(data[0 : itemsize * len(BKTREE_ARRAYS)])
+
+    bktree = {}
+    offset = itemsize * len(BKTREE_ARRAYS)
+    for name, length in zip(BKTREE_ARRAYS, lengths):
+        bktree[name] = bytes_array(data[offset : offset + length * itemsize])
+        offset += length * itemsize
+    return bktree
+
+
+def search_bktree(bktree, names, word, max_distance):
+    """Method to find the package names within an edit distance of a word
+
+    search_bktree
+    =============
+    Method used to search a BK-tree from build_bktree. Only the children whose distance is within max_distance of
+     the distance between the word and their parent can have a match, so the others are skipped.
+
+    Parameters:
+    -----------
+    1) bktree:       (dict) The BK-tree
+    2) names:        (list) The package names the BK-tree was built from
+    3) word:         (str)  The word to find names for
+    4) max_distance: (int)  The largest edit distance to include
+
+    Returns:
+    ++++++++
+    1) (list) The (edit distance, name) of the matching names, closest first
+    """
+
+    edit_distance = edit_distance_function()
+    child_start = bktree["child_start"]
+    child_distance = bktree["child_distance"]
+    child_node = bktree["child_node"]
+
+    matches = []
+    to_check = [0] if bktree["node_name"] else []
+    while to_check:
+        node = to_check.pop()
+        name = names[bktree["node_name"][node]]
+        distance = edit_distance(word, name)
+        if distance <= max_distance:
+            matches.append((distance, name))
+        to_check.extend(
+            child_node[i]
+            for i in range(child_start[node], child_start[node + 1])
+            if abs(child_distance[i] - distance) <= max_distance
+        )
+
+    return sorted(matches)
+
+
+def write_name_index(channeldata_path, names):
+    """Method to write the completion index of a ggd channel
+
+    write_name_index
+    ================
+    Method used to write the completion index files (NAMES_FILE, TRIE_FILE, and BKTREE_FILE) next to a
+     channeldata.json file. It is run when the catalog of the channel is built (See catalog.build_catalog), so
+     the index is updated whenever the channel metadata is.
+
+    Parameters:
+    -----------
+    1) channeldata_path: (str)  The file path to the local channeldata.json file
+    2) names:            (list) The package names of the channel
+    """
+    from .utils import atomic_write
+
+    channel_dir = os.path.dirname(channeldata_path)
+    names = sorted(set(names))
+
+    ## The byte range of the names with each prefix. Names with a prefix are next to each other once sorted
+    trie = {}
+    offset = 0
+    lines = []
+    for name in names:
+        line = (name + "\n").encode("utf-8")
+        for depth in range(1, TRIE_DEPTH + 1):
+            prefix = name[:depth]
+            trie.setdefault(prefix, [offset, offset])[1] = offset + len(line)
+        lines.append(line)
+        offset += len(line)
+
+    with atomic_write(os.path.join(channel_dir, NAMES_FILE), "wb") as f:
+        f.write(b"".join(lines))
+    with atomic_write(os.path.join(channel_dir, BKTREE_FILE), "wb") as f:
+        write_bktree(build_bktree(names), f)
+    with atomic_write(os.path.join(channel_dir, TRIE_FILE)) as f:
+        json.dump(trie, f, separators=(",", ":"))
+
+
+def package_names(channel, prefix=""):
+    """Method to get the package names of a channel that start with a prefix
+
+    package_names
+    =============
+    Method used to look up the prefix in the prefix trie of the channel and read only the names with the same
+     first TRIE_DEPTH characters from NAMES_FILE.
+
+    Parameters:
+    -----------
+    1) channel: (str) The ggd channel
+    2) prefix:  (str) The start of the package name. (Default = "", every name)
+
+    Returns:
+    ++++++++
+    1) (list) The sorted package names, or an empty list if there is no completion index for the channel
+    """
+
+    channel_dir = os.path.join(CHANNEL_DATA_DIR, channel)
+    try:
+        if prefix:
+            with open(os.path.join(channel_dir, TRIE_FILE)) as f:
+                byte_range = json.load(f).get(prefix[:TRIE_DEPTH])
+            if byte_range is None:
+                return []
+        with open(os.path.join(channel_dir, NAMES_FILE), "rb") as f:
+            if prefix:
+                f.seek(byte_range[0])
+                data = f.read(byte_range[1] - byte_range[0])
+            else:
+                data = f.read()
+    except (IOError, OSError, ValueError):
+        return []
+
+    names = data.decode("utf-8").splitlines()
+    return [x for x in names if x.startswith(prefix)] if prefix else names
+
+
+def typo_suggestions(channel, word):
+    """Method to get the package names of a channel that are a few edits away from a word
+
+    typo_suggestions
+    ================
+    Method used to search the BK-tree of the channel for the closest names within TYPO_MAX_DISTANCE edits of the
+     word. Longer words are allowed more edits. (One edit for every five characters) Only the names with the
+     fewest edits are suggested, so a single close name replaces the mistyped word.
+
+    Parameters:
+    -----------
+    1) channel: (str) The ggd channel
+    2) word:    (str) The mistyped package name
+
+    Returns:
+    ++++++++
+    1) (list) The closest package names, or an empty list if there are none or there is no completion index
+    """
+
+    channel_dir = os.path.join(CHANNEL_DATA_DIR, channel)
+    try:
+        with open(os.path.join(channel_dir, BKTREE_FILE), "rb") as f:
+            bktree = read_bktree(f)
+    except (IOError, OSError, ValueError):
+        return []
+
+    matches = search_bktree(
+        bktree,
+        package_names(channel),
+        word,
+        min(TYPO_MAX_DISTANCE, max(1, len(word) // 5)),
+    )
+    return [name for distance, name in matches if distance == matches[0][0]]
+
+
+def conda_root_prefix():
+    """
+    Method to get the conda root without conda: from the conda settings cached by ggd (See utils.get_conda_context),
+     the CONDA_EXE environment variable, or the python prefix
+    """
+
+    try:
+        with open(CONDA_CONTEXT_CACHE) as c:
+            if not hasattr(os, "getuid") or os.fstat(c.fileno()).st_uid == os.getuid():
+                return json.load(c)["root_prefix"]
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        pass
+
+    if os.environ.get("CONDA_EXE"):
+        return os.path.dirname(os.path.dirname(os.environ["CONDA_EXE"]))
+
+    return sys.prefix
+
+
+def sub_dirs(dir_path):
+    """
+    Method to get the (name, path) of each dir in a dir, without os.scandir on Python 2. (The same as utils.sub_dirs)
+    """
+
+    if hasattr(os, "scandir"):
+        return [(x.name, x.path) for x in os.scandir(dir_path) if x.is_dir()]
+
+    return [
+        (name, os.path.join(dir_path, name))
+        for name in os.listdir(dir_path)
+        if os.path.isdir(os.path.join(dir_path, name))
+    ]
+
+
+def installed_package_names(prefix=None):
+    """Method to get the names of the installed ggd data packages
+
+    installed_package_names
+    =======================
+    Method used to get the package names from the <prefix>/share/ggd/<species>/<build>/<pkg> dirs. (See
+     utils.installed_data_packages)
+
+    Parameters:
+    -----------
+    1) prefix: (str) The conda prefix. (Default = None, the conda root. See conda_root_prefix)
+
+    Returns:
+    ++++++++
+    1) (list) The sorted package names
+    """
+
+    prefix = prefix if prefix != None else conda_root_prefix()
+
+    level = [os.path.join(prefix, "share", "ggd")]
+    for depth in range(2):
+        next_level = []
+        for dir_path in level:
+            try:
+                next_level.extend(path for name, path in sub_dirs(dir_path))
+            except OSError:
+                continue
+        level = next_level
+
+    names = set()
+    for dir_path in level:
+        try:
+            names.update(name for name, path in sub_dirs(dir_path))
+        except OSError:
+            continue
+
+    return sorted(names)
+
+
+def ggd_channels():
+    """
+    Method to get the ggd channels from the local ggd_channels.json file. (See utils.get_ggd_channels)
+    """
+
+    try:
+        with open(os.path.join(GENOME_METADATA_DIR, "ggd_channels.json")) as f:
+            return json.load(f)["channels"]
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def complete(words, current):
+    """Method to get the completions of a word of a ggd command
+
+    complete
+    ========
+    Method used to complete the sub-command, a channel after -c/--channel, or a package name:
+     * uninstall: the installed ggd data packages
+     * install, get-files, pkg-info, and predict-path -pn: the packages of the channel (-c/--channel, Default =
+        genomics) that start with the word. If none do, the packages a few edits away (See typo_suggestions)
+
+    Parameters:
+    -----------
+    1) words:   (list) The words of the command line before the word being completed. (Example: ["ggd", "install"])
+    2) current: (str)  The word being completed
+
+    Returns:
+    ++++++++
+    1) (list) The completions
+    """
+
+    ## The sub-command
+    if len(words) < 2:
+        from .__main__ import SUB_COMMANDS
+
+        return [x[0] for x in SUB_COMMANDS if x[0].startswith(current)]
+
+    command = words[1]
+    if command not in NAME_COMMANDS or current.startswith("-"):
+        return []
+
+    previous = words[-1]
+    if previous in CHANNEL_OPTIONS:
+        return [x for x in ggd_channels() if x.startswith(current)]
+
+    ## Only complete package names where the sub-command takes them
+    name_options = NAME_COMMANDS[command]
+    if name_options is not None and previous not in name_options:
+        return []
+    if name_options is None and previous in VALUE_OPTIONS:
+        return []
+
+    if command == "uninstall":
+        return [x for x in installed_package_names() if x.startswith(current)]
+
+    channel = "genomics"
+    for i, word in enumerate(words[:-1]):
+        if word in CHANNEL_OPTIONS:
+            channel = words[i + 1]
+        elif word.startswith("--channel="):
+            channel = word.split("=", 1)[1]
+
+    names = package_names(channel, current)
+    if not names and len(current) >= TYPO_MIN_LENGTH:
+        names = typo_suggestions(channel, current)
+    return names
+
+
+def main(args=None):
+    """Main method for ggd-complete
+
+    main
+    ====
+    Bash runs ggd-complete with the command name, the word being completed, and the word before it as arguments,
+     and the command line in COMP_LINE and COMP_POINT (complete -C). The completions are printed one per line.
+     Other shells (or a test) can give the command line with --line "<command line>" instead.
+    """
+
+    args = sys.argv[1:] if args == None else args
+
+    if len(args) == 2 and args[0] == "--line":
+        line = args[1]
+    else:
+        line = os.environ.get("COMP_LINE", "")
+        line = line[0 : int(os.environ.get("COMP_POINT", len(line)))]
+
+    words = line.split()
+    current = "" if not words or line[-1:].isspace() else words.pop()
+
+    for completion in complete(words, current):
+        print(completion)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
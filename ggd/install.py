@@ -3,7 +3,6 @@
 # -------------------------------------------------------------------------------------------------------------
 from __future__ import print_function
 
-import glob
 import os
 import shutil
 import subprocess as sp
@@ -11,12 +10,13 @@ import sys
 import traceback
 
 from .utils import (
+    channel_choices,
     check_for_meta_recipes,
     conda_root,
     extract_metarecipe_recipe_from_bz2,
-    get_ggd_channels,
     get_meta_recipe_pkg,
     get_repodata,
+    lazy_choice,
 )
 
 
@@ -34,7 +34,7 @@ def add_install(p):
         "-c",
         "--channel",
         default="genomics",
-        choices=get_ggd_channels(),
+        type=lazy_choice(channel_choices, default="genomics"),
         help="The ggd channel the desired recipe is stored in. (Default = genomics)",
     )
     c.add_argument(
@@ -95,13 +95,11 @@ def check_ggd_recipe(ggd_recipe, ggd_channel):
     or 
     2) None if the recipe does not exists in the channel
     """
-    from .search import load_json_from_url, search_packages
-    from .utils import get_channeldata_url
+    from .search import search_packages
+    from .utils import load_channeldata
 
-    CHANNEL_DATA_URL = get_channeldata_url(ggd_channel)
-
-    ## Get ggd repodata
-    jdict = load_json_from_url(CHANNEL_DATA_URL)
+    ## Get ggd channel metadata
+    jdict = load_channeldata(ggd_channel).copy()
 
     ## Remove the ggd key if it exists
     ggd_key = jdict["packages"].pop("ggd", None)
@@ -125,7 +123,7 @@ def check_ggd_recipe(ggd_recipe, ggd_channel):
         return None
 
 
-def check_if_installed(ggd_recipe, ggd_jdict, prefix=None):
+def check_if_installed(ggd_recipe, ggd_jdict, prefix=None, installed=None):
     """Method to check if the recipe has already been installed and is in the conda ggd storage path. 
         
     check_if_installed
@@ -138,6 +136,8 @@ def check_if_installed(ggd_recipe, ggd_jdict, prefix=None):
     1) ggd_recipe: (list) The name of a recipe to check if it is installed or not
     2) ggd_jdict:  (dict) The channel specific metadata file as a dictionary 
     3) prefix:     (str)  The prefix/conda environment to check in
+    4) installed:  (dict) The installed data packages of the prefix from utils.installed_data_packages. Pass it in
+                           when checking many packages. (Default = None, scan the prefix)
     
     Returns:
     ++++++++
@@ -151,9 +151,13 @@ def check_if_installed(ggd_recipe, ggd_jdict, prefix=None):
 
     CONDA_ROOT = prefix if prefix != None else conda_root()
 
+    if installed is None:
+        from .utils import installed_data_packages
+
+        installed = installed_data_packages(CONDA_ROOT)
+
     path = os.path.join(CONDA_ROOT, "share", "ggd", species, build, ggd_recipe, version)
-    recipe_exists = glob.glob(path)
-    if recipe_exists:
+    if (species, build, ggd_recipe, version) in installed:
         print("\n:ggd:install: '%s' is already installed." % ggd_recipe)
         print(":ggd:install:\t You can find %s here: %s\n" % (ggd_recipe, path))
         return True
@@ -395,6 +399,7 @@ def conda_install(
     from .utils import (
         ChecksumError,
         get_required_conda_version,
+        offline_mode,
         update_installed_pkg_metadata,
     )
 
@@ -423,6 +428,10 @@ def conda_install(
             + [conda_install_str]
         )
 
+        ## Only use the local conda package cache in offline mode. (See 'ggd bundle import')
+        if offline_mode():
+            command.append("--offline")
+
         if meta_recipe:
 
             ## Update command
@@ -659,7 +668,7 @@ def get_file_locations(ggd_recipes, ggd_jdict, prefix=None):
 
 
 def install_checksum(
-    pkg_names, ggd_jdict, prefix=conda_root(), meta_recipe=False, meta_recipe_name=""
+    pkg_names, ggd_jdict, prefix=None, meta_recipe=False, meta_recipe_name=""
 ):
     """Method to check the md5sums of the installed files against the metadata md5sums
 
@@ -672,7 +681,7 @@ def install_checksum(
     -----------
     1) pkg_names:        (list) A list of the package names that were installed
     2) ggd_jdict:        (dict) ggd channel metadata as a dictionary 
-    3) prefix:           (str)  The prefix the packages were installed into
+    3) prefix:           (str)  The prefix the packages were installed into (Default = None, the conda root)
     4) meta_recipe:      (bool) Whether or not the pkg is a meta-recipe or not
     8) meta_recipe_name: (str)  The name of the meta recipe if one exists
 
@@ -685,12 +694,15 @@ def install_checksum(
 
     from .utils import (
         ChecksumError,
+        conda_pkg_path,
         data_file_checksum,
         get_checksum_dict_from_tar,
         get_conda_package_list,
         get_meta_recipe_checksum,
     )
 
+    prefix = prefix if prefix != None else conda_root()
+
     print("\n:ggd:install: Initiating data file content validation using checksum")
     data_packages = get_conda_package_list(prefix, include_local=True)
     for pkg_name in pkg_names:
@@ -699,8 +711,8 @@ def install_checksum(
         ## Get the file paths for the tar file and package
         version = str(data_packages[pkg_name]["version"])
         build = str(data_packages[pkg_name]["build"])
-        tarfile_path = os.path.join(
-            prefix, "pkgs", "{}-{}-{}.tar.bz2".format(pkg_name, version, build)
+        tarfile_path = conda_pkg_path(
+            "{}-{}-{}.tar.bz2".format(pkg_name, version, build), prefix
         )
         ## Check if checksum file exists
         with tarfile.open(tarfile_path, mode="r|bz2") as tar:
@@ -780,7 +792,7 @@ def copy_pkg_files_to_prefix(prefix, pkg_names, meta_recipe=False):
     False: If files were not copied (due to the prefix being the same as the current conda environment)
     Exception: If copying failed
     """
-    from .utils import get_conda_package_list
+    from .utils import conda_pkg_path, get_conda_package_list
 
     CONDA_ROOT = conda_root()
 
@@ -800,11 +812,11 @@ def copy_pkg_files_to_prefix(prefix, pkg_names, meta_recipe=False):
         version = str(data_packages[pkg_name]["version"])
         build = str(data_packages[pkg_name]["build"])
 
-        tarfile_path = os.path.join(
-            CONDA_ROOT, "pkgs", "{}-{}-{}.tar.bz2".format(pkg_name, version, build)
+        tarfile_path = conda_pkg_path(
+            "{}-{}-{}.tar.bz2".format(pkg_name, version, build), CONDA_ROOT
         )
-        pkg_path = os.path.join(
-            CONDA_ROOT, "pkgs", "{}-{}-{}".format(pkg_name, version, build)
+        pkg_path = conda_pkg_path(
+            "{}-{}-{}".format(pkg_name, version, build), CONDA_ROOT
         )
 
         ## Copy files to new location
@@ -833,7 +845,16 @@ def install(parser, args):
         )
 
     ## Check the prefix is a real one
-    from .utils import get_conda_prefix_path, prefix_in_conda
+    from .utils import (
+        get_conda_prefix_path,
+        installed_data_packages,
+        offline_mode,
+        prefix_in_conda,
+    )
+
+    ## Have conda use the local package cache only in offline mode. (See 'ggd bundle import')
+    if offline_mode():
+        os.environ["CONDA_OFFLINE"] = "true"
 
     diff_prefix = False
     if args.prefix != None:
@@ -860,6 +881,9 @@ def install(parser, args):
 
     pkg_list = list(filter(None, pkg_list))
 
+    ## The installed data packages of the prefix. Scanned once for all packages
+    installed = installed_data_packages(conda_prefix)
+
     ## Check each package
     install_list = []
     is_metarecipe = False
@@ -916,7 +940,7 @@ def install(parser, args):
             ggd_jsonDict["packages"][new_recipe_name] = ggd_jsonDict["packages"][pkg]
 
             ## Check if already installed
-            if check_if_installed(new_recipe_name, ggd_jsonDict, conda_prefix):
+            if check_if_installed(new_recipe_name, ggd_jsonDict, conda_prefix, installed):
                 continue
 
             ## Download the meta recipe pkg
@@ -1003,7 +1027,7 @@ def install(parser, args):
             ).format(pkg)
 
         ## Check if the recipe is already installed
-        if check_if_installed(pkg, ggd_jsonDict, conda_prefix) == False:
+        if check_if_installed(pkg, ggd_jsonDict, conda_prefix, installed) == False:
             install_list.append(pkg)
         else:
             continue
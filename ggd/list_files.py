@@ -7,10 +7,16 @@ import os
 import sys
 
 from .list_installed_pkgs import GGD_INFO, METADATA, get_metadata
-from .utils import get_builds, get_ggd_channels, get_species
+from .output import add_output_arguments
+from .utils import build_choices, channel_choices, lazy_choice, species_choices
+
+# -------------------------------------------------------------------------------------------------------------
+## Global Variables
+# -------------------------------------------------------------------------------------------------------------
+
+## The fields of each data file in json, jsonl, and tsv output (See data_file_fields)
+FILES_OUTPUT_FIELDS = ["name", "species", "genome-build", "version", "file"]
 
-SPECIES_LIST = sorted(get_species())
-GENOME_BUILDS = sorted(get_builds("*"))
 
 # -------------------------------------------------------------------------------------------------------------
 ## Argument Parser
@@ -26,19 +32,19 @@ def add_list_files(p):
         "-c",
         "--channel",
         default="genomics",
-        choices=get_ggd_channels(),
+        type=lazy_choice(channel_choices, default="genomics"),
         help="The ggd channel of the recipe to find. (Default = genomics)",
     )
     c.add_argument(
         "-s",
         "--species",
         help="(Optional) species recipe is for. Use '*' for any species",
-        choices=[str(x) for x in SPECIES_LIST],
+        type=lazy_choice(species_choices),
     )
     c.add_argument(
         "-g",
         "--genome-build",
-        choices=[str(x) for x in GENOME_BUILDS],
+        type=lazy_choice(build_choices),
         help="(Optional) genome build the recipe is for. Use '*' for any genome build.",
     )
     c.add_argument(
@@ -57,6 +63,7 @@ def add_list_files(p):
         help="(Optional) The name or the full directory path to an conda environment where a ggd recipe is stored. (Only needed if not getting file paths for files in the current conda environment)",
     )
     c.add_argument("name", help="recipe name")
+    add_output_arguments(c, FILES_OUTPUT_FIELDS)
     c.set_defaults(func=list_files)
 
 
@@ -100,12 +107,8 @@ def in_ggd_channel(
         2) the channel specific dictionary of packages
     """
 
-    from .search import load_json, load_json_from_url, search_packages
-    from .utils import (
-        check_for_internet_connection,
-        get_channel_data,
-        get_channeldata_url,
-    )
+    from .search import search_packages
+    from .utils import load_channeldata
 
     def get_local_pkg_dict():
         """
@@ -148,22 +151,33 @@ def in_ggd_channel(
 
         return package_list
 
-    json_dict = {"channeldata_version": 1, "packages": {}}
-    if check_for_internet_connection(3):
-        CHANNELDATA_URL = get_channeldata_url(ggd_channel)
-        json_dict = load_json_from_url(CHANNELDATA_URL)
+    channeldata = load_channeldata(ggd_channel)
 
-        ## Remove the ggd key if it exists
-        ggd_key = json_dict["packages"].pop("ggd", None)
+    ## Look up the recipes in the channel catalog. If they are all found the channel does not need to be searched
+    found_pkgs = dict(
+        (recipe, channeldata.get_package(recipe))
+        for recipe in ggd_recipes
+        if recipe != "ggd"
+    )
+    if found_pkgs and all(
+        found_pkgs.get(recipe) is not None for recipe in ggd_recipes
+    ):
+        if return_pkg_list:
+            return (
+                list(ggd_recipes),
+                {"channeldata_version": 1, "packages": found_pkgs},
+            )
+        else:
+            species = found_pkgs[ggd_recipes[0]]["identifiers"]["species"]
+            build = found_pkgs[ggd_recipes[0]]["identifiers"]["genome-build"]
+            version = found_pkgs[ggd_recipes[0]]["version"]
+            return (species, build, version)
 
-    else:
-        try:
-            ## If no internet connection just load from the local file
-            json_dict = load_json(get_channel_data(ggd_channel))
-            ## Remove the ggd key if it exists
-            ggd_key = json_dict["packages"].pop("ggd", None)
-        except:
-            pass
+    ## Load the channel metadata. (The local file is used if there is no internet connection)
+    json_dict = channeldata.copy()
+
+    ## Remove the ggd key if it exists
+    ggd_key = json_dict["packages"].pop("ggd", None)
 
     ## Get a list of pkgs from the json dict
     package_list = get_package_list(json_dict)
@@ -195,11 +209,50 @@ def in_ggd_channel(
         sys.exit(2)
 
 
+def data_file_fields(C_ROOT):
+    """Method to get the functions that build each field of a data file for json, jsonl, and tsv output
+
+    data_file_fields
+    ================
+    Each function takes the path of an installed data file, <C_ROOT>/share/ggd/<species>/<build>/<name>/<version>/<file>,
+     and returns the value of one field. Only the fields requested with --fields are built (See output.iter_records).
+
+    Parameters:
+    -----------
+    1) C_ROOT: (str) The file path to the conda root/prefix the files are installed in
+
+    Returns:
+    ++++++++
+    1) (dict) key = field name from FILES_OUTPUT_FIELDS, value = a function of the file path
+    """
+
+    ggd_dir = os.path.join(C_ROOT, "share", "ggd")
+
+    def path_part(i):
+        return lambda file_path: os.path.relpath(file_path, ggd_dir).split(os.sep)[i]
+
+    field_getters = {
+        "name": path_part(2),
+        "species": path_part(0),
+        "genome-build": path_part(1),
+        "version": path_part(3),
+        "file": lambda file_path: file_path,
+    }
+
+    return dict((field, field_getters[field]) for field in FILES_OUTPUT_FIELDS)
+
+
 def list_files(parser, args):
     """Main method. Method used to list files for an installed ggd-recipe"""
 
     import glob
 
+    from .output import (
+        diagnostics_to_stderr,
+        iter_records,
+        select_fields,
+        write_records,
+    )
     from .utils import (
         conda_root,
         get_conda_prefix_path,
@@ -207,32 +260,50 @@ def list_files(parser, args):
         validate_build,
     )
 
-    CONDA_ROOT = (
-        get_conda_prefix_path(args.prefix)
-        if args.prefix != None and prefix_in_conda(args.prefix)
-        else conda_root()
-    )
+    ## Args built by other callers (without the command line parser) may not have the output options
+    output_format = getattr(args, "format", "text")
+    output_fields = getattr(args, "fields", None)
 
-    name = args.name
-    channeldata_species, channeldata_build, channeldata_version = in_ggd_channel(
-        [args.name], args.channel, CONDA_ROOT
-    )
-    species = args.species if args.species else channeldata_species
-    build = args.genome_build if args.genome_build else channeldata_build
-    if not validate_build(build, species):
-        sys.exit(3)
-    version = args.version if args.version else "*"
-    pattern = args.pattern if args.pattern else "*"
-
-    path = os.path.join(
-        CONDA_ROOT, "share", "ggd", species, build, name, version, pattern
-    )
-    files = glob.glob(path)
-    if files:
-        print("\n".join(files))
-    else:
-        print(
-            "\n:ggd:get-files: No matching files found for %s" % args.name,
-            file=sys.stderr,
+    with diagnostics_to_stderr(output_format) as out:
+        ## Check the requested output fields
+        if output_format != "text":
+            fields = select_fields(
+                output_fields, dict((x, None) for x in FILES_OUTPUT_FIELDS), "get-files"
+            )
+
+        CONDA_ROOT = (
+            get_conda_prefix_path(args.prefix)
+            if args.prefix != None and prefix_in_conda(args.prefix)
+            else conda_root()
+        )
+
+        name = args.name
+        channeldata_species, channeldata_build, channeldata_version = in_ggd_channel(
+            [args.name], args.channel, CONDA_ROOT
+        )
+        species = args.species if args.species else channeldata_species
+        build = args.genome_build if args.genome_build else channeldata_build
+        if not validate_build(build, species):
+            sys.exit(3)
+        version = args.version if args.version else "*"
+        pattern = args.pattern if args.pattern else "*"
+
+        path = os.path.join(
+            CONDA_ROOT, "share", "ggd", species, build, name, version, pattern
         )
-        sys.exit(1)
+        files = glob.glob(path)
+        if files and output_format != "text":
+            write_records(
+                iter_records(files, data_file_fields(CONDA_ROOT), fields),
+                fields,
+                output_format,
+                out,
+            )
+        elif files:
+            print("\n".join(files))
+        else:
+            print(
+                "\n:ggd:get-files: No matching files found for %s" % args.name,
+                file=sys.stderr,
+            )
+            sys.exit(1)
@@ -8,9 +8,22 @@ import os
 import re
 import sys
 
+from .output import add_output_arguments
+
 GGD_INFO = "share/ggd_info"
 METADATA = "channeldata.json"
 
+## The fields of each installed package in json, jsonl, and tsv output (See installed_pkg_fields)
+LIST_OUTPUT_FIELDS = [
+    "name",
+    "version",
+    "build",
+    "channel",
+    "in-conda",
+    "environment-variables",
+    "prefix",
+]
+
 # -------------------------------------------------------------------------------------------------------------
 ## Argument Parser
 # -------------------------------------------------------------------------------------------------------------
@@ -34,6 +47,7 @@ def add_list_installed_packages(p):
         help="(Optional) The name or the full directory path to a conda environment where a ggd recipe is stored. (Only needed if listing data files not in the current environment)",
     )
     c.add_argument("--reset", action="store_true", help=argparse.SUPPRESS)
+    add_output_arguments(c, LIST_OUTPUT_FIELDS)
     c.set_defaults(func=list_installed_packages)
 
 
@@ -212,6 +226,49 @@ def list_pkg_info(pkg_names, pkgs_dict, env_vars, conda_list, prefix, prefix_set
         )
 
 
+def installed_pkg_fields(pkgs_dict, env_vars, conda_list, prefix):
+    """Method to get the functions that build each field of an installed package for json, jsonl, and tsv output
+
+    installed_pkg_fields
+    ====================
+    Each function takes a pkg name and returns the value of one field. Only the fields requested with --fields
+     are built (See output.iter_records).
+
+    Parameters:
+    -----------
+    1) pkgs_dict:  (dict) The ggd_info metadata file as a dictionary (To get version and channel info)
+    2) env_vars:   (dict) A dictionary of environment variables. (Key = env_var name, value = path to file/dir)
+    3) conda_list: (dict) A dictionary representing conda list output (from utils.get_conda_package_list())
+    4) prefix:     (str)  The prefix/conda environment the packages are installed in
+
+    Returns:
+    ++++++++
+    1) (dict) key = field name from LIST_OUTPUT_FIELDS, value = a function of the pkg name
+    """
+
+    env_vars = env_vars if env_vars != None else {}
+
+    def environment_variables(pkg):
+        var_name = "ggd_" + pkg.replace("-", "_").replace(".", "_")
+        return [
+            var_name + suffix
+            for suffix in ["_dir", "_file"]
+            if var_name + suffix in env_vars
+        ]
+
+    field_getters = {
+        "name": lambda pkg: pkg,
+        "version": lambda pkg: pkgs_dict[pkg]["version"],
+        "build": lambda pkg: conda_list[pkg]["build"] if pkg in conda_list else None,
+        "channel": lambda pkg: "ggd-" + pkgs_dict[pkg]["tags"]["ggd-channel"],
+        "in-conda": lambda pkg: pkg in conda_list,
+        "environment-variables": environment_variables,
+        "prefix": lambda pkg: prefix,
+    }
+
+    return dict((field, field_getters[field]) for field in LIST_OUTPUT_FIELDS)
+
+
 def get_metadata(C_ROOT, GGD_INFO_DIR, METADATA_FILE):
     """
     get_metadata
@@ -248,6 +305,12 @@ def list_installed_packages(parser, args):
      from conda info, filter results based on user specified pattern, and provide the information to the display function.
     """
 
+    from .output import (
+        diagnostics_to_stderr,
+        iter_records,
+        select_fields,
+        write_records,
+    )
     from .utils import (
         conda_root,
         get_conda_package_list,
@@ -256,74 +319,101 @@ def list_installed_packages(parser, args):
         update_installed_pkg_metadata,
     )
 
-    ## Check prefix
-    CONDA_ROOT = (
-        get_conda_prefix_path(args.prefix)
-        if args.prefix != None and prefix_in_conda(args.prefix)
-        else conda_root()
-    )
+    ## Args built by other callers (without the command line parser) may not have the output options
+    output_format = getattr(args, "format", "text")
+    output_fields = getattr(args, "fields", None)
 
-    ## If reset list
-    if args.reset:
-        print(
-            "\n:ggd:list: The --reset flag was set. RESETTING ggd installed list metadata."
-        )
-        update_installed_pkg_metadata(args.prefix)
-        print(
-            "\n:ggd:list: Run 'ggd list' without --reset to see a list of installed ggd data packages"
-        )
-        print("\nDONE\n")
-        sys.exit(0)
-
-    ggd_info_path = os.path.join(CONDA_ROOT, GGD_INFO)
-
-    ## Check that the ggd info dir exists. If not, create it
-    if not os.path.isdir(ggd_info_path):
-        update_installed_pkg_metadata(prefix=CONDA_ROOT)
-
-    ## Load json metadata data as dictionary
-    # metadata = load_json(os.path.join(CONDA_ROOT, GGD_INFO, METADATA))
-    metadata = get_metadata(CONDA_ROOT, GGD_INFO, METADATA)
-
-    ## Get the environment variables
-    env_vars = get_environment_variables(CONDA_ROOT)
-
-    ## Get conda package list
-    ggd_packages = get_conda_package_list(CONDA_ROOT)
-
-    ## Get final package list
-    final_package_list = metadata["packages"].keys()
-
-    ## Check if there is a user defined pattern
-    pat = args.pattern if args.pattern != None else None
-    if pat != None:
-        matches = list(
-            map(
-                str,
-                [
-                    re.search(".*" + pat.lower() + ".*", x).group()
-                    for x in metadata["packages"].keys()
-                    if re.search(pat.lower(), x) != None
-                ],
+    with diagnostics_to_stderr(output_format) as out:
+        ## Check the requested output fields
+        if output_format != "text":
+            fields = select_fields(
+                output_fields, dict((x, None) for x in LIST_OUTPUT_FIELDS), "list"
             )
+
+        ## Check prefix
+        CONDA_ROOT = (
+            get_conda_prefix_path(args.prefix)
+            if args.prefix != None and prefix_in_conda(args.prefix)
+            else conda_root()
         )
-        if len(matches) < 1:
-            # print("\n-> '{p}' did not match any installed data packages".format(p=args.pattern))
-            sys.exit(
-                "\n:ggd:list: '{p}' did not match any installed data packages".format(
-                    p=args.pattern
+
+        ## If reset list
+        if args.reset:
+            print(
+                "\n:ggd:list: The --reset flag was set. RESETTING ggd installed list metadata."
+            )
+            update_installed_pkg_metadata(args.prefix)
+            print(
+                "\n:ggd:list: Run 'ggd list' without --reset to see a list of installed ggd data packages"
+            )
+            print("\nDONE\n")
+            sys.exit(0)
+
+        ggd_info_path = os.path.join(CONDA_ROOT, GGD_INFO)
+
+        ## Check that the ggd info dir exists. If not, create it
+        if not os.path.isdir(ggd_info_path):
+            update_installed_pkg_metadata(prefix=CONDA_ROOT)
+
+        ## Load json metadata data as dictionary
+        # metadata = load_json(os.path.join(CONDA_ROOT, GGD_INFO, METADATA))
+        metadata = get_metadata(CONDA_ROOT, GGD_INFO, METADATA)
+
+        ## Get the environment variables
+        env_vars = get_environment_variables(CONDA_ROOT)
+
+        ## Get conda package list
+        ggd_packages = get_conda_package_list(CONDA_ROOT)
+
+        ## Get final package list
+        final_package_list = metadata["packages"].keys()
+
+        ## Check if there is a user defined pattern
+        pat = args.pattern if args.pattern != None else None
+        if pat != None:
+            matches = list(
+                map(
+                    str,
+                    [
+                        re.search(".*" + pat.lower() + ".*", x).group()
+                        for x in metadata["packages"].keys()
+                        if re.search(pat.lower(), x) != None
+                    ],
                 )
             )
-            # sys.exit(0)
-        else:
-            final_package_list = matches
-
-    ## Provide the results to stdout
-    list_pkg_info(
-        final_package_list,
-        metadata["packages"],
-        env_vars,
-        ggd_packages,
-        CONDA_ROOT,
-        prefix_set=False if args.prefix == None else True,
-    )
+            if len(matches) < 1:
+                # print("\n-> '{p}' did not match any installed data packages".format(p=args.pattern))
+                sys.exit(
+                    "\n:ggd:list: '{p}' did not match any installed data packages".format(
+                        p=args.pattern
+                    )
+                )
+                # sys.exit(0)
+            else:
+                final_package_list = matches
+
+        ## Stream the results in a machine-readable format
+        if output_format != "text":
+            write_records(
+                iter_records(
+                    final_package_list,
+                    installed_pkg_fields(
+                        metadata["packages"], env_vars, ggd_packages, CONDA_ROOT
+                    ),
+                    fields,
+                ),
+                fields,
+                output_format,
+                out,
+            )
+            return
+
+        ## Provide the results to stdout
+        list_pkg_info(
+            final_package_list,
+            metadata["packages"],
+            env_vars,
+            ggd_packages,
+            CONDA_ROOT,
+            prefix_set=False if args.prefix == None else True,
+        )
@@ -5,7 +5,7 @@ from __future__ import print_function
 
 import os
 
-from .utils import conda_root, get_ggd_channels
+from .utils import channel_choices, conda_root, lazy_choice
 
 
 # -------------------------------------------------------------------------------------------------------------
@@ -22,7 +22,7 @@ def add_pkg_info(p):
         "-c",
         "--channel",
         default="genomics",
-        choices=get_ggd_channels(),
+        type=lazy_choice(channel_choices, default="genomics"),
         help="The ggd channel of the recipe to list info about (Default = genomics)",
     )
     c.add_argument(
@@ -45,7 +45,7 @@ def add_pkg_info(p):
 # -------------------------------------------------------------------------------------------------------------
 
 
-def check_if_ggd_recipe(ggd_recipe, ggd_channel, prefix=conda_root()):
+def check_if_ggd_recipe(ggd_recipe, ggd_channel, prefix=None):
     """Method to check if a ggd recipe is in designated ggd channel or not 
 
     check_if_ggd_recipe
@@ -56,11 +56,13 @@ def check_if_ggd_recipe(ggd_recipe, ggd_channel, prefix=conda_root()):
     ----------
     1) ggd_recipe:  (str) The ggd recipe name
     2) ggd_channel: (str) The ggd channel to look at
-    3) prefix:      (str) The conda prefix/environment to check
+    3) prefix:      (str) The conda prefix/environment to check (Default = None, the conda root)
     """
 
     from .list_files import in_ggd_channel
 
+    prefix = prefix if prefix != None else conda_root()
+
     ## Check if recipe is in the ggd channel
     try:
         if in_ggd_channel([ggd_recipe], ggd_channel, prefix, reporting=False):
@@ -77,7 +79,7 @@ def check_if_ggd_recipe(ggd_recipe, ggd_channel, prefix=conda_root()):
 
 
 def get_meta_yaml_info(
-    tarball_info_object, ggd_recipe, ggd_channel, prefix=conda_root()
+    tarball_info_object, ggd_recipe, ggd_channel, prefix=None
 ):
     """Method to get information from the meta.yaml file of an installed ggd package
 
@@ -93,7 +95,7 @@ def get_meta_yaml_info(
     1) tarball_info_object: (tarfile object) A object made from using the tarfile module to extract files
     2) ggd_recipe:          (str) The ggd recipe name
     3) ggd_channel:         (str) The ggd channel name
-    4) prefix:              (str) The prefix where the package is installed
+    4) prefix:              (str) The prefix where the package is installed (Default = None, the conda root)
 
     """
     import glob
@@ -102,6 +104,8 @@ def get_meta_yaml_info(
 
     from .utils import add_yaml_literal_block, literal_block
 
+    prefix = prefix if prefix != None else conda_root()
+
     dash = "     " + "-" * 100
     print("\n\n", dash)
 
@@ -298,7 +302,7 @@ def print_recipe(tarball_info_object, ggd_recipe):
     return True
 
 
-def get_pkg_info(ggd_recipe, ggd_channel, show_recipe, prefix=conda_root()):
+def get_pkg_info(ggd_recipe, ggd_channel, show_recipe, prefix=None):
     """Method to get the package info from an installed package
 
     get_pkg_info
@@ -311,12 +315,14 @@ def get_pkg_info(ggd_recipe, ggd_channel, show_recipe, prefix=conda_root()):
     1) ggd_recipe:  (str)  The ggd recipe name
     2) ggd_channel: (str)  The ggd channel name
     3) show_recipe: (bool) A bool value, where if true will print the recipe.sh script
-    4) prefix:      (str)  The conda prefix/environment the package is installed in
+    4) prefix:      (str)  The conda prefix/environment the package is installed in (Default = None, the conda root)
     """
     import tarfile
 
     from .utils import get_conda_package_list
 
+    prefix = prefix if prefix != None else conda_root()
+
     ## Get a list of installed ggd packages using conda list
     conda_package_list = get_conda_package_list(prefix, include_local=True)
 
@@ -2,11 +2,8 @@ from __future__ import print_function
 
 import os
 
-from .utils import get_builds, get_ggd_channels, get_species
+from .utils import build_choices, channel_choices, lazy_choice, species_choices
 
-SPECIES_LIST = sorted(get_species())
-GENOME_BUILDS = sorted(get_builds("*"))
-CHANNEL_LIST = [x.encode("ascii") for x in get_ggd_channels()]
 GENOMIC_COORDINATE_LIST = [
     "0-based-inclusive",
     "0-based-exclusive",
@@ -26,7 +23,7 @@ def add_make_bash(p):
         "-c",
         "--channel",
         help="the ggd channel to use. (Default = genomics)",
-        choices=[x.decode("ascii") for x in CHANNEL_LIST],
+        type=lazy_choice(channel_choices, default="genomics"),
         default="genomics",
     )
     c.add_argument(
@@ -56,13 +53,13 @@ def add_make_bash(p):
         "-s",
         "--species",
         help="The species recipe is for",
-        choices=[str(x) for x in SPECIES_LIST],
+        type=lazy_choice(species_choices),
         required=True,
     )
     c2.add_argument(
         "-g",
         "--genome-build",
-        choices=[str(x) for x in GENOME_BUILDS],
+        type=lazy_choice(build_choices),
         help="The genome build the recipe is for",
         required=True,
     )
@@ -239,15 +236,12 @@ def make_bash(parser, args):
         )
     )
 
-    from .search import load_json
-    from .utils import get_channel_data
+    from .utils import get_ggd_channels, load_channeldata
 
     ## Get a list of ggd packages
     ggd_packages = set()
-    for channel in CHANNEL_LIST:
-        channel = channel.decode("utf-8") if not isinstance(channel, str) else channel
-        json_dict = load_json(get_channel_data(channel))
-        ggd_packages.update(json_dict["packages"].keys())
+    for channel in get_ggd_channels():
+        ggd_packages.update(load_channeldata(channel).packages.keys())
 
     ## Get non-ggd dependencies
     non_ggd_deps = [x for x in deps if x not in ggd_packages]
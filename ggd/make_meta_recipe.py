@@ -3,11 +3,8 @@ from __future__ import print_function
 import os
 from shutil import copyfile
 
-from .utils import get_builds, get_ggd_channels, get_species
+from .utils import channel_choices, lazy_choice
 
-SPECIES_LIST = sorted(get_species())
-GENOME_BUILDS = sorted(get_builds("*"))
-CHANNEL_LIST = [x.encode("ascii") for x in get_ggd_channels()]
 GENOMIC_COORDINATE_LIST = [
     "0-based-inclusive",
     "0-based-exclusive",
@@ -28,7 +25,7 @@ def add_make_metarecipe(p):
         "-c",
         "--channel",
         help="the ggd channel to use. (Default = genomics)",
-        choices=[x.decode("ascii") for x in CHANNEL_LIST],
+        type=lazy_choice(channel_choices, default="genomics"),
         default="genomics",
     )
 
@@ -249,15 +246,12 @@ def make_bash(parser, args):
         )
     )
 
-    from .search import load_json
-    from .utils import get_channel_data
+    from .utils import get_ggd_channels, load_channeldata
 
     ## Get a list of ggd packages
     ggd_packages = set()
-    for channel in CHANNEL_LIST:
-        channel = channel.decode("utf-8") if not isinstance(channel, str) else channel
-        json_dict = load_json(get_channel_data(channel))
-        ggd_packages.update(json_dict["packages"].keys())
+    for channel in get_ggd_channels():
+        ggd_packages.update(load_channeldata(channel).packages.keys())
 
     ## Get non-ggd dependencies
     non_ggd_deps = [x for x in deps if x not in ggd_packages]
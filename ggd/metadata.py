@@ -0,0 +1,214 @@
+# -------------------------------------------------------------------------------------------------------------
+## Import Statements
+# -------------------------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import os
+import sys
+
+# -------------------------------------------------------------------------------------------------------------
+## Argument Parser
+# -------------------------------------------------------------------------------------------------------------
+def add_metadata(p):
+
+    from .utils import METADATA_WORKERS
+
+    c = p.add_parser(
+        "metadata",
+        help="Manage the local ggd metadata files",
+        description="Manage the local copies of the ggd genome metadata and channel metadata files",
+    )
+    sub = c.add_subparsers(title="[metadata commands]", dest="metadata_command")
+    sub.required = True
+
+    r = sub.add_parser(
+        "refresh",
+        help="Update the local ggd metadata files",
+        description="Update the local genome metadata files and the channel metadata for every ggd channel. All files are downloaded at the same time",
+    )
+    r.add_argument(
+        "-c",
+        "--channel",
+        default=[],
+        action="append",
+        help="(Optional) The ggd channel to refresh. Use the flag multiple times to refresh multiple channels. (Default = all ggd channels)",
+    )
+    r.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=METADATA_WORKERS,
+        help="(Optional) The number of files to download at the same time. (Default = {})".format(
+            METADATA_WORKERS
+        ),
+    )
+    r.set_defaults(func=metadata_refresh)
+
+
+# -------------------------------------------------------------------------------------------------------------
+## Functions/Methods
+# -------------------------------------------------------------------------------------------------------------
+
+
+def local_ggd_channels():
+    """Method to get the ggd channels from the local ggd_channels.json file without updating it
+
+    local_ggd_channels
+    ==================
+    This method is used to get the ggd channels listed in the local ggd_channels.json file. An empty list
+     is returned if the file does not exist yet.
+
+    Returns:
+    ++++++++
+    1) (list) The ggd channels
+    """
+
+    from .utils import get_ggd_channels
+
+    try:
+        return list(get_ggd_channels())
+    except (IOError, OSError, ValueError, KeyError):
+        return []
+
+
+def refresh_metadata(channels=None, max_workers=None):
+    """Method to update all local ggd metadata files at the same time
+
+    refresh_metadata
+    ================
+    This method is used to update the genome metadata files and the channeldata for each ggd channel using
+     a thread pool with the shared ggd session (see transport.get_session). All downloads are started together, so the time to
+     refresh is bounded by the slowest file rather than the sum of all files.
+
+     Other ggd processes wait for the refresh to finish (see utils.cache_lock).
+
+     If no channels are given every channel in the local ggd_channels.json file is refreshed alongside the
+      genome metadata. Any channel that is only listed in the newly downloaded ggd_channels.json file is
+      refreshed once that file is available.
+
+    Parameters:
+    -----------
+    1) channels:    (list) The ggd channels to refresh. (Default = None, all ggd channels)
+    2) max_workers: (int)  The number of files to download at the same time. (Default = METADATA_WORKERS)
+
+    Returns:
+    ++++++++
+    1) (dict) A dictionary with a key for each genome metadata file and channel, and the error raised while
+               refreshing it as the value. (None if the refresh succeeded)
+    """
+    from .utils import (
+        CHANNEL_DATA_DIR,
+        GENOME_METADATA_DIR,
+        GENOME_METADATA_FILES,
+        METADATA_LOCK,
+        METADATA_WORKERS,
+        cache_lock,
+        get_ggd_channels,
+        make_cache_dir,
+        thread_pool,
+        update_channel_data_files,
+        update_genome_metadata_file,
+    )
+
+    max_workers = max(1, max_workers or METADATA_WORKERS)
+
+    ## Create the metadata dirs before the downloads start
+    for metadata_dir in (GENOME_METADATA_DIR, CHANNEL_DATA_DIR):
+        make_cache_dir(metadata_dir)
+
+    def refresh_channel(channel):
+        ## update_channel_data_files exits on a channel that is not a ggd channel
+        try:
+            return update_channel_data_files(channel)
+        except SystemExit as e:
+            raise ValueError(str(e))
+
+    ## Only one ggd process at a time refreshes the metadata
+    futures = {}
+    with cache_lock(METADATA_LOCK), thread_pool(max_workers) as pool:
+        for file_name in GENOME_METADATA_FILES:
+            futures[file_name] = pool.submit(update_genome_metadata_file, file_name)
+
+        ## Channels are checked against ggd_channels.json, so on a cold start wait for it to be downloaded
+        if not os.path.exists(os.path.join(GENOME_METADATA_DIR, "ggd_channels.json")):
+            try:
+                futures["ggd_channels.json"].result()
+            except Exception:
+                pass
+
+        requested = channels if channels else local_ggd_channels()
+        for channel in requested:
+            futures[channel] = pool.submit(refresh_channel, channel)
+
+        ## Refresh any new channels once the updated channel list is available
+        if not channels:
+            try:
+                futures["ggd_channels.json"].result()
+                for channel in get_ggd_channels():
+                    if channel not in futures:
+                        futures[channel] = pool.submit(refresh_channel, channel)
+            except Exception:
+                pass
+
+        errors = {}
+        for key, future in futures.items():
+            try:
+                future.result()
+                errors[key] = None
+            except Exception as e:
+                errors[key] = e
+
+    return errors
+
+
+def background_refresh():
+    """Method run by the detached background metadata refresh process
+
+    background_refresh
+    ==================
+    This method is used to refresh all local ggd metadata files from the background process started by 
+     utils.start_background_refresh. The refresh marker file is removed when the refresh is done.
+    """
+    from .utils import REFRESH_MARKER, check_for_internet_connection
+
+    try:
+        if check_for_internet_connection():
+            refresh_metadata()
+    finally:
+        try:
+            os.remove(REFRESH_MARKER)
+        except OSError:
+            pass
+
+
+def metadata_refresh(parser, args):
+    """Main method for the metadata refresh command
+
+    metadata_refresh
+    ================
+    Main method used to update the local ggd metadata files
+    """
+    from .utils import check_for_internet_connection
+
+    if not check_for_internet_connection():
+        sys.exit(
+            "\n:ggd:metadata: !!ERROR!! An internet connection is required to refresh the ggd metadata. Please try again when you have secured an internet connection\n"
+        )
+
+    print("\n:ggd:metadata: Refreshing the ggd metadata files")
+    errors = refresh_metadata(args.channel, args.jobs)
+
+    failed = sorted(key for key, error in errors.items() if error is not None)
+    for key in sorted(errors.keys()):
+        if errors[key] is None:
+            print(":ggd:metadata:\t Updated: {}".format(key))
+    for key in failed:
+        print(
+            ":ggd:metadata: !!ERROR!! Unable to update {}: {}".format(key, errors[key])
+        )
+
+    if failed:
+        sys.exit(1)
+
+    print("\n:ggd:metadata: DONE\n")
+    return True
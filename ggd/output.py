@@ -0,0 +1,196 @@
+# -------------------------------------------------------------------------------------------------------------
+## Import Statements
+# -------------------------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import sys
+from contextlib import contextmanager
+
+# -------------------------------------------------------------------------------------------------------------
+## Global Variables
+# -------------------------------------------------------------------------------------------------------------
+
+## The output formats of ggd search, ggd list, and ggd get-files. "text" is the decorated output for people, the others
+##  are for programs: "json" is a single json array, "jsonl" is one json object per line, and "tsv" is a tab separated
+##  table with a header line
+OUTPUT_FORMATS = ["text", "json", "jsonl", "tsv"]
+
+
+# -------------------------------------------------------------------------------------------------------------
+## Functions/Methods
+# -------------------------------------------------------------------------------------------------------------
+
+
+def add_output_arguments(c, fields):
+    """Method to add the --format and --fields arguments to a ggd sub-command parser
+
+    add_output_arguments
+    ====================
+    Method used to add the output arguments shared by the ggd commands with machine-readable output
+
+    Parameters:
+    -----------
+    1) c:      (argparse parser) The sub-command parser to add the arguments to
+    2) fields: (list) The names of the fields available for the sub-command, in output order
+    """
+
+    c.add_argument(
+        "--format",
+        default="text",
+        choices=OUTPUT_FORMATS,
+        help=(
+            "(Optional) The output format. 'text' is the default human readable output. 'json' (a json array), 'jsonl'"
+            " (one json object per line), and 'tsv' (tab separated with a header line) are for use by other programs"
+        ),
+    )
+    c.add_argument(
+        "--fields",
+        default=None,
+        help=(
+            "(Optional) A comma separated list of the fields to include in json, jsonl, or tsv output. (Default = all"
+            " fields) Fields: {}".format(", ".join(fields))
+        ),
+    )
+
+
+def select_fields(fields, field_getters, command):
+    """Method to get the output fields requested with --fields
+
+    select_fields
+    =============
+    Method used to check the fields requested with the --fields argument. An unknown field is a usage error and exits.
+
+    Parameters:
+    -----------
+    1) fields:        (str)  The comma separated --fields value, or None for all fields
+    2) field_getters: (dict) key = field name, value = a function that gets the field value for one result
+    3) command:       (str)  The ggd command used in error messages. (Example: search)
+
+    Returns:
+    ++++++++
+    1) (list) The requested field names, in output order
+    """
+
+    if not fields:
+        return list(field_getters.keys())
+
+    requested = [x.strip() for x in fields.split(",") if x.strip()]
+    unknown = [x for x in requested if x not in field_getters]
+    if unknown or not requested:
+        sys.exit(
+            "\n:ggd:{c}: !!ERROR!! Unknown output field(s): {u}. Available fields: {f}\n".format(
+                c=command, u=", ".join(unknown), f=", ".join(field_getters.keys())
+            )
+        )
+
+    return requested
+
+
+@contextmanager
+def diagnostics_to_stderr(output_format):
+    """Method to keep the machine-readable output of a ggd command free of other messages
+
+    diagnostics_to_stderr
+    =====================
+    A context manager used around a ggd command with a --format argument. For json, jsonl, and tsv output, every
+     message printed while the command runs (warnings, notes, metadata updates) is written to stderr instead of
+     stdout. The records are written to the stdout that is given by the context manager. (See write_records)
+
+    Parameters:
+    -----------
+    1) output_format: (str) The --format value. Nothing is redirected for "text"
+
+    Yields:
+    +++++++
+    1) (file) The stdout to write the records to
+    """
+
+    out = sys.stdout
+    if output_format != "text":
+        sys.stdout = sys.stderr
+    try:
+        yield out
+    finally:
+        sys.stdout = out
+
+
+def iter_records(items, field_getters, fields):
+    """Method to lazily build an output record for each result
+
+    iter_records
+    ============
+    A generator that builds one record at a time. Only the requested fields are computed for each result.
+
+    Parameters:
+    -----------
+    1) items:         (iterable) The results. (Example: package names)
+    2) field_getters: (dict)     key = field name, value = a function that gets the field value for one result
+    3) fields:        (list)     The field names to include (See select_fields)
+
+    Yields:
+    +++++++
+    1) (dict) key = field name, value = the field value for a result
+    """
+
+    for item in items:
+        yield dict((field, field_getters[field](item)) for field in fields)
+
+
+def tsv_value(value):
+    """Method to format a field value as a tsv cell. Lists are comma separated and tabs and new lines are replaced"""
+
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        value = ",".join(tsv_value(x) for x in value)
+    elif isinstance(value, dict):
+        value = ",".join("{}={}".format(k, tsv_value(v)) for k, v in value.items())
+    return str(value).replace("\t", " ").replace("\r", " ").replace("\n", " ")
+
+
+def write_records(records, fields, output_format, out=None):
+    """Method to stream the output records in a machine-readable format
+
+    write_records
+    =============
+    Method used to write the records from iter_records as json, jsonl, or tsv. Each record is written and flushed as
+     soon as it is built, so a reading program gets the first results without waiting for the rest.
+
+    Parameters:
+    -----------
+    1) records:       (iterable) The records to write (See iter_records)
+    2) fields:        (list)     The field names of the records, used for the tsv header
+    3) output_format: (str)      One of "json", "jsonl", or "tsv"
+    4) out:           (file)     The file object to write to. (Default = None, stdout)
+
+    Returns:
+    ++++++++
+    1) (int) The number of records written
+    """
+    import json
+
+    out = out if out != None else sys.stdout
+
+    count = 0
+    if output_format == "tsv":
+        out.write("\t".join(fields) + "\n")
+    elif output_format == "json":
+        out.write("[")
+
+    for record in records:
+        if output_format == "tsv":
+            out.write("\t".join(tsv_value(record[x]) for x in fields) + "\n")
+        elif output_format == "json":
+            out.write(("," if count else "") + "\n" + json.dumps(record))
+        else:
+            out.write(json.dumps(record) + "\n")
+        out.flush()
+        count += 1
+
+    if output_format == "json":
+        out.write("\n]\n" if count else "]\n")
+    out.flush()
+
+    return count
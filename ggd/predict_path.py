@@ -5,7 +5,7 @@ from __future__ import print_function
 
 import sys
 
-from .utils import get_ggd_channels
+from .utils import channel_choices, lazy_choice
 
 
 # -------------------------------------------------------------------------------------------------------------
@@ -23,7 +23,7 @@ def add_predict_path(p):
         "-c",
         "--channel",
         default="genomics",
-        choices=[str(x) for x in get_ggd_channels()],
+        type=lazy_choice(channel_choices, default="genomics"),
         help="The ggd channel of the recipe to find. (Default = genomics)",
 
     )
@@ -73,30 +73,41 @@ def add_predict_path(p):
 # -------------------------------------------------------------------------------------------------------------
 
 
-def get_ggd_metadata(ggd_channel):
+def get_ggd_metadata(ggd_channel, package_name=None):
     """Method to get the ggd metadata by ggd channel
 
     in_ggd_channel
     ==============
     Method to get the metadata file for a specific ggd channel
-     this method will exit if internet access is not available
+     Without internet access the local copy of the channel metadata is used (See 'ggd bundle'). 
+     This method will exit if internet access is not available and there is no local copy
+
+     If a package name is given only that package is looked up (using the channel catalog) and the 
+      returned metadata only contains that package.
      
     Parameters:
     ----------
-    1) ggd_channel: (str) The name of the ggd-channel to look in
+    1) ggd_channel:  (str) The name of the ggd-channel to look in
+    2) package_name: (str) The name of a single package to get metadata for. (Default = None, all packages)
      
     Return:
     +++++++
     1) (dict) GGD metadata as a dictionary
 
     """
-    from .search import load_json_from_url
-    from .utils import check_for_internet_connection, get_channeldata_url
+    import os
+
+    from .utils import check_for_internet_connection, load_channeldata
 
     json_dict = {"channeldata_version": 1, "packages": {}}
-    if check_for_internet_connection(3):
-        CHANNELDATA_URL = get_channeldata_url(ggd_channel)
-        json_dict = load_json_from_url(CHANNELDATA_URL)
+    channeldata = load_channeldata(ggd_channel)
+    if check_for_internet_connection(3) or os.path.exists(channeldata.path):
+        if package_name is None:
+            json_dict = channeldata.copy()
+        else:
+            pkg = channeldata.get_package(package_name)
+            if pkg is not None:
+                json_dict["packages"][package_name] = pkg
     else:
         ## If no internet connection
         sys.exit(
@@ -126,7 +137,7 @@ def predict_path(parser, args):
     )
 
     ## Get metadata
-    metadata_dict = get_ggd_metadata(args.channel)
+    metadata_dict = get_ggd_metadata(args.channel, args.package_name)
 
     ## Check the package is in the metadata
     if args.package_name not in metadata_dict["packages"]:
@@ -3,13 +3,67 @@
 # -------------------------------------------------------------------------------------------------------------
 from __future__ import print_function
 
+import os
 import sys
 
-from .utils import get_builds, get_ggd_channels, get_species
+from .output import add_output_arguments
+from .utils import (
+    build_choices,
+    channel_choices,
+    get_species,
+    lazy_choice,
+    species_choices,
+)
+
+
+# -------------------------------------------------------------------------------------------------------------
+## Global Variables
+# -------------------------------------------------------------------------------------------------------------
+
+## The fields that can be used in field-scoped search terms (Example: provider:UCSC). Key = field name in
+##  the search term, value = the field in the catalog.FieldIndex
+SEARCH_FIELDS = {
+    "species": "species",
+    "build": "genome-build",
+    "genome-build": "genome-build",
+    "provider": "data-provider",
+    "data-provider": "data-provider",
+    "filetype": "file-type",
+    "file-type": "file-type",
+    "coordinate": "genomic-coordinate-base",
+    "coordinate-base": "genomic-coordinate-base",
+    "genomic-coordinate-base": "genomic-coordinate-base",
+    "channel": "ggd-channel",
+    "ggd-channel": "ggd-channel",
+}
+
+## The fields of each search result in json, jsonl, and tsv output (See search_result_fields)
+SEARCH_OUTPUT_FIELDS = [
+    "name",
+    "channel",
+    "version",
+    "summary",
+    "species",
+    "genome-build",
+    "keywords",
+    "data-provider",
+    "data-version",
+    "file-type",
+    "genomic-coordinate-base",
+    "final-files",
+    "final-file-sizes",
+    "meta-recipe",
+    "installed",
+    "installed-path",
+]
+
+## Searches that score at least this many packages use the batch scoring engine when numpy and rapidfuzz are
+##  installed (see batch_score_packages). Smaller searches are faster without loading numpy
+BATCH_SCORE_MIN_PACKAGES = 1000
+
+## The --channel value used to search every ggd channel at once (See search_all_channels)
+ALL_CHANNELS = "all"
 
-SPECIES_LIST = sorted(get_species(update_files=False))
-GENOME_BUILDS = sorted(get_builds("*"))
-CHANNEL_LIST = [x.encode("ascii") for x in get_ggd_channels()]
 
 # -------------------------------------------------------------------------------------------------------------
 ## Argument Parser
@@ -24,7 +78,11 @@ def add_search(p):
     c.add_argument(
         "search_term",
         nargs="+",
-        help="**Required** The term(s) to search for. Multiple terms can be used. Example: 'ggd search reference genome'",
+        help=(
+            "**Required** The term(s) to search for. Multiple terms can be used. Example: 'ggd search reference genome'."
+            " Terms of the form <field>:<value> only keep packages with that value. Fields: species, build, provider,"
+            " filetype, coordinate, channel. Example: 'ggd search gaps provider:UCSC filetype:bed'"
+        ),
     )
     c.add_argument(
         "--search-type",
@@ -42,7 +100,7 @@ def add_search(p):
         "--genome-build",
         default=[],
         action="append",
-        choices=[str(x) for x in GENOME_BUILDS],
+        type=lazy_choice(build_choices),
         help="(Optional) Filter results by the genome build of the desired recipe",
     )
     c.add_argument(
@@ -51,7 +109,7 @@ def add_search(p):
         default=[],
         action="append",
         help="(Optional) Filter results by the species for the desired recipe",
-        choices=[str(x) for x in SPECIES_LIST],
+        type=lazy_choice(species_choices),
     )
     c.add_argument(
         "-dn",
@@ -68,10 +126,11 @@ def add_search(p):
     c.add_argument(
         "-c",
         "--channel",
-        help="(Optional) The ggd channel to search. (Default = genomics)",
-        choices=[x.decode("ascii") for x in CHANNEL_LIST],
+        help="(Optional) The ggd channel to search, or 'all' to search every ggd channel. (Default = genomics)",
+        type=lazy_choice(search_channel_choices, default="genomics"),
         default="genomics",
     )
+    add_output_arguments(c, SEARCH_OUTPUT_FIELDS)
     c.set_defaults(func=search)
 
 
@@ -80,6 +139,14 @@ def add_search(p):
 # -------------------------------------------------------------------------------------------------------------
 
 
+def search_channel_choices():
+    """
+    Method to get the --channel choices of ggd search: the ggd channels and ALL_CHANNELS. (See lazy_choice)
+    """
+
+    return channel_choices() + [ALL_CHANNELS]
+
+
 def load_json(jfile):
     """Method to load a json file into a dictionary
 
@@ -105,8 +172,8 @@ def load_json_from_url(json_url):
 
     load_json_from_url
     ==================
-    Method to load a json file  from a url. Uses the requests module 
-     to get the json file from the url.
+    Method to load a json file  from a url. Uses the shared ggd session 
+     (see transport.get_session) to get the json file from the url.
    
     Parameters:
     ---------
@@ -116,14 +183,15 @@ def load_json_from_url(json_url):
     ++++++++
     1) (dict) A dictionary of a json object 
     """
-    import json
     import traceback
 
     import requests
 
+    from . import transport
+
     try:
-        return requests.get(json_url).json()
-    except ValueError as e:
+        return transport.get(json_url).json()
+    except (ValueError, requests.RequestException) as e:
         sys.stderr.write("\n:ggd:search: !!ERROR!! in loading json file from url")
         sys.stderr.write("\n\t Invalid URL: %s" % json_url)
         sys.stderr.write(str(e))
@@ -131,16 +199,251 @@ def load_json_from_url(json_url):
         sys.exit(1)
 
 
-def search_packages(json_dict, search_terms, search_type="both", score_cutoff=50):
+def search_strings(pkg, json_dict):
+    """Method to get the lower case keyword strings of a package that search terms are scored against
+
+    search_strings
+    ==============
+    This method is used to get the keywords of a package and each part of a keyword split on "-" or "_",
+     in lower case. (See score_package)
+
+    Parameters:
+    -----------
+    1) pkg:       (str)  The package name
+    2) json_dict: (dict) The channeldata json dictionary with the package
+
+    Returns:
+    ++++++++
+    1) (list) The lower case keyword strings
+    """
+    import re
+
+    return [
+        x.lower()
+        for x in [
+            subkeyword
+            for keyword in json_dict["packages"][pkg]["keywords"]
+            for subkeyword in re.split("-|_", keyword.strip())
+        ]
+        + json_dict["packages"][pkg]["keywords"]
+    ]
+
+
+def score_package(term, pkg, json_dict):
+    """Method to score a search term against a single package
+
+    score_package
+    =============
+    This method is used to get the fuzzy match scores of a search term for a package: the partial ratio
+     between the term and the package name, and the highest ratio between the term and the package keywords
+
+    Parameters:
+    -----------
+    1) term:      (str)  The search term
+    2) pkg:       (str)  The package name
+    3) json_dict: (dict) The channeldata json dictionary with the package
+
+    Returns:
+    ++++++++
+    1) (int) The package name score
+    2) (int) The max keyword score
+    """
+    from fuzzywuzzy import fuzz
+
+    ## Get match score between name and term
+    score = fuzz.partial_ratio(term.lower(), pkg.lower())
+
+    ## Get the max score from all keyword scores found
+    keyword_max_score = max(
+        [fuzz.ratio(term.lower(), x) for x in search_strings(pkg, json_dict)]
+    )
+
+    return (score, keyword_max_score)
+
+
+def batch_score_packages(terms, term_pkgs, json_dict, score_cutoff):
+    """Method to score every search term against its packages at once
+
+    batch_score_packages
+    ====================
+    This method is used to score a large search with score matrices instead of one package at a time. The 
+     terms are scored against every package name and keyword string in one call to rapidfuzz's cdist (using 
+     all cpus), and the max keyword score of each package is taken with numpy. The scores are the same as 
+     score_package:
+
+     * Keyword scores: rapidfuzz's ratio is the same ratio fuzzywuzzy uses with python-Levenshtein. The few
+        scores that fall exactly on a rounding boundary are re-scored with fuzzywuzzy
+     * Name scores: rapidfuzz's partial_ratio checks every alignment of the shorter string, so it is never lower 
+        than fuzzywuzzy's partial_ratio. It is only used to rule out packages. The name score of each package 
+        that could reach the score cutoff is re-scored with fuzzywuzzy
+
+     If fuzzywuzzy does not use python-Levenshtein the keyword scores are re-scored the same way as the name scores.
+
+     Raises an ImportError if numpy or rapidfuzz is not installed. (See search_packages)
+
+    Parameters:
+    -----------
+    1) terms:        (list)  The search terms
+    2) term_pkgs:    (list)  A list with the package names to score for each search term 
+    3) json_dict:    (dict)  The channeldata json dictionary with the packages
+    4) score_cutoff: (float) The lowest score to keep
+
+    Returns:
+    ++++++++
+    1) (list) A dictionary for each search term with the packages that could reach the score cutoff as keys, and 
+               a tuple with the name score and max keyword score (see score_package) as values. Packages not in a 
+               dictionary do not reach the score cutoff for the term.
+    """
+    import numpy as np
+    from fuzzywuzzy import fuzz
+    from rapidfuzz import fuzz as rapid_fuzz
+    from rapidfuzz import process
+
+    exact_keywords = fuzz.SequenceMatcher.__module__ == "fuzzywuzzy.StringMatcher"
+
+    ## Every package scored for a term, with the keyword strings of the packages one after the other
+    pkgs = list(dict.fromkeys(pkg for pkgs in term_pkgs for pkg in pkgs))
+    lower_terms = [term.lower() for term in terms]
+    keywords = []
+    keyword_starts = []
+    for pkg in pkgs:
+        keyword_starts.append(len(keywords))
+        keywords.extend(set(search_strings(pkg, json_dict)))
+    keyword_counts = np.diff(np.array(keyword_starts + [len(keywords)]))
+
+    name_scores = process.cdist(
+        lower_terms,
+        [pkg.lower() for pkg in pkgs],
+        scorer=rapid_fuzz.partial_ratio,
+        dtype=np.float64,
+        workers=-1,
+    )
+
+    ## The max keyword score for each term and package. (-1 for a package without keywords, see below)
+    keyword_max_scores = np.full((len(terms), len(pkgs)), -1.0)
+    if keywords:
+        keyword_scores = process.cdist(
+            lower_terms,
+            keywords,
+            scorer=rapid_fuzz.ratio,
+            dtype=np.float64,
+            workers=-1,
+        )
+        if exact_keywords:
+            rounding = np.abs(keyword_scores - np.floor(keyword_scores) - 0.5) < 1e-6
+            keyword_scores = np.rint(keyword_scores)
+            for i, j in zip(*np.nonzero(rounding)):
+                keyword_scores[i, j] = fuzz.ratio(lower_terms[i], keywords[j])
+
+        has_keywords = keyword_counts > 0
+        keyword_max_scores[:, has_keywords] = np.maximum.reduceat(
+            keyword_scores, np.array(keyword_starts)[has_keywords], axis=1
+        )
+
+    ## The packages that could reach the score cutoff
+    min_score = float(score_cutoff) - 0.5 - 1e-6
+    could_match = (name_scores >= min_score) | (keyword_max_scores >= min_score)
+    could_match[:, keyword_counts == 0] = True
+
+    pkg_index = {pkg: i for i, pkg in enumerate(pkgs)}
+    term_scores = []
+    for i, term in enumerate(terms):
+        scores = {}
+        for pkg in term_pkgs[i]:
+            j = pkg_index[pkg]
+            if not could_match[i, j]:
+                continue
+            if keyword_counts[j] == 0 or not exact_keywords:
+                scores[pkg] = score_package(term, pkg, json_dict)
+            else:
+                scores[pkg] = (
+                    fuzz.partial_ratio(lower_terms[i], pkg.lower()),
+                    int(keyword_max_scores[i, j]),
+                )
+        term_scores.append(scores)
+
+    return term_scores
+
+
+def search_packages(
+    json_dict, search_terms, search_type="both", score_cutoff=50, index=None, limit=None
+):
     """Method to search for ggd packages in the ggd channeldata.json metadata file based on user provided search terms
 
     search_packages
     ===============
     Method to search for ggd packages/recipes 
-     containing specific search terms 
+     containing specific search terms. (See match_scores and rank_matches)
+
+    Parameters:
+    ---------
+    1) json_dict:    (dict) A json file loaded into a dictionary. (The file to search)
+                             the load_json_from_url() method creates the dictionary 
+    2) search_terms: (list) A list of terms representing package names or keywords to search for
+    3) search_type:  (str)  A string matching either 'both', 'combined-only', or 'non-combined-only',
+                             representing how to use the search terms.
+    4) score_cutoff: (int)  A number between 0 and 100 that represent which matches to return
+                             (Default = 50)
+    5) index:        (Catalog) The catalog of the channel json_dict was loaded from, used to find the
+                                packages to score. (Default = None, score every package)
+    6) limit:        (int)  The number of top matches to return. (Default = None, all matches)
+
+    Returns:
+    ++++++++
+    1) (list) A list of pkg names who's either name or keyword match score reached the score cutoff, from the
+               highest to the lowest name match score
+    """
+
+    return rank_matches(
+        match_scores(json_dict, search_terms, search_type, score_cutoff, index), limit
+    )
+
+
+def rank_matches(scores, limit=None):
+    """Method to order the matched packages from the highest to the lowest name match score
+
+    rank_matches
+    ============
+    Packages with the same score keep the order of the scores dictionary. If a limit is given only the top 
+     packages are selected with a heap, instead of sorting every match. The result is the same as the first
+     limit packages of the full ordering.
+
+    Parameters:
+    -----------
+    1) scores: (dict) key = pkg name, value = name match score. (From match_scores)
+    2) limit:  (int)  The number of top matches to return. (Default = None, all matches)
+
+    Returns:
+    ++++++++
+    1) (list) The pkg names
+    """
+
+    if limit is None:
+        return sorted(scores, key=scores.get, reverse=True)
+
+    import heapq
+
+    return heapq.nlargest(int(limit), scores, key=scores.get)
+
+
+def match_scores(
+    json_dict, search_terms, search_type="both", score_cutoff=50, index=None
+):
+    """Method to score the ggd packages in the ggd channeldata.json metadata file against user provided search terms
+
+    match_scores
+    ============
+    Method to find the ggd packages/recipes 
+     matching specific search terms and their scores
 
      NOTE: Both the package name and the package keywords are searched
 
+     If a search index is given only the packages that could reach the score cutoff are scored (see 
+      catalog.Catalog.search_candidates). The results are the same as scoring every package.
+
+     Searches that score at least BATCH_SCORE_MIN_PACKAGES packages use batch_score_packages if numpy and 
+      rapidfuzz are installed. The results are the same as scoring one package at a time.
+
     Parameters:
     ---------
     1) json_dict:    (dict) A json file loaded into a dictionary. (The file to search)
@@ -150,17 +453,17 @@ def search_packages(json_dict, search_terms, search_type="both", score_cutoff=50
                              representing how to use the search terms.
     4) score_cutoff: (int)  A number between 0 and 100 that represent which matches to return
                              (Default = 50)
+    5) index:        (Catalog) The catalog of the channel json_dict was loaded from, used to find the
+                                packages to score. (Default = None, score every package)
 
 
     Returns:
     ++++++++
-    1) (dict) A list of pkg names who's either name or keyword match score reached the score cutoff
+    1) (dict) key = pkg name who's either name or keyword match score reached the score cutoff, value = the
+               highest name match score of the pkg. (See rank_matches)
     """
-    import re
     from collections import defaultdict
 
-    from fuzzywuzzy import fuzz, process
-
     pkg_score = defaultdict(lambda: defaultdict(float))
 
     ## Get final search terms based on search type
@@ -175,27 +478,47 @@ def search_packages(json_dict, search_terms, search_type="both", score_cutoff=50
     if search_type == "non-combined-only":
         final_search_terms = search_terms
 
-    ## Search for data packages
+    ## Only score the packages that could match each term, in the same order as json_dict
+    term_pkgs = []
     for term in final_search_terms:
-
-        for pkg in json_dict["packages"].keys():
-
-            ## Get match score between name and term
-            score = fuzz.partial_ratio(term.lower(), pkg.lower())
-
-            ## Get the max score from all keyword scores found
-            keyword_max_score = max(
+        candidates = (
+            index.search_candidates(term.lower(), score_cutoff)
+            if index is not None
+            else None
+        )
+        if candidates is None:
+            term_pkgs.append(list(json_dict["packages"].keys()))
+        else:
+            term_pkgs.append(
                 [
-                    fuzz.ratio(term.lower(), x.lower())
-                    for x in [
-                        subkeyword
-                        for keyword in json_dict["packages"][pkg]["keywords"]
-                        for subkeyword in re.split("-|_", keyword.strip())
-                    ]
-                    + json_dict["packages"][pkg]["keywords"]
+                    pkg
+                    for pkg in sorted(candidates, key=candidates.get)
+                    if pkg in json_dict["packages"]
                 ]
             )
 
+    ## Score large searches all at once
+    term_scores = None
+    if sum(len(pkgs) for pkgs in term_pkgs) >= BATCH_SCORE_MIN_PACKAGES:
+        try:
+            term_scores = batch_score_packages(
+                final_search_terms, term_pkgs, json_dict, score_cutoff
+            )
+        except ImportError:
+            term_scores = None
+
+    ## Search for data packages
+    for i, term in enumerate(final_search_terms):
+
+        for pkg in term_pkgs[i]:
+
+            if term_scores is None:
+                score, keyword_max_score = score_package(term, pkg, json_dict)
+            elif pkg in term_scores[i]:
+                score, keyword_max_score = term_scores[i][pkg]
+            else:
+                continue
+
             ## Skip any package that does not meet the match score
             if score < score_cutoff and keyword_max_score < score_cutoff:
                 continue
@@ -207,50 +530,81 @@ def search_packages(json_dict, search_terms, search_type="both", score_cutoff=50
             if float(pkg_score[pkg]["keyword_score"]) < float(keyword_max_score):
                 pkg_score[pkg]["keyword_score"] = float(keyword_max_score)
 
-    ## Get a final list of pkg names
-    temp_pkg_list = sorted(
-        [
-            [pkg, float(max_scores["pkg_score"])]
-            for pkg, max_scores in pkg_score.items()
-            if float(max_scores["pkg_score"]) >= float(score_cutoff)
-            or float(max_scores["keyword_score"]) >= float(score_cutoff)
-        ],
-        key=lambda x: x[1],
-        reverse=True,
+    ## Keep the pkgs that reached the score cutoff
+    return dict(
+        (pkg, float(max_scores["pkg_score"]))
+        for pkg, max_scores in pkg_score.items()
+        if float(max_scores["pkg_score"]) >= float(score_cutoff)
+        or float(max_scores["keyword_score"]) >= float(score_cutoff)
     )
 
-    final_list = [pkg_list[0] for pkg_list in temp_pkg_list]
 
-    return final_list
+def installed_packages():
+    """Method to get the installed ggd data packages that search results are checked against
+
+    installed_packages
+    ==================
+    This method scans the ggd data dir of the conda root and, if a different conda environment is active, of the
+     active conda environment. Each dir is scanned once. (See utils.installed_data_packages)
+
+    Returns:
+    ++++++++
+    1) (dict) key = (species, genome build, package name, version), value = the path to the installed data package
+    """
+    import os
+
+    from .utils import conda_root, get_conda_context, installed_data_packages
+
+    prefixes = [conda_root()]
+    if os.environ.get("CONDA_PREFIX"):
+        active_prefix = get_conda_context().prefix_path(os.environ["CONDA_PREFIX"])
+        if active_prefix != None and active_prefix not in prefixes:
+            prefixes.append(active_prefix)
+
+    ## The conda root is checked first
+    installed = dict()
+    for prefix in prefixes:
+        for key, path in installed_data_packages(prefix).items():
+            installed.setdefault(key, path)
 
+    return installed
 
-def check_installed(ggd_recipe, ggd_jdict):
+
+def check_installed(ggd_recipe, ggd_jdict, installed=None):
     """Method to check if the recipe has already been installed and is in the conda ggd storage path. 
         
     check_if_installed
     ==================
     This method is used to check if the ggd package has been installed and is located in the ggd storage path.
+
+    Parameters:
+    -----------
+    1) ggd_recipe: (str)  The name of the ggd package
+    2) ggd_jdict:  (dict) The channel specific metadata file as a dictionary 
+    3) installed:  (dict) The installed data packages from installed_packages(). Pass it in when checking many
+                           packages. (Default = None, scan the ggd data dirs)
+
+    Returns:
+    ++++++++
+    1) (tuple) (True, the installed path) if installed, (False, None) if not
     """
-    import glob
-    import os
 
-    from .utils import conda_root
+    if installed is None:
+        installed = installed_packages()
 
     species = ggd_jdict["packages"][ggd_recipe]["identifiers"]["species"]
     build = ggd_jdict["packages"][ggd_recipe]["identifiers"]["genome-build"]
     version = ggd_jdict["packages"][ggd_recipe]["version"]
 
-    CONDA_ROOT = conda_root()
-    path = os.path.join(CONDA_ROOT, "share", "ggd", species, build, ggd_recipe, version)
-    recipe_exists = glob.glob(path)
-    if recipe_exists:
+    path = installed.get((species, build, ggd_recipe, version))
+    if path != None:
         return (True, path)
 
     else:
         return (False, None)
 
 
-def filter_by_identifiers(iden_keys, json_dict, filter_terms):
+def filter_by_identifiers(iden_keys, json_dict, filter_terms, index=None):
     """Method to filter a dictionary by an identifier field for the certain package.
 
     filter_by_identifiers
@@ -258,55 +612,142 @@ def filter_by_identifiers(iden_keys, json_dict, filter_terms):
     A method used to filter the list of data packages by information in the 
      identifiers field in the channeldata.json file
 
+     A package is kept if any of its identifiers contains the filter term for that identifier. The packages
+      are selected with the bitmaps of a catalog.FieldIndex, so the json dictionary is not copied.
+
     Parameters:
     ----------
     1) iden_keys:    (list) A list of he identifiers keys. Example = ["species","genome-build"] 
     2) json_dict:    (dict) The json dictionary created from load_json()
     3) filter_terms: (list) A list of the term(s) to filter by. Example: ["Homo_sapiens","hg19"]
+    4) index:        (FieldIndex) The field index of the packages in json_dict. (Default = None, built from json_dict)
 
     NOTE: List order of iden_keys should match list order of filter_terms
 
     Returns:
     ++++++++
-    1) (dict) Updated/filtered json_dict
+    1) (dict) Updated/filtered json_dict. (The package entries are shared with json_dict)
     """
-    import copy
+    from .catalog import INDEX_FIELDS, FieldIndex
 
-    keys = json_dict["packages"].keys()
-    key_count = len(keys)
+    key_count = len(json_dict["packages"])
 
-    keys_to_keep = set()
+    keys_to_keep = 0
     if len(iden_keys) > 0 and len(iden_keys) == len(filter_terms):
-        for key in keys:
-            for i, iden_key in enumerate(iden_keys):
-                if iden_key in json_dict["packages"][key]["identifiers"]:
-                    if len(filter_terms[i]) == 0:
-                        continue
-                    if (
-                        filter_terms[i]
-                        in json_dict["packages"][key]["identifiers"][iden_key]
-                    ):
-                        keys_to_keep.add(key)
-
-    new_json_dict = copy.deepcopy(json_dict)
+        if index is None:
+            index = FieldIndex.from_packages(json_dict["packages"])
+        for i, iden_key in enumerate(iden_keys):
+            if len(filter_terms[i]) == 0 or INDEX_FIELDS.get(iden_key) != "identifiers":
+                continue
+            keys_to_keep |= index.select(iden_key, lambda x: filter_terms[i] in x)
+
+    new_json_dict = dict(json_dict)
     ## Remove packages
-    if len(keys_to_keep) > 0:
-        for key in keys:
-            if key not in keys_to_keep:
-                del new_json_dict["packages"][key]
+    if keys_to_keep:
+        new_json_dict["packages"] = dict(
+            (key, json_dict["packages"][key])
+            for key in index.package_names(keys_to_keep)
+            if key in json_dict["packages"]
+        )
+    else:
+        new_json_dict["packages"] = dict(json_dict["packages"])
 
     if len(new_json_dict["packages"].keys()) == key_count:
         ## If unable to return a filtered set return the original match list
-        print(
-            "\n:ggd:search: WARNING: Unable to filter packages using: '%s'"
-            % ", ".join(filter_terms)
-        )
-        print("\tThe un-filtered list will be used\n")
+        print_unfiltered_warning(filter_terms)
+
+    return new_json_dict
+
+
+def print_unfiltered_warning(filter_terms):
+    """
+    Method to warn that the packages could not be filtered by the filter terms (See filter_by_identifiers)
+    """
+    print(
+        "\n:ggd:search: WARNING: Unable to filter packages using: '%s'"
+        % ", ".join(filter_terms)
+    )
+    print("\tThe un-filtered list will be used\n")
+
+
+def parse_field_terms(search_terms):
+    """Method to separate field-scoped search terms from the other search terms
+
+    parse_field_terms
+    =================
+    This method is used to find the search terms of the form <field>:<value> (Example: provider:UCSC), 
+     where field is one of the SEARCH_FIELDS. Other terms with a ":" are normal search terms.
+
+    Parameters:
+    -----------
+    1) search_terms: (list) The search terms from the user
+
+    Returns:
+    ++++++++
+    1) (list) A list of (field, value) tuples, where field is one of the catalog.INDEX_FIELDS
+    2) (list) The other search terms
+    """
+
+    field_terms = []
+    other_terms = []
+    for term in search_terms:
+        field, sep, value = term.partition(":")
+        if sep and value and field.lower() in SEARCH_FIELDS:
+            field_terms.append((SEARCH_FIELDS[field.lower()], value))
+        else:
+            other_terms.append(term)
+
+    return (field_terms, other_terms)
+
+
+def filter_by_fields(field_terms, json_dict, index=None):
+    """Method to filter a json dictionary by field-scoped search terms
+
+    filter_by_fields
+    ================
+    This method is used to keep only the packages that match the field-scoped search terms (see parse_field_terms).
+     A package must match a term for every field used. Multiple terms for the same field match packages with
+     any of the values. Values are matched ignoring case. (Example: 'provider:UCSC filetype:bed filetype:gtf' keeps 
+     the UCSC packages with a bed or gtf file)
+
+    Parameters:
+    -----------
+    1) field_terms: (list)       A list of (field, value) tuples
+    2) json_dict:   (dict)       The json dictionary created from load_json()
+    3) index:       (FieldIndex) The field index of the packages in json_dict. (Default = None, built from json_dict)
+
+    Returns:
+    ++++++++
+    1) (dict) Updated/filtered json_dict. (The package entries are shared with json_dict)
+    """
+    from collections import defaultdict
+
+    from .catalog import FieldIndex
+
+    if index is None:
+        index = FieldIndex.from_packages(json_dict["packages"])
+
+    field_values = defaultdict(set)
+    for field, value in field_terms:
+        field_values[field].add(value.lower())
+
+    keys_to_keep = -1
+    for field, values in field_values.items():
+        keys_to_keep &= index.select(field, lambda x: x.lower() in values)
+
+    new_json_dict = dict(json_dict)
+    new_json_dict["packages"] = dict(
+        (key, json_dict["packages"][key])
+        for key in index.package_names(max(keys_to_keep, 0))
+        if key in json_dict["packages"]
+    )
 
     return new_json_dict
 
 
-def print_summary(search_terms, json_dict, match_list, installed_pkgs, installed_paths):
+def print_summary(
+    search_terms, json_dict, match_list, installed_pkgs, installed_paths, channels=None
+):
     """ Method to print the summary/results of the search
 
     print_summary
@@ -320,10 +761,12 @@ def print_summary(search_terms, json_dict, match_list, installed_pkgs, installed
     3) match_list:      (list) The filtered and final set of searched recipes
     4) installed_pkgs:  (set)  A set of pkg names that are installed
     5) installed_paths: (dict) A dictionary with keys = pkg names, values = installed paths
+    6) channels:        (dict) A dictionary with keys = pkg names, values = the ggd channel of the pkg. The channel
+                                is shown with each package if given. (Default = None, from a single channel search)
 
     Returns:
     +++++++
-    1) True if print summary printed out successfully
+    1) True if print summary printed out successfully, False if there are no results
     """
 
     dash = "     " + "-" * 100
@@ -333,7 +776,7 @@ def print_summary(search_terms, json_dict, match_list, installed_pkgs, installed
             "\n:ggd:search: No results for %s. Update your search term(s) and try again"
             % ", ".join(search_terms)
         )
-        sys.exit()
+        return False
     print("\n", dash)
     for pkg in match_list:
         results = []
@@ -352,6 +795,12 @@ def print_summary(search_terms, json_dict, match_list, installed_pkgs, installed
                         json_dict["packages"][pkg]["summary"],
                     )
                 )
+            if channels:
+                results.append(
+                    "\t{} {}".format(
+                        ("\033[1m" + "GGD Channel:" + "\033[0m"), channels[pkg]
+                    )
+                )
             if (
                 "identifiers" in json_dict["packages"][pkg]
                 and json_dict["packages"][pkg]["identifiers"]
@@ -470,9 +919,12 @@ def print_summary(search_terms, json_dict, match_list, installed_pkgs, installed
                 from .utils import check_for_meta_recipes
 
                 results.append(
-                    "\n\tTo install run:\n\t\tggd install %s %s"
+                    "\n\tTo install run:\n\t\tggd install %s %s%s"
                     % (
                         pkg,
+                        "-c %s " % channels[pkg]
+                        if channels and channels[pkg] != "genomics"
+                        else "",
                         "--id <meta-recipe ID>"
                         if check_for_meta_recipes(pkg, json_dict)
                         else "",
@@ -495,101 +947,517 @@ def print_summary(search_terms, json_dict, match_list, installed_pkgs, installed
     return True
 
 
-def search(parser, args):
-    """Main method for ggd search. 
+def search_result_fields(json_dict, installed_paths, channels=None):
+    """Method to get the functions that build each field of a search result for json, jsonl, and tsv output
 
-    search
-    =====
-    Main method for running a recipe/package search
+    search_result_fields
+    ====================
+    Each function takes a pkg name and returns the value of one field. Only the fields requested with --fields
+     are built (See output.iter_records). Fields missing from the package metadata are None.
 
     Parameters:
-    ----------
-    1) parser  
-    2) args
+    -----------
+    1) json_dict:       (dict) The channeldata json dictionary with the matched packages
+    2) installed_paths: (dict) A dictionary with keys = installed pkg names, values = installed paths
+    3) channels:        (dict) A dictionary with keys = pkg names, values = the ggd channel of the pkg.
+                                (Default = None, the ggd-channel tag of the pkg)
+
+    Returns:
+    ++++++++
+    1) (dict) key = field name from SEARCH_OUTPUT_FIELDS, value = a function of the pkg name
+    """
+    from .utils import check_for_meta_recipes
+
+    def info(pkg):
+        return json_dict["packages"][pkg]
+
+    def identifier(key):
+        return lambda pkg: (info(pkg).get("identifiers") or {}).get(key)
+
+    def tag(key):
+        return lambda pkg: (info(pkg).get("tags") or {}).get(key)
+
+    field_getters = {
+        "name": lambda pkg: pkg,
+        "channel": lambda pkg: channels[pkg] if channels else tag("ggd-channel")(pkg),
+        "version": lambda pkg: info(pkg).get("version"),
+        "summary": lambda pkg: info(pkg).get("summary"),
+        "species": identifier("species"),
+        "genome-build": identifier("genome-build"),
+        "keywords": lambda pkg: info(pkg).get("keywords") or [],
+        "data-provider": tag("data-provider"),
+        "data-version": tag("data-version"),
+        "file-type": tag("file-type"),
+        "genomic-coordinate-base": tag("genomic-coordinate-base"),
+        "final-files": tag("final-files"),
+        "final-file-sizes": tag("final-file-sizes"),
+        "meta-recipe": lambda pkg: check_for_meta_recipes(pkg, json_dict),
+        "installed": lambda pkg: pkg in installed_paths,
+        "installed-path": lambda pkg: installed_paths.get(pkg),
+    }
+
+    return dict((field, field_getters[field]) for field in SEARCH_OUTPUT_FIELDS)
+
+
+def search_cache_key(
+    channeldata,
+    search_terms,
+    field_terms,
+    species,
+    genome_builds,
+    search_type,
+    score_cutoff,
+):
+    """Method to get the key of a search in the search result cache
+
+    search_cache_key
+    ================
+    The key is a hash of the ggd version, the channel, the hash of its channeldata.json file (see 
+     utils.ChannelData.fingerprint), and the search. A new ggd version (which may rank the matches differently) 
+     does not use the results of an older version. Search terms are not case sensitive and the order of the filters does not change the 
+     results, so searches that only differ by those have the same key. A new channeldata.json file gives 
+     every search a new key, so results from older metadata are never used.
+
+    Parameters:
+    -----------
+    1) channeldata:   (ChannelData) The metadata of the ggd channel searched
+    2) search_terms:  (list)        The search terms used to score packages
+    3) field_terms:   (list)        The field-scoped search terms (See parse_field_terms)
+    4) species:       (list)        The species the packages are filtered by
+    5) genome_builds: (list)        The genome builds the packages are filtered by
+    6) search_type:   (str)         How to use the search terms (See match_scores)
+    7) score_cutoff:  (int)         The match score cutoff
+
+    Returns:
+    ++++++++
+    1) (str) The cache key, or None if the search can not be cached
+    """
+    import hashlib
+    import json
+
+    from .__init__ import __version__
+    from .utils import SEARCH_CACHE_SIZE, env_int
+
+    if env_int("GGD_SEARCH_CACHE_SIZE", SEARCH_CACHE_SIZE) < 1:
+        return None
+
+    fingerprint = channeldata.fingerprint
+    if fingerprint is None:
+        return None
+
+    search = [
+        str(__version__),
+        channeldata.channel,
+        fingerprint,
+        [x.lower() for x in search_terms],
+        sorted([field, value.lower()] for field, value in field_terms),
+        sorted(set(species)),
+        sorted(set(genome_builds)),
+        search_type,
+        int(score_cutoff),
+    ]
+    return hashlib.sha256(json.dumps(search).encode("utf-8")).hexdigest()
+
+
+def read_search_cache(key, limit=None):
+    """Method to get the results of a search from the search result cache
+
+    read_search_cache
+    =================
+    Method used to get the ranked matches of a search stored by write_search_cache. Cached results are only 
+     used if they include the top limit matches. A cache entry that is used is marked as recently used.
+     The filter terms that could not filter the packages are stored with the matches, so the search can warn 
+     about them again.
+
+    Parameters:
+    -----------
+    1) key:   (str) The cache key of the search (See search_cache_key)
+    2) limit: (int) The number of top matches needed. (Default = None, all matches)
+
+    Returns:
+    ++++++++
+    1) (list) The top [pkg name, score] matches, in rank order, or None if the search is not cached
+    2) (int)  The total number of matches
+    3) (list) The filter terms that could not filter the packages, or None (See filter_by_identifiers)
+    """
+    import json
+
+    from .utils import SEARCH_CACHE_DIR
+
+    cache_path = os.path.join(SEARCH_CACHE_DIR, key + ".json")
+    try:
+        with open(cache_path) as c:
+            cached = json.load(c)
+        matches = cached["matches"]
+        if len(matches) < cached["count"] and (limit is None or cached["limit"] < limit):
+            return (None, 0, None)
+        os.utime(cache_path, None)
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        return (None, 0, None)
+
+    return (
+        matches[0:limit] if limit is not None else matches,
+        cached["count"],
+        cached.get("unfiltered"),
+    )
+
+
+def write_search_cache(key, matches, count, limit=None, unfiltered=None):
+    """Method to add the results of a search to the search result cache
+
+    write_search_cache
+    ==================
+    Method used to store the ranked matches of a search in the SEARCH_CACHE_DIR. Each search is stored in its
+     own file. If there are more than GGD_SEARCH_CACHE_SIZE (Default = SEARCH_CACHE_SIZE) cached searches, the 
+     least recently used are removed. The cache is only an optimization, so a search that can not be cached is 
+     not an error.
+
+    Parameters:
+    -----------
+    1) key:        (str)  The cache key of the search (See search_cache_key)
+    2) matches:    (dict) key = the top pkg names, in rank order, value = the name match score of the pkg
+    3) count:      (int)  The total number of matches
+    4) limit:      (int)  The number of top matches that were ranked. (Default = None, all matches)
+    5) unfiltered: (list) The filter terms that could not filter the packages. (Default = None)
+    """
+    import json
+
+    from .utils import (
+        SEARCH_CACHE_DIR,
+        SEARCH_CACHE_SIZE,
+        atomic_write,
+        env_int,
+        make_cache_dir,
+    )
+
+    try:
+        make_cache_dir(SEARCH_CACHE_DIR)
+        with atomic_write(os.path.join(SEARCH_CACHE_DIR, key + ".json")) as c:
+            json.dump(
+                {
+                    "limit": limit,
+                    "count": count,
+                    "matches": list(matches.items()),
+                    "unfiltered": unfiltered,
+                },
+                c,
+            )
+
+        ## Remove the least recently used searches
+        max_size = env_int("GGD_SEARCH_CACHE_SIZE", SEARCH_CACHE_SIZE)
+        entries = [
+            os.path.join(SEARCH_CACHE_DIR, x)
+            for x in os.listdir(SEARCH_CACHE_DIR)
+            if x.endswith(".json")
+        ]
+        if len(entries) > max_size:
+            entries.sort(key=os.path.getmtime)
+            for entry in entries[0 : len(entries) - max_size]:
+                os.remove(entry)
+    except (IOError, OSError):
+        pass
+
+
+def search_channel(
+    ggd_channel,
+    search_terms,
+    field_terms,
+    species,
+    genome_builds,
+    search_type="both",
+    score_cutoff=90,
+    limit=None,
+):
+    """Method to search the packages of a single ggd channel
+
+    search_channel
+    ==============
+    Method used to filter and score the packages of a ggd channel for ggd search. Only the top limit matches
+     are returned with their scores, with the total number of matches. If there are only field-scoped search
+     terms every package that matches them is a result, in channel order, and has a score of 100.
+
+    Parameters:
+    -----------
+    1) ggd_channel:   (str)  The ggd channel to search
+    2) search_terms:  (list) The search terms used to score packages (Not the species, genome build, or field-scoped terms)
+    3) field_terms:   (list) The field-scoped search terms (See parse_field_terms)
+    4) species:       (list) The species to filter the packages by
+    5) genome_builds: (list) The genome builds to filter the packages by
+    6) search_type:   (str)  How to use the search terms (See match_scores)
+    7) score_cutoff:  (int)  The match score cutoff (See match_scores)
+    8) limit:         (int)  The number of top matches to return. (Default = None, all matches)
+
+    Returns:
+    ++++++++
+    1) (dict) The channeldata json dictionary with the filtered packages
+    2) (dict) key = the top matching pkg names, in rank order, value = the name match score of the pkg
+    3) (int)  The total number of matching packages
     """
-    from .utils import get_builds, get_channeldata_url
+    from .utils import load_channeldata
 
     ## load the channeldata.json file
-    j_dict = load_json_from_url(get_channeldata_url(args.channel))
+    channeldata = load_channeldata(ggd_channel)
+
+    ## Use the results of the same search of the same channel metadata if they are cached. Only the matched packages
+    ##  are loaded, from the catalog
+    cache_key = search_cache_key(
+        channeldata,
+        search_terms,
+        field_terms,
+        species,
+        genome_builds,
+        search_type,
+        score_cutoff,
+    )
+    if cache_key is not None:
+        matches, num_matches, unfiltered = read_search_cache(cache_key, limit)
+        if matches is not None:
+            if unfiltered:
+                print_unfiltered_warning(unfiltered)
+            j_dict = {
+                "packages": dict(
+                    (pkg, channeldata.get_package(pkg)) for pkg, score in matches
+                )
+            }
+            return (j_dict, dict(matches), num_matches)
+
+    j_dict = channeldata.copy()
 
     ## Remove the ggd key if it exists
     ggd_key = j_dict["packages"].pop("ggd", None)
 
-    ## identify if search_terms have any species or genome build in them
-    species_lower = {x.lower(): x for x in SPECIES_LIST}
-    gb_lower = {x.lower(): x for x in GENOME_BUILDS}
-    filtered_search_terms = []
-    for term in args.search_term:
-        if term.lower() in species_lower.keys():
-            if species_lower[term.lower()] not in args.species:
-                args.species.append(species_lower[term.lower()])
-        elif term.lower() in gb_lower.keys():
-            if gb_lower[term.lower()] not in args.genome_build:
-                args.genome_build.append(gb_lower[term.lower()])
-        else:
-            ## Only use search terms that are not used to filter the results by identifiers
-            filtered_search_terms.append(term)
-
-    ## genome_build takes precedence over species (If genome build provided, species is implied)
-    final_species_list = args.species
-    for species in args.species:
-        build = get_builds(species)
-        if [x for x in build if x in args.genome_build]:
-            final_species_list.remove(species)
-    args.species = final_species_list
-
     ## Filter the json dict by species or genome build if applicable
-    if args.genome_build or args.species:
+    unfiltered = None
+    if genome_builds or species:
+        num_packages = len(j_dict["packages"])
         j_dict = filter_by_identifiers(
-            ["species"] * len(args.species) + ["genome-build"] * len(args.genome_build),
+            ["species"] * len(species) + ["genome-build"] * len(genome_builds),
             j_dict,
-            args.species + args.genome_build,
+            species + genome_builds,
+            channeldata.field_index,
         )
+        if len(j_dict["packages"]) == num_packages:
+            unfiltered = species + genome_builds
 
-    ## Search pkg names and keywords
-    match_results = search_packages(
-        j_dict, filtered_search_terms, args.search_type, int(args.match_score)
-    )
+    ## Filter the json dict by the field-scoped search terms
+    if field_terms:
+        j_dict = filter_by_fields(field_terms, j_dict, channeldata.field_index)
 
-    ## Get installed paths
-    installed_dict = {}
-    installed_set = set()
-    for pkg in match_results:
-        isinstalled, path = check_installed(pkg, j_dict)
-        if isinstalled:
-            installed_dict[pkg] = path
-            installed_set.add(pkg)
-
-    ## Print search results
-    match_result_num = str(len(match_results))
-    if int(match_result_num) >= int(args.display_number):
-        subset_match_results = match_results[0 : int(args.display_number)]
+    ## Search pkg names and keywords. If only field-scoped terms are used every package that matches them is a result.
+    ##  Only the top limit results are ranked
+    if field_terms and not search_terms:
+        scores = dict((pkg, 100.0) for pkg in j_dict["packages"])
     else:
-        subset_match_results = match_results
+        scores = match_scores(
+            j_dict, search_terms, search_type, score_cutoff, channeldata.search_index
+        )
+
+    matches = dict((pkg, scores[pkg]) for pkg in rank_matches(scores, limit))
+    if cache_key is not None:
+        write_search_cache(cache_key, matches, len(scores), limit, unfiltered)
+
+    return (j_dict, matches, len(scores))
+
+
+def search_all_channels(channels, *search_args, **search_kwargs):
+    """Method to search several ggd channels at the same time
+
+    search_all_channels
+    ===================
+    Method used to run search_channel for each ggd channel in its own thread, so the channels are loaded and
+     searched at the same time. The local metadata files of all channels are updated together first (See
+     utils.update_channels_data), so the time to search is close to the time to search the slowest channel,
+     mostly spent downloading and reading the channel metadata files.
+
+    Parameters:
+    -----------
+    1) channels:      (list) The ggd channels to search
+    2) search_args:   The other arguments for search_channel
+    3) search_kwargs: The other keyword arguments for search_channel
+
+    Returns:
+    ++++++++
+    1) (list) The (channel, search_channel result) tuples, in the order of channels
+    """
+    from .utils import thread_pool, update_channels_data
+
+    ## Each channel thread would otherwise wait on the metadata lock to download its own channel
+    update_channels_data(channels)
+
+    with thread_pool(max(len(channels), 1)) as pool:
+        futures = [
+            pool.submit(search_channel, channel, *search_args, **search_kwargs)
+            for channel in channels
+        ]
+        ## Raise any search error
+        return [
+            (channel, future.result()) for channel, future in zip(channels, futures)
+        ]
+
 
-    ## Print search results to STDOUT
-    printed = print_summary(
-        args.search_term, j_dict, subset_match_results, installed_set, installed_dict
+def search(parser, args):
+    """Main method for ggd search. 
+
+    search
+    =====
+    Main method for running a recipe/package search
+
+     If the channel is ALL_CHANNELS every ggd channel is searched (See search_all_channels). The matches of all 
+      channels are ranked together and each result shows the channel it is from. If two channels have a package
+      with the same name only the higher ranked one is reported.
+
+    Parameters:
+    ----------
+    1) parser  
+    2) args
+
+    Returns:
+    ++++++++
+    1) True if there are search results, False if not
+    """
+    from .output import (
+        diagnostics_to_stderr,
+        iter_records,
+        select_fields,
+        write_records,
     )
+    from .utils import get_builds, get_ggd_channels
 
-    ## Add a comment if a subset of search results are provided
-    if int(match_result_num) > int(args.display_number):
-        print(
-            "\n\n:ggd:search: NOTE: Only showing results for top {d} of {m} matches.".format(
-                d=str(args.display_number), m=match_result_num
-            )
-        )
+    ## Args built by other callers (without the command line parser) may not have the output options
+    output_format = getattr(args, "format", "text")
+    output_fields = getattr(args, "fields", None)
 
-        print(
-            ":ggd:search: To display all matches append your search command with '-dn {m}'".format(
-                m=match_result_num
+    with diagnostics_to_stderr(output_format) as out:
+        ## Check the requested output fields before searching
+        if output_format != "text":
+            fields = select_fields(
+                output_fields, dict((x, None) for x in SEARCH_OUTPUT_FIELDS), "search"
             )
+
+        ## Separate the field-scoped search terms (Example: provider:UCSC)
+        field_terms, search_terms = parse_field_terms(args.search_term)
+
+        ## identify if search_terms have any species or genome build in them
+        species_lower = {x.lower(): x for x in get_species(update_files=False)}
+        gb_lower = {x.lower(): x for x in get_builds("*")}
+        filtered_search_terms = []
+        for term in search_terms:
+            if term.lower() in species_lower.keys():
+                if species_lower[term.lower()] not in args.species:
+                    args.species.append(species_lower[term.lower()])
+            elif term.lower() in gb_lower.keys():
+                if gb_lower[term.lower()] not in args.genome_build:
+                    args.genome_build.append(gb_lower[term.lower()])
+            else:
+                ## Only use search terms that are not used to filter the results by identifiers
+                filtered_search_terms.append(term)
+
+        ## genome_build takes precedence over species (If genome build provided, species is implied)
+        final_species_list = args.species
+        for species in args.species:
+            build = get_builds(species)
+            if [x for x in build if x in args.genome_build]:
+                final_species_list.remove(species)
+        args.species = final_species_list
+
+        ## Search the channel(s)
+        search_args = (
+            filtered_search_terms,
+            field_terms,
+            args.species,
+            args.genome_build,
+            args.search_type,
+            int(args.match_score),
+            int(args.display_number),
         )
-        print(
-            "\n\t ggd search {t} -dn {m}\n".format(
-                t=" ".join(args.search_term), m=match_result_num
+        if args.channel == ALL_CHANNELS:
+            channel_results = search_all_channels(get_ggd_channels(), *search_args)
+        else:
+            channel_results = [
+                (args.channel, search_channel(args.channel, *search_args))
+            ]
+
+        ## Rank the top matches of every channel together
+        channel_dicts = {}
+        channel_scores = {}
+        match_result_num = 0
+        for channel, (channel_dict, scores, num_matches) in channel_results:
+            channel_dicts[channel] = channel_dict
+            match_result_num += num_matches
+            for pkg, score in scores.items():
+                channel_scores[(channel, pkg)] = score
+
+        j_dict = {"packages": {}}
+        channels = {}
+        subset_match_results = []
+        for channel, pkg in rank_matches(channel_scores, int(args.display_number)):
+            if pkg in channels:
+                continue
+            j_dict["packages"][pkg] = channel_dicts[channel]["packages"][pkg]
+            channels[pkg] = channel
+            subset_match_results.append(pkg)
+
+        ## Get installed paths. The ggd data dirs are scanned once for all results
+        installed = installed_packages() if subset_match_results else dict()
+        installed_dict = {}
+        installed_set = set()
+        for pkg in subset_match_results:
+            isinstalled, path = check_installed(pkg, j_dict, installed)
+            if isinstalled:
+                installed_dict[pkg] = path
+                installed_set.add(pkg)
+
+        ## Stream the results in a machine-readable format
+        if output_format != "text":
+            write_records(
+                iter_records(
+                    subset_match_results,
+                    search_result_fields(j_dict, installed_dict, channels),
+                    fields,
+                ),
+                fields,
+                output_format,
+                out,
             )
+            if match_result_num > int(args.display_number):
+                print(
+                    ":ggd:search: NOTE: Only showing results for top {d} of {m} matches. Use '-dn {m}' to get all matches".format(
+                        d=str(args.display_number), m=match_result_num
+                    ),
+                    file=sys.stderr,
+                )
+            return True if subset_match_results else False
+
+        ## Print search results to STDOUT
+        printed = print_summary(
+            args.search_term,
+            j_dict,
+            subset_match_results,
+            installed_set,
+            installed_dict,
+            channels if args.channel == ALL_CHANNELS else None,
         )
 
-    ## Return result of print_summary
-    return printed
+        ## Add a comment if a subset of search results are provided
+        if match_result_num > int(args.display_number):
+            print(
+                "\n\n:ggd:search: NOTE: Only showing results for top {d} of {m} matches.".format(
+                    d=str(args.display_number), m=match_result_num
+                )
+            )
+
+            print(
+                ":ggd:search: To display all matches append your search command with '-dn {m}'".format(
+                    m=match_result_num
+                )
+            )
+            print(
+                "\n\t ggd search {t}{c} -dn {m}\n".format(
+                    t=" ".join(args.search_term),
+                    c=" -c " + args.channel if args.channel != "genomics" else "",
+                    m=match_result_num,
+                )
+            )
+
+        ## Return result of print_summary
+        return printed
@@ -0,0 +1,645 @@
+# -------------------------------------------------------------------------------------------------------------
+## Import Statements
+# -------------------------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import json
+import os
+import sys
+
+from .utils import LOCAL_REPO_DIR, channel_choices, lazy_choice
+
+# -------------------------------------------------------------------------------------------------------------
+## Global Variables
+# -------------------------------------------------------------------------------------------------------------
+
+## The Unix socket of the ggd serve daemon. Override with the GGD_SERVE_SOCKET environment variable. Set GGD_SERVE=0 to
+##  run every command in the calling process even if a daemon is running. Each user has their own daemon, so the socket
+##  is in the user's runtime dir, or has the user id in its name if GGD_LOCAL is used (GGD_LOCAL can be shared by a group)
+SERVE_SOCKET = os.getenv(
+    "GGD_SERVE_SOCKET",
+    os.path.join(os.environ["XDG_RUNTIME_DIR"], "ggd-serve.sock")
+    if os.environ.get("XDG_RUNTIME_DIR")
+    else os.path.join(
+        LOCAL_REPO_DIR, "ggd-serve-{}.sock".format(getattr(os, "getuid", int)())
+    ),
+)
+
+## The daemon only answers a command if these environment variables are the same for the calling process and the daemon.
+##  (The conda and ggd settings, and the home dir with the conda and ggd config files)
+SERVE_ENV_PREFIXES = ("CONDA", "GGD_")
+SERVE_ENV_VARS = ["HOME"]
+SERVE_ENV_IGNORE = ["GGD_SERVE", "GGD_SERVE_SOCKET"]
+
+## Seconds to wait to connect to the daemon, for a client to send its request, and for a client to read the output
+SERVE_CONNECT_TIMEOUT = 1
+SERVE_REQUEST_TIMEOUT = 5
+SERVE_WRITE_TIMEOUT = 60
+
+## The most worker processes that answer commands at the same time by default (one per CPU), and the number of
+##  connections that can wait for a free worker
+SERVE_WORKERS = 4
+SERVE_BACKLOG = 128
+
+
+# -------------------------------------------------------------------------------------------------------------
+## Argument Parser
+# -------------------------------------------------------------------------------------------------------------
+def add_serve(p):
+
+    c = p.add_parser(
+        "serve",
+        help="Run a ggd daemon that answers search, predict-path, and get-files commands for other ggd processes",
+        description=(
+            "Run a ggd daemon that keeps the channel metadata, search indexes, and conda settings loaded. While it runs,"
+            " 'ggd search', 'ggd predict-path', and 'ggd get-files' are answered by the daemon over a Unix socket."
+            " (Useful for workflows, such as Snakemake, that run many ggd commands) The daemon reloads the channel"
+            " metadata when the local metadata files change. Stop it with 'ggd serve --stop' or Ctrl-C."
+        ),
+    )
+    c.add_argument(
+        "-c",
+        "--channel",
+        default=[],
+        action="append",
+        type=lazy_choice(channel_choices),
+        help="(Optional) A ggd channel to load when the daemon starts. Use once per channel. (Default = genomics)",
+    )
+    c.add_argument(
+        "--socket",
+        default=None,
+        help="(Optional) The file path of the Unix socket. (Default = {})".format(
+            SERVE_SOCKET
+        ),
+    )
+    c.add_argument(
+        "--workers",
+        default=None,
+        type=int,
+        help="(Optional) The number of processes that answer commands at the same time. (Default = the number of CPUs, up to {})".format(
+            SERVE_WORKERS
+        ),
+    )
+    c.add_argument(
+        "--status",
+        action="store_true",
+        help="(Optional) Report if a daemon is running and exit",
+    )
+    c.add_argument(
+        "--stop",
+        action="store_true",
+        help="(Optional) Stop a running daemon and exit",
+    )
+    c.set_defaults(func=serve)
+
+
+# -------------------------------------------------------------------------------------------------------------
+## Functions/Methods
+# -------------------------------------------------------------------------------------------------------------
+
+
+def serve_environment():
+    """Method to get the settings that must match for a daemon to answer a command
+
+    serve_environment
+    =================
+    Method used to get the environment variables, python executable, and ggd version of the current process. The
+     daemon only answers a command if the client has the same settings. Otherwise the client runs the command itself.
+
+    Returns:
+    ++++++++
+    1) (dict) The settings
+    """
+
+    from .__init__ import __version__
+
+    env = dict(
+        (key, value)
+        for key, value in os.environ.items()
+        if (key.startswith(SERVE_ENV_PREFIXES) or key in SERVE_ENV_VARS)
+        and key not in SERVE_ENV_IGNORE
+    )
+
+    return {"env": env, "python": sys.executable, "version": str(__version__)}
+
+
+def owned_by_user(socket_path):
+    """Method to check if a Unix socket file belongs to the current user
+
+    owned_by_user
+    =============
+    Method used to check that a socket file is a socket and is owned by the current user before it is used or removed.
+     A daemon of another user (for example in a shared GGD_LOCAL) is never sent a command.
+
+    Parameters:
+    -----------
+    1) socket_path: (str) The file path of the Unix socket
+
+    Returns:
+    ++++++++
+    1) (bool) True if the socket is owned by the current user, False otherwise
+    """
+    import stat
+
+    try:
+        socket_stat = os.lstat(socket_path)
+    except OSError:
+        return False
+
+    return stat.S_ISSOCK(socket_stat.st_mode) and socket_stat.st_uid == os.getuid()
+
+
+def connect(socket_path, timeout=SERVE_CONNECT_TIMEOUT):
+    """Method to connect to a ggd serve daemon
+
+    connect
+    =======
+    Method used to open a connection to the Unix socket of a daemon. socket.error (an OSError) is raised if
+     there is no daemon listening on the socket, or if the socket or the daemon is not owned by the current user.
+
+    Parameters:
+    -----------
+    1) socket_path: (str) The file path of the Unix socket
+    2) timeout:     (int) The seconds to wait to connect
+
+    Returns:
+    ++++++++
+    1) (socket) The connected socket
+    """
+    import socket
+
+    if not owned_by_user(socket_path):
+        raise socket.error(
+            "The socket {} is not owned by the current user".format(socket_path)
+        )
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.settimeout(None)
+
+        ## Check the user of the daemon process too, in case the socket file was replaced after it was checked
+        if hasattr(socket, "SO_PEERCRED"):
+            import struct
+
+            pid, uid, gid = struct.unpack(
+                "3i",
+                sock.getsockopt(
+                    socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+                ),
+            )
+            if uid != os.getuid():
+                raise socket.error(
+                    "The daemon on {} is not owned by the current user".format(
+                        socket_path
+                    )
+                )
+    except Exception:
+        sock.close()
+        raise
+
+    return sock
+
+
+def send_message(sock, message):
+    """Method to send a message (a json object on one line) over a daemon connection"""
+
+    sock.sendall((json.dumps(message) + "\n").encode("utf8"))
+
+
+def iter_messages(sock):
+    """Method to read the messages (one json object per line) from a daemon connection"""
+
+    for line in sock.makefile("rb"):
+        yield json.loads(line.decode("utf8"))
+
+
+def daemon_request(message, socket_path=None):
+    """Method to send a control request (status or stop) to a ggd serve daemon
+
+    daemon_request
+    ==============
+    Method used to send a single request to a daemon and get its answer
+
+    Parameters:
+    -----------
+    1) message:     (dict) The request. (Example: {"status": True})
+    2) socket_path: (str)  The file path of the Unix socket. (Default = None, SERVE_SOCKET)
+
+    Returns:
+    ++++++++
+    1) (dict) The answer of the daemon, or None if no daemon is running
+    """
+
+    socket_path = socket_path if socket_path != None else SERVE_SOCKET
+    try:
+        sock = connect(socket_path)
+    except (OSError, IOError):
+        return None
+
+    try:
+        sock.settimeout(SERVE_REQUEST_TIMEOUT)
+        send_message(sock, message)
+        for answer in iter_messages(sock):
+            return answer
+    except (OSError, IOError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+    return None
+
+
+def run_in_daemon(args, socket_path=None):
+    """Method to run a ggd command with a running ggd serve daemon
+
+    run_in_daemon
+    =============
+    Method used by ggd's main method to send a command to the daemon. The output of the command is written to
+     stdout and stderr as the daemon sends it. None is returned, and the command should be run in this process, if
+     there is no daemon, GGD_SERVE=0, the daemon has different settings (See serve_environment), or the connection
+     fails before any output is written.
+
+    Parameters:
+    -----------
+    1) args:        (list) The ggd command line arguments. (Example: ["search", "reference", "genome"])
+    2) socket_path: (str)  The file path of the Unix socket. (Default = None, SERVE_SOCKET)
+
+    Returns:
+    ++++++++
+    1) (int) The exit code of the command, or None if the daemon did not run it
+    """
+
+    socket_path = socket_path if socket_path != None else SERVE_SOCKET
+    if os.environ.get("GGD_SERVE") == "0" or not os.path.exists(socket_path):
+        return None
+
+    try:
+        sock = connect(socket_path)
+    except (OSError, IOError):
+        return None
+
+    wrote_output = False
+    try:
+        request = serve_environment()
+        request.update({"argv": list(args), "cwd": os.getcwd()})
+        send_message(sock, request)
+
+        for message in iter_messages(sock):
+            if "fallback" in message:
+                return None
+            if "exit" in message:
+                return message["exit"]
+            for name, stream in [("stdout", sys.stdout), ("stderr", sys.stderr)]:
+                if name in message:
+                    stream.write(message[name])
+                    stream.flush()
+                    wrote_output = True
+
+    except (OSError, IOError, ValueError):
+        pass
+    finally:
+        sock.close()
+
+    ## The daemon stopped before the command finished
+    if not wrote_output:
+        return None
+    print(
+        "\n:ggd:serve: !!ERROR!! The connection to the ggd serve daemon was lost before the command finished",
+        file=sys.stderr,
+    )
+    return 1
+
+
+class DaemonStream(object):
+    """
+    A file-like object used as stdout or stderr while the daemon runs a command. Each write is sent to the client
+     right away.
+    """
+
+    encoding = "utf-8"
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.name = name
+
+    def write(self, text):
+        if text:
+            send_message(self.sock, {self.name: text})
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def answer_request(sock, run_command, settings, daemon_pid):
+    """Method used by the daemon to answer a request from a client
+
+    answer_request
+    ==============
+    Method used to read a request from a client connection and answer it. A command is run in the daemon process
+     with stdout and stderr sent to the client, and the exit code is sent when the command finishes. The channel
+     metadata is reloaded first if it is out of date. (See utils.expire_channeldata)
+
+    Parameters:
+    -----------
+    1) sock:        (socket)   The client connection
+    2) run_command: (function) The function that runs a ggd command from its command line arguments
+    3) settings:    (dict)     The settings of the daemon (See serve_environment)
+    4) daemon_pid:  (int)      The process id of the daemon
+
+    Returns:
+    ++++++++
+    1) (bool) True if the daemon should stop, False otherwise
+    """
+    import traceback
+
+    from .utils import expire_channeldata
+
+    sock.settimeout(SERVE_REQUEST_TIMEOUT)
+    request = next(iter_messages(sock))
+    sock.settimeout(SERVE_WRITE_TIMEOUT)
+
+    if request.get("status") or request.get("stop"):
+        send_message(sock, {"pid": daemon_pid, "stopping": bool(request.get("stop"))})
+        return bool(request.get("stop"))
+
+    ## Only answer commands from processes with the same settings
+    if any(request.get(key) != value for key, value in settings.items()):
+        send_message(sock, {"fallback": "The ggd settings are different"})
+        return False
+
+    saved_cwd = os.getcwd()
+    try:
+        os.chdir(request["cwd"])
+    except OSError:
+        send_message(sock, {"fallback": "The working dir is not available"})
+        return False
+
+    expire_channeldata()
+
+    saved_stdout, saved_stderr = sys.stdout, sys.stderr
+    sys.stdout = DaemonStream(sock, "stdout")
+    sys.stderr = DaemonStream(sock, "stderr")
+    try:
+        exit_code = run_command(request["argv"]) or 0
+    except SystemExit as e:
+        ## The same exit codes as a ggd process
+        exit_code = e.code
+        if exit_code is None:
+            exit_code = 0
+        elif not isinstance(exit_code, int):
+            print(exit_code, file=sys.stderr)
+            exit_code = 1
+    except Exception:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        sys.stdout, sys.stderr = saved_stdout, saved_stderr
+        os.chdir(saved_cwd)
+
+    send_message(sock, {"exit": exit_code})
+    return False
+
+
+def command_runner():
+    """Method to get the function the daemon uses to run a ggd command
+
+    command_runner
+    ==============
+    The argument parser of each sub-command is built once and reused for every later command.
+
+    Returns:
+    ++++++++
+    1) (function) A function that runs a ggd command from its command line arguments (See __main__.run_command)
+    """
+
+    from .__main__ import build_parser, run_command, selected_sub_command
+
+    parsers = dict()
+
+    def run(args):
+        command = selected_sub_command(args)
+        if command not in parsers:
+            parsers[command] = build_parser(command)
+        return run_command(args, parsers[command])
+
+    return run
+
+
+def warm_up(channels):
+    """Method to load the channel metadata and the modules of the served commands when the daemon starts
+
+    warm_up
+    =======
+    Parameters:
+    -----------
+    1) channels: (list) The ggd channels to load
+    """
+    import importlib
+
+    from .__main__ import SERVED_COMMANDS, SUB_COMMANDS
+    from .utils import load_channeldata
+
+    for name, module, add_function, help_message in SUB_COMMANDS:
+        if name in SERVED_COMMANDS:
+            importlib.import_module(".{}".format(module), __package__ or "ggd")
+
+    for ggd_channel in channels:
+        channeldata = load_channeldata(ggd_channel)
+        channeldata.json_dict
+        channeldata.field_index
+        if channeldata.search_index is not None:
+            channeldata.search_index.search_arrays()
+
+
+def serve(parser, args):
+    """Main method of ggd serve
+
+    serve
+    =====
+    Main method used to run the ggd serve daemon, or to check or stop a running daemon. The daemon listens on a Unix
+     socket that only the current user can use, and answers commands with --workers worker processes until it
+     is stopped.
+
+    Parameters:
+    -----------
+    1) parser
+    2) args
+    """
+    import signal
+    import socket
+
+    from .__main__ import SERVED_COMMANDS
+
+    socket_path = args.socket if args.socket != None else SERVE_SOCKET
+
+    ## Check or stop a running daemon
+    if args.status or args.stop:
+        answer = daemon_request(
+            {"status": True, "stop": bool(args.stop)}, socket_path
+        )
+        if answer is None:
+            print("\n:ggd:serve: No ggd serve daemon is running on {}".format(socket_path))
+            return False
+        print(
+            "\n:ggd:serve: The ggd serve daemon (pid {p}) on {f} is {s}".format(
+                p=answer["pid"],
+                f=socket_path,
+                s="stopping" if args.stop else "running",
+            )
+        )
+        return True
+
+    ## Only one daemon per socket. A socket file without a daemon is left from a daemon that did not stop cleanly.
+    ##  The socket of another user is never removed
+    if os.path.lexists(socket_path):
+        if not owned_by_user(socket_path):
+            sys.exit(
+                "\n:ggd:serve: !!ERROR!! {} is not a socket owned by the current user. Use --socket or GGD_SERVE_SOCKET to choose another socket\n".format(
+                    socket_path
+                )
+            )
+        if daemon_request({"status": True}, socket_path) is not None:
+            sys.exit(
+                "\n:ggd:serve: !!ERROR!! A ggd serve daemon is already running on {}. Stop it with 'ggd serve --stop'\n".format(
+                    socket_path
+                )
+            )
+        os.remove(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    saved_umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(saved_umask)
+    server.listen(SERVE_BACKLOG)
+
+    ## Stop cleanly on 'kill'
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    channels = args.channel if args.channel else ["genomics"]
+    settings = serve_environment()
+    if args.workers != None:
+        workers = int(args.workers)
+    else:
+        import multiprocessing
+
+        workers = min(SERVE_WORKERS, multiprocessing.cpu_count())
+    workers = workers if hasattr(os, "fork") else 1
+    print(
+        "\n:ggd:serve: Serving ggd {c} on {s} (pid {p}, {w} worker(s))".format(
+            c=", ".join(SERVED_COMMANDS), s=socket_path, p=os.getpid(), w=workers
+        )
+    )
+    sys.stdout.flush()
+
+    children = set()
+    try:
+        if workers <= 1:
+            serve_connections(server, channels, settings, os.getpid())
+        else:
+            ## Import the served modules once. Each worker loads its own channel metadata (and SQLite connections)
+            warm_up([])
+            for i in range(workers):
+                children.add(fork_worker(server, channels, settings))
+
+            ## Replace a worker that stopped until the daemon is stopped
+            while True:
+                pid, status = os.wait()
+                if pid in children:
+                    children.remove(pid)
+                    children.add(fork_worker(server, channels, settings))
+
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+        server.close()
+        if owned_by_user(socket_path):
+            os.remove(socket_path)
+
+    print("\n:ggd:serve: Stopped the ggd serve daemon")
+    return True
+
+
+def serve_connections(server, channels, settings, daemon_pid):
+    """Method to answer client connections until the daemon is stopped
+
+    serve_connections
+    =================
+    Method used by the daemon, or by each worker process of the daemon, to accept and answer connections one at a
+     time. (See answer_request)
+
+    Parameters:
+    -----------
+    1) server:     (socket) The listening Unix socket
+    2) channels:   (list)   The ggd channels to load before answering (See warm_up)
+    3) settings:   (dict)   The settings of the daemon (See serve_environment)
+    4) daemon_pid: (int)    The process id of the daemon
+    """
+    import signal
+
+    warm_up(channels)
+    run_command = command_runner()
+
+    while True:
+        sock, address = server.accept()
+        try:
+            if answer_request(sock, run_command, settings, daemon_pid):
+                ## Stop the daemon. A worker process asks the main daemon process to stop every worker
+                if daemon_pid != os.getpid():
+                    os.kill(daemon_pid, signal.SIGTERM)
+                return
+        except (OSError, IOError, ValueError, StopIteration):
+            ## The client left or sent a bad request
+            pass
+        finally:
+            sock.close()
+
+
+def fork_worker(server, channels, settings):
+    """Method to start a worker process of the daemon
+
+    fork_worker
+    ===========
+    Method used to fork a process that answers connections on the listening socket of the daemon. Workers answer
+     commands at the same time, and share the modules imported by the daemon.
+
+    Parameters:
+    -----------
+    1) server:   (socket) The listening Unix socket
+    2) channels: (list)   The ggd channels to load in the worker (See warm_up)
+    3) settings: (dict)   The settings of the daemon (See serve_environment)
+
+    Returns:
+    ++++++++
+    1) (int) The process id of the worker
+    """
+    import signal
+
+    daemon_pid = os.getpid()
+    pid = os.fork()
+    if pid != 0:
+        return pid
+
+    ## The worker. It must never return to the code of the daemon process
+    exit_code = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        serve_connections(server, channels, settings, daemon_pid)
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
@@ -0,0 +1,283 @@
+# -------------------------------------------------------------------------------------------------------------
+## Import Statements
+# -------------------------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import sys
+import threading
+import time
+
+# -------------------------------------------------------------------------------------------------------------
+## Global Variables
+# -------------------------------------------------------------------------------------------------------------
+
+## Default (connect, read) timeouts in seconds for every request
+DEFAULT_TIMEOUT = (10, 60)
+
+## Number of times a failed connection or a 5xx response is retried
+DEFAULT_RETRIES = 3
+
+## Number of connections kept open per host. (Large enough for the metadata refresh thread pool)
+POOL_SIZE = 16
+
+## Shared sessions, one with and one without retries (see get_session)
+_SESSIONS = {}
+_SESSION_LOCK = threading.Lock()
+
+## Ledger of the requests made by this process (see network_report)
+_LEDGER = []
+_LEDGER_LOCK = threading.Lock()
+
+# -------------------------------------------------------------------------------------------------------------
+## Functions/Methods
+# -------------------------------------------------------------------------------------------------------------
+
+
+def get_session(retries=True):
+    """Method to get the shared requests session
+
+    get_session
+    ===========
+    This method is used to get the requests session shared by all ggd network calls in the process. The
+     session keeps connections to each host open (keep-alive) in a pool of POOL_SIZE connections, asks for
+     compressed responses, and retries failed connections and 5xx responses with a backoff. The session
+     is thread safe for the way ggd uses it (one request per call).
+
+    Parameters:
+    -----------
+    1) retries: (bool) Whether or not failed requests are retried. (Default = True)
+
+    Returns:
+    ++++++++
+    1) (Session) The shared requests session
+    """
+
+    import requests
+
+    with _SESSION_LOCK:
+        if retries not in _SESSIONS:
+            try:
+                from urllib3.util.retry import Retry
+            except ImportError:
+                from requests.packages.urllib3.util.retry import Retry
+
+            max_retries = (
+                Retry(
+                    total=DEFAULT_RETRIES,
+                    backoff_factor=0.3,
+                    status_forcelist=(500, 502, 503, 504),
+                    raise_on_status=False,
+                )
+                if retries
+                else 0
+            )
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=POOL_SIZE,
+                pool_maxsize=POOL_SIZE,
+                max_retries=max_retries,
+            )
+
+            from .__init__ import __version__
+
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(
+                {
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive",
+                    "User-Agent": "ggd/{}".format(__version__),
+                }
+            )
+            _SESSIONS[retries] = session
+
+        return _SESSIONS[retries]
+
+
+def request(method, url, session=None, retries=True, **kwargs):
+    """Method to make an http request with the shared session
+
+    request
+    =======
+    This method is used to make every ggd http request. The shared session is used (see get_session), the
+     default timeout is applied if no timeout is given, and the request is added to the network ledger.
+
+     For streamed responses (stream=True) read the content with iter_content() so the bytes are added to
+      the ledger.
+
+    Parameters:
+    -----------
+    1) method:   (str)     The http method. (GET or HEAD)
+    2) url:      (str)     The url to request
+    3) session:  (Session) A requests session to use instead of the shared session. (Default = None)
+    4) retries:  (bool)    Whether or not the request is retried if it fails. (Default = True)
+    5) **kwargs: Any other requests keyword arguments (headers, timeout, stream, ...)
+
+    Returns:
+    ++++++++
+    1) (Response) The requests response
+    """
+
+    if kwargs.get("timeout") is None:
+        kwargs["timeout"] = DEFAULT_TIMEOUT
+
+    entry = {
+        "method": method.upper(),
+        "url": url,
+        "status": None,
+        "bytes": 0,
+        "seconds": 0.0,
+    }
+    start = time.time()
+    try:
+        response = (session or get_session(retries)).request(method, url, **kwargs)
+    except Exception as e:
+        entry["status"] = type(e).__name__
+        entry["seconds"] = time.time() - start
+        _record(entry)
+        raise
+
+    entry["status"] = response.status_code
+    if not kwargs.get("stream"):
+        entry["bytes"] = _wire_bytes(response, len(response.content))
+    entry["seconds"] = time.time() - start
+    response.ledger_entry = entry
+    _record(entry)
+
+    return response
+
+
+def get(url, **kwargs):
+    """
+    Method to make a GET request with the shared session. (See request)
+    """
+
+    return request("GET", url, **kwargs)
+
+
+def head(url, **kwargs):
+    """
+    Method to make a HEAD request with the shared session. (See request)
+    """
+
+    return request("HEAD", url, **kwargs)
+
+
+def iter_content(response, chunk_size):
+    """Method to read a streamed response in chunks
+
+    iter_content
+    ============
+    This method is used to read the content of a streamed response (see request) and add the bytes and
+     the time taken to the network ledger.
+
+    Parameters:
+    -----------
+    1) response:   (Response) A response from request() with stream=True
+    2) chunk_size: (int)      The number of bytes in each chunk
+
+    Returns:
+    ++++++++
+    1) (generator) The chunks of decoded content
+    """
+
+    entry = getattr(response, "ledger_entry", None)
+    start = time.time()
+    size = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        size += len(chunk)
+        yield chunk
+
+    if entry is not None:
+        with _LEDGER_LOCK:
+            entry["bytes"] += _wire_bytes(response, size)
+            entry["seconds"] += time.time() - start
+
+
+def _wire_bytes(response, default):
+    """
+    Get the number of bytes received for a response body (compressed size), or the default if it is not known
+    """
+
+    try:
+        wire = response.raw.tell()
+        if wire:
+            return wire
+    except Exception:
+        pass
+    return default
+
+
+def _record(entry):
+    with _LEDGER_LOCK:
+        _LEDGER.append(entry)
+
+
+def ledger():
+    """
+    Method to get a copy of the network ledger. A list of dicts with the method, url, status, bytes, and seconds of each request
+    """
+
+    with _LEDGER_LOCK:
+        return [dict(entry) for entry in _LEDGER]
+
+
+def reset_ledger():
+    """
+    Method to clear the network ledger
+    """
+
+    with _LEDGER_LOCK:
+        del _LEDGER[:]
+
+
+def network_report():
+    """Method to summarise the network ledger
+
+    network_report
+    ==============
+    This method is used to create a report of the http requests made by the current ggd command. Each
+     request is listed with its status, size, and time. Urls requested more than once are listed as
+     repeated requests so redundant downloads can be found.
+
+    Returns:
+    ++++++++
+    1) (str) The report
+    """
+    from collections import Counter
+
+    entries = ledger()
+    total_bytes = sum(entry["bytes"] for entry in entries)
+    total_seconds = sum(entry["seconds"] for entry in entries)
+
+    lines = [
+        ":ggd:network: {} request(s), {:.1f} KB, {:.2f} seconds".format(
+            len(entries), total_bytes / 1024.0, total_seconds
+        )
+    ]
+    for entry in entries:
+        lines.append(
+            ":ggd:network:\t {method} {status} {kb:.1f} KB {seconds:.3f}s {url}".format(
+                kb=entry["bytes"] / 1024.0, **entry
+            )
+        )
+
+    repeated = [
+        (url, count)
+        for url, count in Counter(entry["url"] for entry in entries).items()
+        if count > 1
+    ]
+    if repeated:
+        lines.append(":ggd:network: Repeated requests:")
+        for url, count in sorted(repeated):
+            lines.append(":ggd:network:\t {}x {}".format(count, url))
+
+    return "\n".join(lines)
+
+
+def print_network_report():
+    """
+    Method to print the network report to stderr
+    """
+
+    sys.stderr.write("\n" + network_report() + "\n")
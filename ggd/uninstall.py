@@ -8,7 +8,7 @@ import shutil
 import subprocess as sp
 import sys
 
-from .utils import conda_root, get_ggd_channels
+from .utils import channel_choices, conda_root, get_ggd_channels, lazy_choice
 
 
 # -------------------------------------------------------------------------------------------------------------
@@ -24,7 +24,7 @@ def add_uninstall(p):
         "-c",
         "--channel",
         default="genomics",
-        choices=get_ggd_channels(),
+        type=lazy_choice(channel_choices, default="genomics"),
         help="The ggd channel of the recipe to uninstall. (Default = genomics)",
     )
     c.add_argument(
@@ -186,7 +186,7 @@ def conda_uninstall(ggd_recipes):
         sys.exit(e.returncode)
 
 
-def check_for_installation(ggd_recipes, ggd_jdict, prefix=conda_root()):
+def check_for_installation(ggd_recipes, ggd_jdict, prefix=None):
     """Method to check for and processes ggd package if it is installed
 
     check_for_installation
@@ -212,6 +212,8 @@ def check_for_installation(ggd_recipes, ggd_jdict, prefix=conda_root()):
     from .show_env import remove_env_variable
     from .utils import conda_root, get_conda_prefix_path
 
+    prefix = prefix if prefix != None else conda_root()
+
     recipes_removed_from_conda = False
     for ggd_recipe in ggd_recipes:
         species = ggd_jdict["packages"][ggd_recipe]["identifiers"]["species"]
@@ -289,7 +291,7 @@ def uninstall(parser, args):
     =========
     Main method used to check if the recipe is installed, uninstall the recipe, and remove extra recipe files
     """
-    from .utils import get_conda_package_list, get_run_deps_from_tar
+    from .utils import get_conda_package_list, get_run_deps_from_tar, load_channeldata
 
     ## List of packages to uninstall
     ggd_recipes = args.names
@@ -321,6 +323,14 @@ def uninstall(parser, args):
             tarfile_path = os.path.join(ggd_info_dir, tarballfile)
             ggd_recipes.extend(get_run_deps_from_tar(tarfile_path, args.channel))
 
+    ## Add the channel metadata for any run deps
+    channeldata = load_channeldata(args.channel)
+    for recipe in ggd_recipes:
+        if recipe not in ggd_jsonDict["packages"]:
+            pkg = channeldata.get_package(recipe)
+            if pkg is not None:
+                ggd_jsonDict["packages"][recipe] = pkg
+
     ## Check if installed through conda
     check_conda_installation(ggd_recipes, installed_ggd_packages.keys())
 
@@ -1,5 +1,6 @@
 from __future__ import print_function
 
+import contextlib
 import json
 import locale
 import os
@@ -8,7 +9,7 @@ import shutil
 import subprocess as sp
 import sys
 
-import requests
+from . import transport
 
 # ---------------------------------------------------------------------------------------------------------------------------------
 ## Global Variables
@@ -23,6 +24,62 @@ GGD_CLI_REQUIREMENTS = (
     "https://raw.githubusercontent.com/gogetdata/ggd-cli/master/requirements.txt"
 )
 
+## The conda requirement from the ggd-cli requirements file is cached for CONDA_REQUIREMENT_TTL seconds (override with
+##  GGD_CONDA_REQUIREMENT_TTL). PACKAGED_CONDA_REQUIREMENT is the requirement at release, used if the requirements file
+##  can not be downloaded. Set GGD_CONDA_VERSION (Example: "4.8.3" or ">=4.8.2,<=4.9.0") to skip the lookup
+CONDA_REQUIREMENT_CACHE = os.path.join(LOCAL_REPO_DIR, "conda_requirement.json")
+CONDA_REQUIREMENT_TTL = 24 * 3600
+PACKAGED_CONDA_REQUIREMENT = "conda>=4.8.2,<=4.9.0"
+
+## GGD metadata urls
+GGD_METADATA_URL = "https://raw.githubusercontent.com/gogetdata/ggd-metadata/master"
+CHANNELDATA_URL = GGD_METADATA_URL + "/channeldata/{channel}/channeldata.json"
+GENOME_METADATA_FILE_URL = GGD_METADATA_URL + "/genome_metadata/{name}"
+GENOME_METADATA_FILES = (
+    "build_to_species.json",
+    "species_to_build.json",
+    "ggd_channels.json",
+)
+
+## The number of files downloaded at the same time during a metadata refresh
+METADATA_WORKERS = 8
+
+## Connectivity check. The probe goes to the metadata host and the verdict is cached on disk for CONNECTIVITY_TTL
+##  seconds (override with the GGD_CONNECTIVITY_TTL environment variable). Set GGD_OFFLINE=1 to skip all network access
+CONNECTIVITY_PROBE_URL = GGD_METADATA_URL + "/README.md"
+CONNECTIVITY_CACHE = os.path.join(LOCAL_REPO_DIR, "connectivity.json")
+CONNECTIVITY_TTL = 60
+
+## Stale-while-revalidate windows for the local metadata files, in seconds. A file checked within METADATA_TTL is used
+##  as is. An older file within METADATA_MAX_STALE is used right away while a background process refreshes it. Older
+##  (or missing) files are refreshed before they are used. Override with GGD_METADATA_TTL and GGD_METADATA_MAX_STALE
+METADATA_TTL = 3600
+METADATA_MAX_STALE = 7 * 24 * 3600
+METADATA_FRESH = "fresh"
+METADATA_STALE = "stale"
+METADATA_EXPIRED = "expired"
+
+## Marker file for a running background metadata refresh. A marker older than REFRESH_MARKER_TIMEOUT seconds is ignored
+REFRESH_MARKER = os.path.join(LOCAL_REPO_DIR, "refresh.running")
+REFRESH_MARKER_TIMEOUT = 300
+
+## Names of the cache locks held while downloading into the LOCAL_REPO_DIR (See cache_lock)
+METADATA_LOCK = "metadata"
+REPODATA_LOCK = "repodata"
+
+## The conda settings (see get_conda_context), cached for other ggd processes in CONDA_CONTEXT_CACHE. The settings
+##  depend on the user's home dir (~/.condarc and ~/.conda), so each user of a group-shared cache has their own file
+CONDA_CONTEXT_CACHE = os.path.join(
+    LOCAL_REPO_DIR, "conda_context-{}.json".format(getattr(os, "getuid", int)())
+)
+_CONDA_CONTEXT = {}
+
+## Parsed channeldata for each ggd channel. Loaded at most once per process (see load_channeldata)
+_CHANNELDATA = {}
+
+## Suffix of the sidecar file that stores the http cache validators (ETag, Last-Modified, content hash) for a downloaded file
+VALIDATORS_SUFFIX = ".validators.json"
+
 
 ## Repodata variables
 REPODATA_URL = "https://conda.anaconda.org/{channel}/{subdir}/repodata.json"
@@ -31,10 +88,30 @@ REPODATA_LABELED_URL = (
 )
 REPODATA_DEFAULTS_URL = "https://repo.anaconda.com/pkgs/main/{subdir}/repodata.json"
 
+## On-disk repodata cache. One dir per channel and subdir with the repodata.json file and a compact name index
+REPODATA_CACHE_DIR = os.path.join(LOCAL_REPO_DIR, "repodata")
+REPODATA_INDEX_NAME = "name_index.json"
+REPODATA_TIMEOUT = 60
+
+## Size of the chunks used to stream downloads and large json files
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+## On-disk cache of ranked search results (See search.search_channel). At most SEARCH_CACHE_SIZE results are
+##  kept, the least recently used are removed first. Override with GGD_SEARCH_CACHE_SIZE (0 turns the cache off)
+SEARCH_CACHE_DIR = os.path.join(LOCAL_REPO_DIR, "search_cache")
+SEARCH_CACHE_SIZE = 1000
+
 
 ## GGD META RECIPE URL
 GGD_META_RECIPE_URL = "https://raw.githubusercontent.com/gogetdata/ggd-metadata/master/meta-recipes/{meta_recipe_name}/{file_name}"
 
+## Local copies of the meta-recipe files (Added by 'ggd bundle import'). Used when there is no internet connection
+META_RECIPE_CACHE_DIR = os.path.join(LOCAL_REPO_DIR, "meta-recipes")
+
+## Url of a package file in a conda channel on the Anaconda Cloud
+CONDA_PKG_URL = "https://conda.anaconda.org/{channel}/{subdir}/{tar_file}"
+
 ## META RECIPE JSON OUTPUT FILE
 GGD_META_RECIPE_ENV_JSON = "GGD_METARECIPE_ENVIRONMENT_VARIABLES.json"
 GGD_META_RECIPE_FINAL_COMMANDS = "GGD_METARECIPE_FINAL_COMMANDS.sh"
@@ -65,8 +142,25 @@ def get_species(update_files=True, full_dict=False):
     2) (dict) If full_dict = True, a dictionary with species as key and available genome builds as values 
     """
 
-    if update_files and check_for_internet_connection():
-        update_genome_metadata_files()
+    if update_files:
+        state = metadata_state(
+            [os.path.join(GENOME_METADATA_DIR, x) for x in GENOME_METADATA_FILES]
+        )
+        if state == METADATA_STALE:
+            start_background_refresh()
+        elif state == METADATA_EXPIRED and check_for_internet_connection():
+            ## Another ggd process may have updated the files while this one waited on the lock
+            with cache_lock(METADATA_LOCK):
+                if (
+                    metadata_state(
+                        [
+                            os.path.join(GENOME_METADATA_DIR, x)
+                            for x in GENOME_METADATA_FILES
+                        ]
+                    )
+                    == METADATA_EXPIRED
+                ):
+                    update_genome_metadata_files()
 
     if full_dict:
         with open(os.path.join(GENOME_METADATA_DIR, "species_to_build.json"), "r") as f:
@@ -99,6 +193,10 @@ def get_channel_data(ggd_channel):
     ================
     This method is used to get the ggd local channel's metadata json file. 
 
+     The local file is only updated before it is returned if it is missing or older than the max-stale 
+      window (see metadata_state). A stale local file is returned right away and updated by a background 
+      process.
+
     Parameters:
     -----------
     1) ggd_channel: (str) The ggd channel to get metadata for
@@ -108,11 +206,54 @@ def get_channel_data(ggd_channel):
     1) (str) The file path to the metadata file for the specific channel
     """
 
-    if check_for_internet_connection():
-        update_channel_data_files(ggd_channel)
+    return update_channels_data([ggd_channel])[0]
+
+
+def update_channels_data(ggd_channels):
+    """Method used to update the locally stored channel meta data for several ggd channels at once
 
-    channeldata_path = os.path.join(CHANNEL_DATA_DIR, ggd_channel, "channeldata.json")
-    return channeldata_path
+    update_channels_data
+    ====================
+    This method is used to update the local channeldata.json file of each ggd channel that is missing or older
+     than the max-stale window (see metadata_state). The metadata lock (see cache_lock) is held once for all
+     of the channels, and the expired channels are downloaded at the same time, so the time to update is
+     bounded by the slowest channel rather than the sum of all channels. If any file is stale a background
+     process is started to update it.
+
+    Parameters:
+    -----------
+    1) ggd_channels: (list) The ggd channels to get metadata for
+
+    Returns:
+    +++++++
+    1) (list) The file paths to the metadata files, in the order of ggd_channels
+    """
+
+    channeldata_paths = [
+        os.path.join(CHANNEL_DATA_DIR, channel, "channeldata.json")
+        for channel in ggd_channels
+    ]
+
+    states = [metadata_state([path]) for path in channeldata_paths]
+    if METADATA_STALE in states:
+        start_background_refresh()
+    if METADATA_EXPIRED in states and check_for_internet_connection():
+        ## Another ggd process may have updated the files while this one waited on the lock
+        with cache_lock(METADATA_LOCK):
+            expired = [
+                channel
+                for channel, path in zip(ggd_channels, channeldata_paths)
+                if metadata_state([path]) == METADATA_EXPIRED
+            ]
+            if len(expired) == 1:
+                update_channel_data_files(expired[0])
+            elif expired:
+                with thread_pool(min(len(expired), METADATA_WORKERS)) as pool:
+                    ## Raise any download error
+                    for result in pool.map(update_channel_data_files, expired):
+                        pass
+
+    return channeldata_paths
 
 
 def get_channeldata_url(ggd_channel):
@@ -131,16 +272,250 @@ def get_channeldata_url(ggd_channel):
     1) (str) The url for the metadata file
     """
 
-    ## Update local channel data file if internet connection available
-    if check_for_internet_connection():
-        update_channel_data_files(ggd_channel)
+    ## Update the local channel data file if needed (see get_channel_data)
+    get_channel_data(ggd_channel)
+
+    return CHANNELDATA_URL.format(channel=ggd_channel)
+
+
+class ChannelData(object):
+    """
+    The parsed channeldata.json metadata file for a ggd channel
+
+    The local channeldata.json file is read and parsed the first time the metadata is accessed. If the 
+     file does not exist or can not be parsed the metadata will have no packages. Single package 
+     lookups (get_package) use the indexed catalog of the channel and do not parse the json file.
+
+    Useful attributes:
+    * channel:     The ggd channel
+    * path:        The file path of the local channeldata.json file
+    * json_dict:   The channeldata.json file as a dictionary
+    * packages:    The "packages" section of the channeldata.json file
+    * catalog:     The SQLite catalog for the channel, or None if there is no catalog
+    * fingerprint: The hash of the channeldata.json file, or None if there is no catalog
+    """
+
+    def __init__(self, ggd_channel):
+        import time
+
+        self.channel = ggd_channel
+        self.path = os.path.join(CHANNEL_DATA_DIR, ggd_channel, "channeldata.json")
+        self.stamp = self.current_stamp()
+        self.loaded_at = time.time()
+        self._json_dict = None
+        self._json_stamp = None
+        self._catalog = None
+        self._field_index = None
+
+    def current_stamp(self):
+        """
+        The catalog.source_stamp of the local channeldata.json file, or None if there is no file
+        """
+
+        from .catalog import source_stamp
+
+        try:
+            return source_stamp(self.path)
+        except OSError:
+            return None
+
+    def close(self):
+        if self._catalog:
+            self._catalog.close()
+        self._catalog = None
+
+    @property
+    def json_dict(self):
+        if self._json_dict is None:
+            try:
+                from .catalog import source_stamp
+
+                self._json_stamp = source_stamp(self.path)
+                with open(self.path) as j:
+                    self._json_dict = json.load(j)
+            except (IOError, OSError, ValueError):
+                self._json_dict = {"channeldata_version": 1, "packages": {}}
+        return self._json_dict
+
+    @property
+    def packages(self):
+        return self.json_dict["packages"]
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            from .catalog import open_catalog
+
+            self._catalog = open_catalog(self.path) or False
+        return self._catalog or None
+
+    @property
+    def search_index(self):
+        """
+        The catalog of the channel if it was built from the same channeldata.json file as json_dict, for 
+         use with search.search_packages. None otherwise
+        """
+
+        self.json_dict
+        if self.catalog is None or self.catalog.source != self._json_stamp:
+            return None
+        return self.catalog
+
+    @property
+    def fingerprint(self):
+        """
+        The sha256 hash of the local channeldata.json file, from its catalog, or None if there is no up to date
+         catalog. The json file is not read
+        """
+
+        if self.catalog is None or self.catalog.source != self.stamp:
+            return None
+        return self.catalog.content_hash
+
+    @property
+    def field_index(self):
+        """
+        The catalog.FieldIndex of the packages in json_dict, loaded from the catalog (see search_index) or 
+         built from json_dict if there is no catalog for it
+        """
+
+        if self.search_index is not None:
+            return self.search_index.field_index()
+        if self._field_index is None:
+            from .catalog import FieldIndex
+
+            self._field_index = FieldIndex.from_packages(self.packages)
+        return self._field_index
 
-    return os.path.join(
-        "https://raw.githubusercontent.com/gogetdata/ggd-metadata/master/channeldata",
-        ggd_channel,
-        "channeldata.json",
+    def get_package(self, name):
+        """Method to get the metadata for a single package in the channel
+
+        get_package
+        ===========
+        This method is used to get the channeldata entry for a single package. The catalog is used unless 
+         the json file has already been loaded or there is no catalog.
+
+        Parameters:
+        -----------
+        1) name: (str) The name of the package
+
+        Returns:
+        ++++++++
+        1) (dict) The package metadata, or None if the package is not in the channel
+        """
+
+        if self._json_dict is None and self.catalog is not None:
+            return self.catalog.get_package(name)
+        return self.packages.get(name)
+
+    def copy(self):
+        """Method to get a copy of the channeldata dictionary
+
+        copy
+        ====
+        This method is used to get a copy of the channeldata dictionary that can be updated without changing
+         the shared copy. Packages can be added to or removed from the "packages" dict of the copy. The 
+         package entries themselves are shared and should not be modified.
+
+        Returns:
+        ++++++++
+        1) (dict) A copy of the channeldata dictionary
+        """
+
+        jdict = dict(self.json_dict)
+        jdict["packages"] = dict(self.json_dict["packages"])
+        return jdict
+
+
+def load_channeldata(ggd_channel):
+    """Method to get the channel metadata for a specific ggd channel
+
+    load_channeldata
+    ================
+    This method is used to get the ChannelData object for a ggd channel. The first time a channel is loaded 
+     in a process the local channeldata.json file is updated (if there is an internet connection, see 
+     get_channel_data). Every later call for the same channel in the same process returns the same object, 
+     so the channeldata is downloaded and parsed at most once per process. 
+
+    Parameters:
+    -----------
+    1) ggd_channel: (str) The ggd channel to get metadata for
+
+    Returns:
+    ++++++++
+    1) (ChannelData) The channel metadata object. Use ChannelData.copy() to get a dict that can be modified
+    """
+
+    if ggd_channel not in _CHANNELDATA:
+        get_channel_data(ggd_channel)
+        _CHANNELDATA[ggd_channel] = ChannelData(ggd_channel)
+
+    return _CHANNELDATA[ggd_channel]
+
+
+def expire_channeldata(max_age=None):
+    """Method to drop the loaded channel metadata that is out of date
+
+    expire_channeldata
+    ==================
+    This method is used by long running ggd processes (See serve) to reload the channel metadata. A loaded
+     channel is dropped if its local channeldata.json file changed since it was loaded, or if it was loaded
+     more than max_age seconds ago. The next load_channeldata for the channel then checks the age of the
+     local file again (See get_channel_data) and parses the current file.
+
+    Parameters:
+    -----------
+    1) max_age: (int) The number of seconds a loaded channel is kept. (Default = None, the metadata TTL. See metadata_state)
+
+    Returns:
+    ++++++++
+    1) (list) The ggd channels that were dropped
+    """
+    import time
+
+    max_age = (
+        max_age if max_age != None else env_seconds("GGD_METADATA_TTL", METADATA_TTL)
     )
 
+    expired = []
+    for ggd_channel, channeldata in list(_CHANNELDATA.items()):
+        if (
+            channeldata.current_stamp() != channeldata.stamp
+            or time.time() - channeldata.loaded_at > max_age
+        ):
+            _CHANNELDATA.pop(ggd_channel).close()
+            expired.append(ggd_channel)
+
+    return expired
+
+
+def parse_conda_requirement(lines):
+    """Method to get the conda version from the lines of a requirements file
+
+    parse_conda_requirement
+    =======================
+    This method is used to find the conda requirement in the lines of a requirements file. 
+
+    Parameters:
+    -----------
+    1) lines: (list) The lines of the requirements file
+
+    Return:
+    +++++++
+    1) (str) The required version if found, else -1
+    2) (str) An = or >= depending on the requirement
+    """
+
+    conda_version = -1
+    equals = "="
+    for line in lines:
+        if "conda=" in line:
+            conda_version = line.strip().split("=")[1]
+        elif "conda>=" in line:
+            conda_version = line.strip().split(">=")[1]
+            equals = ">="
+    return conda_version, equals
+
 
 def get_required_conda_version():
     """Method to get the conda version from the ggd-cli requirements file
@@ -151,23 +526,68 @@ def get_required_conda_version():
      requirements file in ggd-cli. This version can be used to maintain the correct version while 
      using ggd
 
+     The version is looked up in this order:
+      1) The GGD_CONDA_VERSION environment variable. (Example: "4.8.3" or ">=4.8.2,<=4.9.0")
+      2) The cached version in the LOCAL_REPO_DIR, if it was cached less than CONDA_REQUIREMENT_TTL seconds ago
+      3) The requirements file in ggd-cli on GitHub. The result is cached
+      4) The cached version of any age, or PACKAGED_CONDA_REQUIREMENT if the requirements file can not be downloaded
+
     Return:
     +++++++
     1) (str) The required version if found, else -1
     2) (str) An = or >= depending on the requirement
     """
+    import time
 
-    req = requests.get(GGD_CLI_REQUIREMENTS, stream=True)
+    ## Version set by the user
+    override = os.environ.get("GGD_CONDA_VERSION", "").strip()
+    if override:
+        if override.startswith(">="):
+            return override[2:], ">="
+        return override.lstrip("="), "="
 
-    conda_version = -1
-    equals = "="
-    for line in req.iter_lines():
-        if "conda=" in str(line.decode()):
-            conda_version = str(line.decode()).strip().split("=")[1]
-        elif "conda>=" in str(line.decode()):
-            conda_version = str(line.decode()).strip().split(">=")[1]
-            equals = ">="
-    return conda_version, equals
+    ## Cached version
+    cached = None
+    try:
+        with open(CONDA_REQUIREMENT_CACHE) as c:
+            cached = json.load(c)
+        if 0 <= time.time() - cached["checked"] < env_seconds(
+            "GGD_CONDA_REQUIREMENT_TTL", CONDA_REQUIREMENT_TTL
+        ):
+            return cached["conda_version"], cached["equals"]
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        pass
+
+    ## Version from the ggd-cli requirements file
+    if not offline_mode():
+        import requests
+
+        try:
+            req = transport.get(GGD_CLI_REQUIREMENTS, timeout=10)
+            req.raise_for_status()
+            conda_version, equals = parse_conda_requirement(req.text.splitlines())
+            try:
+                with atomic_write(CONDA_REQUIREMENT_CACHE) as c:
+                    json.dump(
+                        {
+                            "conda_version": conda_version,
+                            "equals": equals,
+                            "checked": time.time(),
+                        },
+                        c,
+                    )
+            except (IOError, OSError):
+                pass
+            return conda_version, equals
+        except (requests.RequestException, RuntimeError):
+            ## RuntimeError is raised when sockets are blocked, e.g. by the pytest-socket plugin used during testing
+            pass
+
+    ## Fall back to an old cached version or the version packaged with ggd
+    try:
+        return cached["conda_version"], cached["equals"]
+    except (KeyError, TypeError):
+        return parse_conda_requirement([PACKAGED_CONDA_REQUIREMENT])
 
 
 def check_output(args, **kwargs):
@@ -215,61 +635,519 @@ def get_builds(species):
                 return jdict[species]
 
 
-def check_for_internet_connection(t=5):
+def species_choices():
+    """
+    Method to get the available species, for checking a command line option. (See lazy_choice)
+    """
+
+    return sorted(get_species())
+
+
+def build_choices():
+    """
+    Method to get the available genome builds, for checking a command line option. (See lazy_choice)
+    """
+
+    get_species()
+    return sorted(get_builds("*"))
+
+
+def channel_choices():
+    """
+    Method to get the available ggd channels, for checking a command line option. (See lazy_choice)
+    """
+
+    get_species()
+    return get_ggd_channels()
+
+
+def lazy_choice(get_choices, default=None):
+    """Method to create an argparse type function that checks a value against choices loaded when needed
+
+    lazy_choice
+    ===========
+    This method is used in place of the argparse "choices" parameter for options whose choices come from
+     the ggd metadata (species, genome builds, and ggd channels). The choices are only loaded (and the local
+     metadata files only updated) when the option is used, so building the command line parser does not
+     read the metadata. argparse also passes a string default through the type function, so the default 
+     value is returned without loading the choices. The help text lists the choices (See __main__.show_lazy_choices)
+
+    Parameters:
+    -----------
+    1) get_choices: (function) A function that returns the list of choices. (Example: channel_choices)
+    2) default:     (str)      The default value of the option, which is not checked. (Default = None)
+
+    Returns:
+    ++++++++
+    1) (function) An argparse type function that returns the value if it is one of the choices, or raises
+                   an argparse.ArgumentTypeError if it is not
+    """
+
+    def check_choice(value):
+        import argparse
+
+        if default != None and value == default:
+            return value
+
+        choices = [str(x) for x in get_choices()]
+        if value not in choices:
+            raise argparse.ArgumentTypeError(
+                "invalid choice: '{}' (choose from {})".format(
+                    value, ", ".join("'{}'".format(x) for x in choices)
+                )
+            )
+        return value
+
+    check_choice.get_choices = get_choices
+
+    return check_choice
+
+
+def offline_mode():
+    """
+    Method to check if ggd has been set to offline mode with the GGD_OFFLINE environment variable
+    """
+
+    return os.environ.get("GGD_OFFLINE", "").strip().lower() in ("1", "true", "yes")
+
+
+def env_seconds(env_var, default):
+    """
+    Method to get a number of seconds from an environment variable, or the default if the variable is not set or not a number
+    """
+
+    try:
+        return float(os.environ.get(env_var, default))
+    except ValueError:
+        return default
+
+
+def env_int(env_var, default):
+    """
+    Method to get a whole number from an environment variable, or the default if the variable is not set or not a whole number
+    """
+
+    try:
+        return int(os.environ.get(env_var, default))
+    except ValueError:
+        return default
+
+
+def shared_cache():
+    """
+    Method to check if the LOCAL_REPO_DIR is a group-shared cache. A cache dir is group-shared if the setgid bit is set on it. (See make_cache_dir)
+    """
+    import stat
+
+    try:
+        return bool(os.stat(LOCAL_REPO_DIR).st_mode & stat.S_ISGID)
+    except OSError:
+        return False
+
+
+def make_cache_dir(dir_path):
+    """Method to create a dir in the local ggd metadata cache
+
+    make_cache_dir
+    ==============
+    This method is used to create a dir (and any missing parent dirs) in the LOCAL_REPO_DIR. If the
+     LOCAL_REPO_DIR is a group-shared cache (see shared_cache) the new dirs are made group writable with the
+     setgid bit set, so every member of the group can update the cache and new files keep the group.
+
+     To set up a group-shared cache for a cluster:
+      mkdir /shared/ggd-info && chgrp <group> /shared/ggd-info && chmod 2775 /shared/ggd-info
+      export GGD_LOCAL=/shared/ggd-info
+
+    Parameters:
+    -----------
+    1) dir_path: (str) The dir to create
+
+    Returns:
+    ++++++++
+    1) (str) The dir path
+    """
+
+    if os.path.isdir(dir_path):
+        return dir_path
+
+    parent = os.path.dirname(os.path.normpath(dir_path))
+    if parent and parent != os.path.normpath(dir_path) and not os.path.isdir(parent):
+        make_cache_dir(parent)
+
+    try:
+        os.mkdir(dir_path, 0o777)
+    except OSError:
+        ## Created by another process
+        if not os.path.isdir(dir_path):
+            raise
+        return dir_path
+
+    if shared_cache():
+        os.chmod(dir_path, 0o2775)
+
+    return dir_path
+
+
+def temp_file_for(file_path):
+    """
+    Method to create an empty temporary file in the same dir as file_path. Move it into place with publish_file()
+    """
+    import tempfile
+
+    make_cache_dir(os.path.dirname(file_path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=".{}.".format(os.path.basename(file_path)),
+        suffix=".tmp",
+        dir=os.path.dirname(file_path),
+    )
+    os.close(fd)
+    return tmp_path
+
+
+def publish_file(tmp_path, file_path):
+    """
+    Method to move a temporary file (see temp_file_for) into place in a single step, so readers see either the old or the new file and never a partial file
+    """
+
+    os.chmod(tmp_path, 0o664 if shared_cache() else 0o644)
+    os.rename(tmp_path, file_path)
+
+
+@contextlib.contextmanager
+def atomic_write(file_path, mode="w"):
+    """Method to write a file in the local ggd metadata cache atomically
+
+    atomic_write
+    ============
+    This method is used as a context manager to write a file. The content is written to a temporary file in
+     the same dir, which is moved into place once the block completes without an error. Another ggd process
+     reading the file at the same time sees the old or the new file, never a partially written file.
+
+     with atomic_write(file_path) as f:
+         json.dump(data, f)
+
+    Parameters:
+    -----------
+    1) file_path: (str) The file path to write
+    2) mode:      (str) The file mode. ("w" or "wb", Default = "w")
+    """
+
+    tmp_path = temp_file_for(file_path)
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        publish_file(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class SerialExecutor(object):
+    """
+    A stand-in for concurrent.futures.ThreadPoolExecutor where concurrent.futures is not available (Python 2 without
+     the futures backport). Each task is run when it is submitted. (See thread_pool)
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args, **kwargs):
+        return SerialTask(fn, args, kwargs)
+
+    def map(self, fn, *iterables):
+        return iter([self.submit(fn, *args).result() for args in zip(*iterables)])
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class SerialTask(object):
     """
-    Method to check if there is an internet connection or not
+    The finished task of a SerialExecutor. result() returns the result of the task, or raises its error, like a
+     concurrent.futures.Future
     """
 
-    from pytest_socket import SocketBlockedError
+    def __init__(self, fn, args, kwargs):
+        self._result = None
+        self._error = None
+        try:
+            self._result = fn(*args, **kwargs)
+        except Exception as e:
+            self._error = e
+
+    def result(self, timeout=None):
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def thread_pool(max_workers):
+    """Method to get a pool of threads to run tasks at the same time
+
+    thread_pool
+    ===========
+    This method is used to get a concurrent.futures.ThreadPoolExecutor. If concurrent.futures is not available
+     (Python 2 without the futures backport) a SerialExecutor is used instead, and the tasks are run one at a time.
+
+    Parameters:
+    -----------
+    1) max_workers: (int) The number of threads
+
+    Returns:
+    ++++++++
+    1) (ThreadPoolExecutor or SerialExecutor) The pool. Use it as a context manager
+    """
 
-    url = "http://www.google.com/"
-    timeout = t
     try:
-        _ = requests.get(url, timeout=timeout)
-        return True
-    except requests.ConnectionError:
+        from concurrent.futures import ThreadPoolExecutor
+    except ImportError:
+        return SerialExecutor(max_workers)
+
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+@contextlib.contextmanager
+def cache_lock(name):
+    """Method to lock part of the local ggd metadata cache between ggd processes
+
+    cache_lock
+    ==========
+    This method is used as a context manager to hold an exclusive lock (fcntl.flock) on a lock file in the
+     LOCAL_REPO_DIR. Processes that download into the same part of the cache use the same lock, so only one
+     process downloads at a time and the others wait and then use its files. The lock is released when the
+     block exits, or by the operating system if the process dies.
+
+     The lock is not re-entrant: do not take the same lock again while holding it. Without fcntl (Windows),
+      or if the lock file can not be created (a read-only shared cache), the block runs without the lock.
+
+    Parameters:
+    -----------
+    1) name: (str) The name of the lock. (Example: METADATA_LOCK)
+    """
+
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+
+    fd = None
+    if fcntl is not None:
+        try:
+            make_cache_dir(LOCAL_REPO_DIR)
+            lock_path = os.path.join(LOCAL_REPO_DIR, ".{}.lock".format(name))
+            fd = os.open(lock_path, os.O_RDONLY | os.O_CREAT, 0o644)
+        except (IOError, OSError):
+            fd = None
+
+    if fd is None:
+        yield
+        return
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def check_for_internet_connection(t=5):
+    """Method to check if there is an internet connection or not
+
+    check_for_internet_connection
+    =============================
+    This method is used to check if the ggd metadata host can be reached. The verdict is cached in 
+     the LOCAL_REPO_DIR for CONNECTIVITY_TTL seconds (or the number of seconds set by the GGD_CONNECTIVITY_TTL 
+     environment variable) so that consecutive ggd commands do not each wait on a network probe. 
+     If the GGD_OFFLINE environment variable is set no probe is made and False is returned.
+
+    Parameters:
+    -----------
+    1) t: (int) The number of seconds to wait for the metadata host to respond. (Default = 5)
+
+    Returns:
+    ++++++++
+    1) (bool) True if there is an internet connection, False otherwise
+    """
+    import time
+
+    if offline_mode():
+        return False
+
+    ## Use the cached verdict if it is still fresh
+    ttl = env_seconds("GGD_CONNECTIVITY_TTL", CONNECTIVITY_TTL)
+    if ttl > 0 and os.path.exists(CONNECTIVITY_CACHE):
+        try:
+            with open(CONNECTIVITY_CACHE) as c:
+                cached = json.load(c)
+            if 0 <= time.time() - cached["checked"] < ttl:
+                return cached["online"]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            pass
+
+    import requests
+
+    online = False
+    try:
+        transport.head(CONNECTIVITY_PROBE_URL, retries=False, timeout=t)
+        online = True
+    except requests.RequestException:
         pass
-    except SocketBlockedError:
-        ## A pytest_socket SocketBlockedError. (This is raised when the network connection is disabled using pytest-socket plugin.
-        ## (For testing purposes)
+    except RuntimeError:
+        ## Raised when sockets are blocked, e.g. by the pytest-socket plugin used during testing
         pass
 
-    return False
+    ## Cache the verdict for other ggd processes
+    try:
+        with atomic_write(CONNECTIVITY_CACHE) as c:
+            json.dump({"online": online, "checked": time.time()}, c)
+    except (IOError, OSError):
+        pass
+
+    return online
+
 
+def metadata_state(file_paths):
+    """Method to check if local metadata files can be used as is, or need to be refreshed
 
-def update_channel_data_files(channel):
+    metadata_state
+    ==============
+    This method is used to implement stale-while-revalidate reads of the local metadata files. The age of 
+     a file is the time since it was last downloaded or revalidated (the modification time of its validators 
+     sidecar file, or of the file itself if there is no sidecar file).
+
+     * METADATA_FRESH:   Every file is younger than the ttl (GGD_METADATA_TTL). Use the files as is
+     * METADATA_STALE:   Every file is younger than the max-stale window (GGD_METADATA_MAX_STALE). Use the 
+                          files right away and refresh them in the background
+     * METADATA_EXPIRED: A file is missing or older than the max-stale window. Refresh the files before using them
+
+    Parameters:
+    -----------
+    1) file_paths: (list) The file paths of the local metadata files to check
+
+    Returns:
+    ++++++++
+    1) (str) METADATA_FRESH, METADATA_STALE, or METADATA_EXPIRED
+    """
+    import time
+
+    ttl = env_seconds("GGD_METADATA_TTL", METADATA_TTL)
+    max_stale = max(ttl, env_seconds("GGD_METADATA_MAX_STALE", METADATA_MAX_STALE))
+
+    state = METADATA_FRESH
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            return METADATA_EXPIRED
+
+        validators_path = file_path + VALIDATORS_SUFFIX
+        checked = os.path.getmtime(
+            validators_path if os.path.exists(validators_path) else file_path
+        )
+        age = time.time() - checked
+
+        if age < 0 or age >= max_stale:
+            return METADATA_EXPIRED
+        if age >= ttl:
+            state = METADATA_STALE
+
+    return state
+
+
+def start_background_refresh():
+    """Method to refresh the local metadata files in a detached background process
+
+    start_background_refresh
+    ========================
+    This method is used to start a background process that refreshes the genome metadata and the channeldata 
+     for every ggd channel (see metadata.background_refresh). The process is detached from the current 
+     process and keeps running after the ggd command exits. New files are moved into place atomically, so 
+     a ggd command running at the same time always sees a complete file. 
+
+     No process is started in offline mode (GGD_OFFLINE), or if another background refresh started less than 
+      REFRESH_MARKER_TIMEOUT seconds ago.
+
+    Returns:
+    ++++++++
+    1) (bool) True if a background refresh was started, False otherwise
+    """
+    import time
+
+    if offline_mode():
+        return False
+
+    try:
+        if time.time() - os.path.getmtime(REFRESH_MARKER) < REFRESH_MARKER_TIMEOUT:
+            return False
+    except OSError:
+        pass
+
+    try:
+        make_cache_dir(LOCAL_REPO_DIR)
+        with open(REFRESH_MARKER, "w") as m:
+            m.write(str(os.getpid()))
+
+        ## Make sure the background process imports this copy of ggd
+        env = dict(os.environ)
+        ggd_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(
+            [ggd_parent] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else [])
+        )
+
+        devnull = open(os.devnull, "r+")
+        kwargs = {"stdin": devnull, "stdout": devnull, "stderr": devnull, "env": env}
+        if hasattr(os, "setsid"):
+            kwargs["preexec_fn"] = os.setsid
+        sp.Popen(
+            [
+                sys.executable,
+                "-c",
+                "from ggd.metadata import background_refresh; background_refresh()",
+            ],
+            close_fds=True,
+            **kwargs
+        )
+        devnull.close()
+    except (IOError, OSError):
+        return False
+
+    return True
+
+
+def update_channel_data_files(channel, session=None):
     """Method to update the channel data metadata local files from the ggd-metadata repo
     
     update_channel_data_files
     =========================
-    This method will download the json metadata json files for the channel data 
+    This method will download the json metadata json files for the channel data. The download is 
+     conditional (see conditional_download), so an unchanged channeldata.json file costs a single 
+     round trip and is not re-written. The SQLite catalog for the channel (see catalog.py) is rebuilt 
+     whenever the channeldata.json file changes.
 
     Parameters:
     -----------
-    1) channel: (str) The channel to download for the channeldata
+    1) channel: (str)     The channel to download for the channeldata
+    2) session: (Session) A requests session to download with. (Default = None)
     """
 
-    if channel in get_ggd_channels():
+    from .catalog import refresh_catalog
 
-        if not os.path.isdir(LOCAL_REPO_DIR):
-            os.makedirs(LOCAL_REPO_DIR, mode=0o777)
-        if not os.path.isdir(CHANNEL_DATA_DIR):
-            os.makedirs(CHANNEL_DATA_DIR, mode=0o777)
+    if channel in get_ggd_channels():
 
-        channel_dir = os.path.join(CHANNEL_DATA_DIR, channel)
-        if not os.path.isdir(channel_dir):
-            os.makedirs(channel_dir, mode=0o777)
+        channel_dir = make_cache_dir(os.path.join(CHANNEL_DATA_DIR, channel))
 
-        ## Download json file
-        channeldata_url = os.path.join(
-            "https://raw.githubusercontent.com/gogetdata/ggd-metadata/master/channeldata/",
-            channel,
-            "channeldata.json",
+        ## Download the json file if it has changed since the last download
+        channeldata_path = os.path.join(channel_dir, "channeldata.json")
+        conditional_download(
+            CHANNELDATA_URL.format(channel=channel), channeldata_path, session=session
         )
 
-        channeldata_json = requests.get(channeldata_url).json()
-        with open(os.path.join(channel_dir, "channeldata.json"), "w") as c:
-            json.dump(channeldata_json, c)
+        ## Rebuild the indexed catalog if the json file changed
+        refresh_catalog(channeldata_path)
 
     else:
         sys.exit("The '{c}' channel is not a ggd conda channel".format(c=channel))
@@ -277,36 +1155,151 @@ def update_channel_data_files(channel):
     return True
 
 
+def conditional_download(url, file_path, session=None, timeout=None):
+    """Method to download a json file only if it has changed since the last download
+
+    conditional_download
+    ====================
+    This method is used to keep a local copy of a remote json file up to date without re-downloading it 
+     when it has not changed. The ETag, Last-Modified, and sha256 content hash of the last download are 
+     stored in a sidecar file (<file_path>.validators.json). The validators are sent back to the server 
+     using the If-None-Match and If-Modified-Since headers. If the server responds with a 304 (Not Modified) 
+     the local file is left untouched. If the server responds with new content that has the same content 
+     hash as the local file the local file is also left untouched.
+
+     The new content is written to a temporary file that is then renamed to file_path, so other threads 
+      or processes reading the file never see a partially written file.
+
+    Parameters:
+    -----------
+    1) url:       (str)     The url of the json file to download
+    2) file_path: (str)     The local file path to store the json file at
+    3) session:   (Session) A requests session to download with. (Default = None, the shared ggd session)
+    4) timeout:   (int)     The number of seconds to wait for the server to respond. (Default = None, the transport default)
+
+    Returns:
+    ++++++++
+    1) (bool) True if the local file was written, False if the local file was already up to date
+    """
+    import hashlib
+
+    validators_path = file_path + VALIDATORS_SUFFIX
+
+    ## Load the validators from the last download. (Only valid if the local file still exists)
+    validators = {}
+    if os.path.exists(file_path) and os.path.exists(validators_path):
+        try:
+            with open(validators_path) as v:
+                validators = json.load(v)
+        except ValueError:
+            validators = {}
+
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last-modified"):
+        headers["If-Modified-Since"] = validators["last-modified"]
+
+    response = transport.get(
+        url, session=session, headers=headers, timeout=timeout, stream=True
+    )
+
+    ## Stream the content to a temporary file so large files are never held in memory
+    tmp_path = None
+    try:
+        ## Local file is up to date. Record when it was last revalidated (see metadata_state)
+        if response.status_code == 304:
+            os.utime(validators_path, None)
+            return False
+
+        response.raise_for_status()
+
+        tmp_path = temp_file_for(file_path)
+        sha256 = hashlib.sha256()
+        with open(tmp_path, "wb") as f:
+            for chunk in transport.iter_content(response, STREAM_CHUNK_SIZE):
+                sha256.update(chunk)
+                f.write(chunk)
+    except:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        response.close()
+
+    try:
+        ## Check that the content is a valid json file before storing it
+        validate_json_file(tmp_path)
+
+        content_hash = sha256.hexdigest()
+        changed = content_hash != validators.get("sha256") or not os.path.exists(
+            file_path
+        )
+
+        if changed:
+            publish_file(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    with atomic_write(validators_path) as v:
+        json.dump(
+            {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last-modified": response.headers.get("Last-Modified"),
+                "sha256": content_hash,
+            },
+            v,
+        )
+
+    return changed
+
+
+def update_genome_metadata_file(file_name, session=None):
+    """Method to update a single genome metadata file locally
+
+    update_genome_metadata_file
+    ===========================
+    This method will download one of the GENOME_METADATA_FILES from ggd-metadata into the GENOME_METADATA_DIR 
+     if it has changed (see conditional_download). 
+
+    Parameters:
+    -----------
+    1) file_name: (str)     The name of the genome metadata file
+    2) session:   (Session) A requests session to download with. (Default = None)
+
+    Returns:
+    ++++++++
+    1) (bool) True if the local file was updated, False if it was already up to date
+    """
+
+    return conditional_download(
+        GENOME_METADATA_FILE_URL.format(name=file_name),
+        os.path.join(GENOME_METADATA_DIR, file_name),
+        session=session,
+    )
+
+
 def update_genome_metadata_files():
     """Method to update the species and genome build, and ggd channel metadata files locally 
 
     update_genome_metadata_files
     ==========================================
     This method will download the json metadata species and genome-build files from ggd-metadata and store 
-     in the LOCAL_REPO_DIR. 
+     in the LOCAL_REPO_DIR. The files are downloaded at the same time using the shared ggd session.
     """
-
-    if not os.path.isdir(LOCAL_REPO_DIR):
-        os.makedirs(LOCAL_REPO_DIR, mode=0o777)
-    if not os.path.isdir(GENOME_METADATA_DIR):
-        os.makedirs(GENOME_METADATA_DIR, mode=0o777)
+    make_cache_dir(GENOME_METADATA_DIR)
 
     ## Download the json files
-    build_url = "https://raw.githubusercontent.com/gogetdata/ggd-metadata/master/genome_metadata/build_to_species.json"
-    species_url = "https://raw.githubusercontent.com/gogetdata/ggd-metadata/master/genome_metadata/species_to_build.json"
-    ggd_channels_url = "https://raw.githubusercontent.com/gogetdata/ggd-metadata/master/genome_metadata/ggd_channels.json"
-
-    buildjson = requests.get(build_url).json()
-    with open(os.path.join(GENOME_METADATA_DIR, "build_to_species.json"), "w") as b:
-        json.dump(buildjson, b)
-
-    speciesjson = requests.get(species_url).json()
-    with open(os.path.join(GENOME_METADATA_DIR, "species_to_build.json"), "w") as s:
-        json.dump(speciesjson, s)
-
-    channeljson = requests.get(ggd_channels_url).json()
-    with open(os.path.join(GENOME_METADATA_DIR, "ggd_channels.json"), "w") as s:
-        json.dump(channeljson, s)
+    with thread_pool(len(GENOME_METADATA_FILES)) as pool:
+        futures = [
+            pool.submit(update_genome_metadata_file, file_name)
+            for file_name in GENOME_METADATA_FILES
+        ]
+        ## Raise any download error
+        for future in futures:
+            future.result()
 
     return True
 
@@ -328,24 +1321,15 @@ def get_run_deps_from_tar(tarfile_path, channel):
     1) (list) A list of all ggd specific package deps
     """
 
-    import json
     import tarfile
 
-    import requests
     import yaml
 
     ## extract channel
     channel = channel.strip().split("-")[-1]
 
-    ## If internet connection
-    if check_for_internet_connection(3):
-        ggd_package_dict = requests.get(get_channeldata_url(channel)).json()
-    else:
-        with open(get_channel_data(channel)) as json_file:
-            ggd_package_dict = json.load(json_file)
-
     ## Get a list of all ggd packages
-    ggd_package_names = set(ggd_package_dict["packages"].keys())
+    ggd_package_names = set(load_channeldata(channel).packages.keys())
 
     ## Check for ggd packages in run requirements
     with tarfile.open(tarfile_path, "r:bz2") as tarball_file:
@@ -582,34 +1566,243 @@ def check_conda_pkg_dir(prefix, exclude_pkg=None):
             except OSError as e:
                 return False
 
-    return True
+    return True
+
+
+def sub_dirs(dir_path):
+    """
+    Method to get the (name, path) of each dir in a dir. An OSError is raised if the dir can not be read. os.scandir is used where it is available (Python 3) so no stat call is needed for each entry
+    """
+
+    if hasattr(os, "scandir"):
+        return [(x.name, x.path) for x in os.scandir(dir_path) if x.is_dir()]
+
+    return [
+        (name, os.path.join(dir_path, name))
+        for name in os.listdir(dir_path)
+        if os.path.isdir(os.path.join(dir_path, name))
+    ]
+
+
+def installed_data_packages(prefix=None):
+    """Method to get the ggd data packages installed in a conda environment with a single scan of the ggd data dir
+
+    installed_data_packages
+    =======================
+    This method walks the <prefix>/share/ggd/<species>/<build>/<pkg>/<version> dirs once and returns every installed
+     data package. The result is meant to be reused to check any number of packages (See search.check_installed and
+     install.check_if_installed) instead of checking the file system once per package.
+
+    Parameters:
+    -----------
+    1) prefix: (str) The conda environment/prefix path to scan. (Default = None, the conda root)
+
+    Returns:
+    ++++++++
+    1) (dict) key = (species, genome build, package name, version), value = the path to the installed data package
+    """
+
+    prefix = prefix if prefix != None else conda_root()
+
+    ## One level of the dir tree at a time: species, genome build, package name, version
+    level = [(os.path.join(prefix, "share", "ggd"), ())]
+    for depth in range(4):
+        next_level = []
+        for dir_path, key in level:
+            try:
+                entries = sub_dirs(dir_path)
+            except OSError:
+                continue
+            for name, path in entries:
+                next_level.append((path, key + (name,)))
+        level = next_level
+
+    return {key: dir_path for dir_path, key in level}
+
+
+def validate_build(build, species):
+    """
+    Method to validate that a genome-build is correctly assigned based on a species.
+    """
+    if build != "*":
+        builds_list = get_builds(species)
+        if not builds_list or build not in builds_list:
+            if species != "*":
+                print(
+                    ":ggd:validate-build: Unknown build '%s' for species '%s'"
+                    % (build, species),
+                    file=sys.stderr,
+                )
+            else:
+                print(
+                    ":ggd:validate-build: Unknown build '%s'" % (build), file=sys.stderr
+                )
+            if builds_list:
+                print(
+                    ":ggd:validate-build: Available builds: '%s'"
+                    % ("', '".join(builds_list)),
+                    file=sys.stderr,
+                )
+            return False
+    return True
+
+
+class CondaContext(object):
+    """
+    The conda settings used by ggd: the root prefix, the platform (subdir), and the known conda environments
+
+    The environments can be looked up by name or by path without asking conda. Use get_conda_context() to
+     get the CondaContext for the current process.
+
+    Useful attributes:
+    * root_prefix: The conda root dir
+    * subdir:      The conda platform. (Example: linux-64)
+    * prefixes:    The file paths of the known conda environments
+    """
+
+    def __init__(self, root_prefix, subdir, prefixes, fingerprint=None):
+        self.root_prefix = root_prefix
+        self.subdir = subdir
+        self.prefixes = [x.rstrip("/") for x in prefixes]
+        self.fingerprint = fingerprint
+
+        self.names = dict()  ## Key = env_name, value = env_path
+        self.paths = dict()  ## Key = env_path, value = env_name
+        for env_path in self.prefixes:
+            name = os.path.basename(env_path)
+            self.names[name] = env_path
+            self.paths[env_path] = name
+
+    def prefix_path(self, prefix):
+        """
+        Method to get the path of a conda environment from its name or path, or None if it is not a known environment
+        """
+
+        prefix = prefix.rstrip("/")
+        if prefix in self.names:
+            return self.names[prefix]
+        if prefix in self.paths:
+            return prefix
+        return None
+
+    def to_dict(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "root_prefix": self.root_prefix,
+            "subdir": self.subdir,
+            "prefixes": self.prefixes,
+        }
+
+
+def conda_context_fingerprint(root_prefix=None):
+    """Method to get a stamp for the files and settings the known conda environments are read from
+
+    conda_context_fingerprint
+    =========================
+    This method is used to tell if a cached CondaContext is still current. The stamp is made from the python
+     executable, the conda environment variables, and the modification times of the conda environments.txt
+     file, the envs dirs, and the .condarc files. Creating or removing a conda environment changes the stamp.
+
+    Parameters:
+    -----------
+    1) root_prefix: (str) The conda root dir. (Default = None, the root dir is not part of the stamp)
+
+    Returns:
+    ++++++++
+    1) (str) The stamp
+    """
+
+    paths = [
+        os.path.join(os.path.expanduser("~"), ".conda", "environments.txt"),
+        os.path.join(os.path.expanduser("~"), ".conda", "envs"),
+        os.path.join(os.path.expanduser("~"), ".condarc"),
+    ]
+    if root_prefix:
+        paths.extend(
+            [os.path.join(root_prefix, "envs"), os.path.join(root_prefix, ".condarc")]
+        )
+
+    stamp = [sys.executable] + [
+        os.environ.get(x, "") for x in ("CONDA_SUBDIR", "CONDA_ENVS_PATH", "CONDARC")
+    ]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamp.append("{}:{}:{}".format(path, repr(stat.st_mtime), stat.st_size))
+        except OSError:
+            stamp.append("{}:".format(path))
+
+    return "|".join(stamp)
+
+
+def get_conda_context():
+    """Method to get the conda settings for the current process
+
+    get_conda_context
+    =================
+    This method is used to get the CondaContext with the conda root dir, platform, and known conda
+     environments. Conda is only asked once per process, and the result is checked against the
+     conda_context_fingerprint on each call so a new or removed environment is seen right away.
+
+     The result is also cached in the LOCAL_REPO_DIR (conda_context-<user id>.json), so later ggd processes
+      of the same user do not need to load conda at all while the fingerprint is unchanged. A cache file that
+      is not owned by the current user is ignored. Set GGD_CONDA_CONTEXT_CACHE=0 to turn off the cache file.
+
+    Returns:
+    ++++++++
+    1) (CondaContext) The conda settings
+    """
+
+    ## Settings from this process
+    cached = _CONDA_CONTEXT.get("context")
+    if cached is not None and cached.fingerprint == conda_context_fingerprint(
+        cached.root_prefix
+    ):
+        return cached
+
+    ## Settings from another ggd process
+    use_cache_file = os.environ.get("GGD_CONDA_CONTEXT_CACHE", "1").strip() != "0"
+    if use_cache_file:
+        try:
+            with open(CONDA_CONTEXT_CACHE) as c:
+                if hasattr(os, "getuid") and os.fstat(c.fileno()).st_uid != os.getuid():
+                    raise ValueError("The conda settings of another user")
+                cached = json.load(c)
+            if cached["fingerprint"] == conda_context_fingerprint(
+                cached["root_prefix"]
+            ):
+                _CONDA_CONTEXT["context"] = CondaContext(
+                    cached["root_prefix"],
+                    cached["subdir"],
+                    [x for x in cached["prefixes"] if os.path.isdir(x)],
+                    cached["fingerprint"],
+                )
+                return _CONDA_CONTEXT["context"]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            pass
+
+    ## Ask conda
+    from conda.base.context import context
+    from conda.core.envs_manager import list_all_known_prefixes
+
+    conda_context = CondaContext(
+        context.root_prefix,
+        context.subdir,
+        list_all_known_prefixes(),
+        conda_context_fingerprint(context.root_prefix),
+    )
+    _CONDA_CONTEXT["context"] = conda_context
 
+    if use_cache_file:
+        try:
+            with atomic_write(CONDA_CONTEXT_CACHE) as c:
+                json.dump(conda_context.to_dict(), c)
+            ## Only the user can change their settings, even in a group-shared cache
+            os.chmod(CONDA_CONTEXT_CACHE, 0o644)
+        except (IOError, OSError):
+            pass
 
-def validate_build(build, species):
-    """
-    Method to validate that a genome-build is correctly assigned based on a species.
-    """
-    if build != "*":
-        builds_list = get_builds(species)
-        if not builds_list or build not in builds_list:
-            if species != "*":
-                print(
-                    ":ggd:validate-build: Unknown build '%s' for species '%s'"
-                    % (build, species),
-                    file=sys.stderr,
-                )
-            else:
-                print(
-                    ":ggd:validate-build: Unknown build '%s'" % (build), file=sys.stderr
-                )
-            if builds_list:
-                print(
-                    ":ggd:validate-build: Available builds: '%s'"
-                    % ("', '".join(builds_list)),
-                    file=sys.stderr,
-                )
-            return False
-    return True
+    return conda_context
 
 
 def conda_root():
@@ -618,16 +1811,66 @@ def conda_root():
     conda_root
     ==========
     This method is used to get the conda root dir. A string representing the conda root dir path 
-    is returned.
+    is returned. (See get_conda_context)
     """
 
-    from conda.base.context import context
+    return get_conda_context().root_prefix
+
+
+def conda_pkgs_dir():
+    """Method used to get the conda package cache dir that new package files are added to
 
-    croot = context.root_prefix
-    return croot
+    conda_pkgs_dir
+    ==============
+    This method is used to get the first writable conda package cache dir (pkgs_dirs). This is the dir that
+     conda adds downloaded package files to, and where 'conda install --offline' finds them, for every conda
+     environment.
 
+    Returns:
+    ++++++++
+    1) (str) The file path of the package cache dir
+    """
+
+    try:
+        from conda.core.package_cache_data import PackageCacheData
+
+        return PackageCacheData.first_writable().pkgs_dir
+    except ImportError:
+        from conda.base.context import context
+
+        return context.pkgs_dirs[0]
+
+
+def conda_pkg_path(file_name, prefix=None):
+    """Method used to find a package file in a conda pkgs dir
+
+    conda_pkg_path
+    ==============
+    This method is used to get the file path of a package file (.tar.bz2) or an extracted package dir. The 
+     pkgs dir of the prefix is checked first, then the conda package cache (see conda_pkgs_dir) that conda 
+     and 'ggd bundle import' add package files to.
+
+    Parameters:
+    -----------
+    1) file_name: (str) The name of the package file or dir
+    2) prefix:    (str) The conda environment/prefix to check the pkgs dir of first (Default = None)
+
+    Returns:
+    ++++++++
+    1) (str) The file path of the package file. In the conda package cache if no pkgs dir has it
+    """
+
+    pkg_dirs = [os.path.join(prefix, "pkgs")] if prefix != None else []
+    pkg_dirs.append(conda_pkgs_dir())
+
+    for pkg_dir in pkg_dirs:
+        if os.path.exists(os.path.join(pkg_dir, file_name)):
+            return os.path.join(pkg_dir, file_name)
+
+    return os.path.join(pkg_dirs[-1], file_name)
 
-def get_conda_env(prefix=conda_root()):
+
+def get_conda_env(prefix=None):
     """Method used to get the current conda environment
 
     get_conda_env
@@ -635,30 +1878,20 @@ def get_conda_env(prefix=conda_root()):
     This method is used to get the the name and prefix path for a specified conda environment. 
      Used to access ggd environment variables created for this specific environment. 
 
+    Parameters:
+    -----------
+    1) prefix: (str) The conda prefix/environment path. (Default = None, the conda root)
+
     Returns:
     ++++++++
     1) (str) The conda environment name
     2) (str) The path to the conda environment
     """
 
-    ## Get environment list
-    from conda.core.envs_manager import list_all_known_prefixes
-
-    prefix = prefix.rstrip("/")
-
-    env_var_paths = dict()  ## Key = env_path, value = env_name
-    for env_path in list_all_known_prefixes():
-        name = os.path.basename(env_path.rstrip("/"))
-        env_var_paths[env_path.rstrip("/")] = name
+    prefix = prefix if prefix != None else conda_root()
 
     prefix_path = get_conda_prefix_path(prefix)
-    return (env_var_paths[prefix_path], prefix_path)
-
-    print(
-        ":ggd:conda-env: Error in checking conda environment. Verify that conda is working and try again.",
-        file=sys.stderr,
-    )
-    sys.exit(1)
+    return (get_conda_context().paths[prefix_path], prefix_path)
 
 
 def get_conda_prefix_path(prefix):
@@ -678,26 +1911,10 @@ def get_conda_prefix_path(prefix):
     
     """
 
-    ## Get environment list
-    from conda.core.envs_manager import list_all_known_prefixes
-
-    env_var_names = dict()  ## Key = env_name, value = env_path
-    env_var_paths = dict()  ## Key - env_path, value = env_name
-    for env_path in list_all_known_prefixes():
-        name = os.path.basename(env_path.rstrip("/"))
-        env_var_names[name] = env_path.rstrip("/")
-        env_var_paths[env_path.rstrip("/")] = name
-
-    prefix = prefix.rstrip("/")
-
     ## Check that the file is in the environment lists
-    if prefix not in env_var_names.keys() and prefix not in env_var_paths.keys():
-        raise CondaEnvironmentNotFound(prefix)
-
-    ## Check that the prefix is an existing directory
-    prefix_path = prefix
-    if prefix in env_var_names.keys():
-        prefix_path = env_var_names[prefix]
+    prefix_path = get_conda_context().prefix_path(prefix)
+    if prefix_path is None:
+        raise CondaEnvironmentNotFound(prefix.rstrip("/"))
 
     return prefix_path
 
@@ -719,13 +1936,10 @@ def get_base_env(cur_prefix):
 
     """
 
-    ## Get environment list
-    from conda.core.envs_manager import list_all_known_prefixes
-
     ## Get the full path of the conda prefix
     cur_prefix = get_conda_prefix_path(cur_prefix)
 
-    return min([x for x in list_all_known_prefixes() if x in cur_prefix])
+    return min([x for x in get_conda_context().prefixes if x in cur_prefix])
 
 
 def prefix_in_conda(prefix):
@@ -745,27 +1959,11 @@ def prefix_in_conda(prefix):
     1) (bool) True if prefix is a conda environment, raises an error otherwise
     """
 
-    ## Get environment list
-    from conda.core.envs_manager import list_all_known_prefixes
-
-    env_var_names = dict()  ## Key = env_name, value = env_path
-    env_var_paths = dict()  ## Key - env_path, value = env_name
-    for env_path in list_all_known_prefixes():
-        name = os.path.basename(env_path.rstrip("/"))
-        env_var_names[name] = env_path.rstrip("/")
-        env_var_paths[env_path.rstrip("/")] = name
-
-    prefix = prefix.rstrip("/")
-
-    ## Check that the file is in the environment lists
-    if prefix not in env_var_names.keys() and prefix not in env_var_paths.keys():
-        raise CondaEnvironmentNotFound(prefix)
-
-    ## Get the prefix path dd
+    ## Get the prefix path. (Raises CondaEnvironmentNotFound if the prefix is not in the environment lists)
     prefix_path = get_conda_prefix_path(prefix)
 
     ## Get the base/first conda environment for all environments that are subdirs of the specified prefix
-    cbase = min([x for x in env_var_paths.keys() if x in prefix_path])
+    cbase = min([x for x in get_conda_context().paths.keys() if x in prefix_path])
 
     ## Check that the file path includes the conda base directory
     if cbase not in prefix_path:
@@ -831,11 +2029,414 @@ def add_yaml_literal_block(yaml_object):
     return yaml_object.add_representer(literal_block, literal_str_representer)
 
 
+class JSONStream(object):
+    """
+    An incremental reader for a large json file
+
+    The file is read in chunks and only the value currently being read is held in memory. Use members() to 
+     step through the keys of a json object. Each key must be followed by a call to value() (to get the value), 
+     skip() (to read past the value), or members() (to step into the value if it is a json object).
+
+    Example:
+        stream = JSONStream(open("repodata.json"))
+        for key in stream.members():
+            if key == "packages":
+                for tar in stream.members():
+                    record = stream.value()
+            else:
+                stream.skip()
+        stream.end()
+
+    A ValueError is raised for invalid json.
+    """
+
+    def __init__(self, file_handle, chunk_size=STREAM_CHUNK_SIZE):
+        self.file_handle = file_handle
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.file_handle.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """
+        Get the next non-whitespace character without reading past it. An empty string at the end of the file
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\n\r":
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos : self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(
+                "Invalid json: expected '{}' but found '{}'".format(char, self.peek())
+            )
+        self.pos += 1
+
+    def value(self):
+        """
+        Read the next json value
+        """
+        while True:
+            self.peek()
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+
+            ## A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof:
+                self._fill()
+                continue
+
+            self.pos = end
+            return obj
+
+    def members(self):
+        """
+        Step through the keys of the next json object
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+
+        while True:
+            if self.peek() != '"':
+                raise ValueError("Invalid json: expected a property name")
+            key = self.value()
+            self.expect(":")
+            yield key
+
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError("Invalid json: expected ',' or '}'")
+
+    def skip(self):
+        """
+        Read past the next json value without holding a large json object in memory
+        """
+        if self.peek() == "{":
+            for key in self.members():
+                self.skip()
+        else:
+            self.value()
+
+    def end(self):
+        if self.peek() != "":
+            raise ValueError("Invalid json: extra data after the json value")
+
+
+def validate_json_file(file_path):
+    """
+    Method to check that a file is a valid json file. Raises a ValueError if it is not
+
+     The C json decoder is used. It is several times faster than the pure python JSONStream, and the parsed
+      content is released right away. (JSONStream is only used to read part of a repodata file)
+    """
+    import io
+
+    with io.open(file_path, encoding="utf-8") as f:
+        json.load(f)
+
+
+def iter_repodata_packages(repodata_path, pkg_name=None, chunk_size=STREAM_CHUNK_SIZE):
+    """Method to stream the package records out of a repodata.json file
+
+    iter_repodata_packages
+    ======================
+    This method is used to scan the "packages" section of a repodata.json file without loading the full file. 
+     Only the records for the requested package are kept, so the memory used is close to the size of the 
+     result rather than the size of the repodata. 
+
+    Parameters:
+    -----------
+    1) repodata_path: (str) The file path to a repodata.json file
+    2) pkg_name:      (str) The name of the package to get records for. (Default = None, all packages)
+    3) chunk_size:    (int) The number of characters to read from the file at a time
+
+    Returns:
+    ++++++++
+    1) (generator) (tar file, record) tuples for the matching packages
+    """
+    import io
+
+    with io.open(repodata_path, encoding="utf-8") as r:
+        stream = JSONStream(r, chunk_size)
+        for key in stream.members():
+            if key != "packages":
+                stream.skip()
+                continue
+
+            for tar in stream.members():
+                record = stream.value()
+                if pkg_name is None or record.get("name") == pkg_name:
+                    yield (tar, record)
+
+        stream.end()
+
+
+def load_repodata_packages(repodata_path):
+    """
+    Method to load the "packages" section ({tar file: record}) of a repodata.json file
+
+     The C json decoder is used. Reading every package record in one pass with it is much faster than 
+      stepping through the file with JSONStream
+    """
+    import io
+
+    with io.open(repodata_path, encoding="utf-8") as r:
+        return json.load(r).get("packages", {})
+
+
+def report_peak_memory(label, func, *args, **kwargs):
+    """Method to run a function and report the peak memory allocated while it ran
+
+    report_peak_memory
+    ==================
+    This method is used to run a function and, if the GGD_MEMORY_REPORT environment variable is set, print 
+     the peak amount of memory allocated by python while the function ran (using tracemalloc). 
+
+    Parameters:
+    -----------
+    1) label:    (str)      A description of what the function does, used in the report
+    2) func:     (function) The function to run
+    3) *args:    The positional arguments for the function
+    4) **kwargs: The keyword arguments for the function
+
+    Returns:
+    ++++++++
+    1) The return value of the function
+    """
+
+    if not os.environ.get("GGD_MEMORY_REPORT"):
+        return func(*args, **kwargs)
+
+    try:
+        import tracemalloc
+    except ImportError:
+        ## Not available in python 2
+        return func(*args, **kwargs)
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        peak = tracemalloc.get_traced_memory()[1]
+        if started:
+            tracemalloc.stop()
+        print(
+            "\n:ggd:memory: Peak memory used while {}: {:.1f} MB".format(
+                label, peak / (1024.0 * 1024.0)
+            )
+        )
+
+
+def repodata_cache_dir(channel, subdir):
+    """
+    Method to get the directory of the on-disk repodata cache for a conda channel and subdir
+    """
+
+    return os.path.join(REPODATA_CACHE_DIR, channel, subdir)
+
+
+def build_repodata_index(repodata_path, subdir):
+    """Method to build the compact name index for a cached repodata.json file
+
+    build_repodata_index
+    ====================
+    This method is used to create a small json file next to a cached repodata.json file that maps each 
+     package name to the package files available for it. Looking up a package in the index does not 
+     require the full repodata.json file to be parsed.
+
+     Index format: {"sha256": <sha256 of the repodata.json file>, 
+                    "packages": {<name>: [[version, build_number, subdir, md5, tar file], ...]}}
+
+    Parameters:
+    -----------
+    1) repodata_path: (str) The file path to the cached repodata.json file
+    2) subdir:        (str) The subdir (platform) of the repodata
+
+    Returns:
+    ++++++++
+    1) (dict) The name index
+    """
+    import hashlib
+    from collections import defaultdict
+
+    sha256 = hashlib.sha256()
+    with open(repodata_path, "rb") as r:
+        for chunk in iter(lambda: r.read(STREAM_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+
+    ## Every record is needed, so the repodata is read with the C json decoder rather than streamed
+    packages = defaultdict(list)
+    for tar, pkg in load_repodata_packages(repodata_path).items():
+        packages[pkg["name"]].append(
+            [pkg["version"], pkg["build_number"], subdir, pkg.get("md5"), tar]
+        )
+
+    index = {"sha256": sha256.hexdigest(), "packages": dict(packages)}
+
+    index_path = os.path.join(os.path.dirname(repodata_path), REPODATA_INDEX_NAME)
+    with atomic_write(index_path) as out:
+        json.dump(index, out, separators=(",", ":"))
+
+    return index
+
+
+def update_repodata_cache(channel, subdir):
+    """Method to update the on-disk repodata cache for a conda channel and subdir
+
+    update_repodata_cache
+    =====================
+    This method is used to keep a local copy of the Anaconda Cloud repodata.json file for a channel and 
+     subdir up to date. The file is revalidated with a conditional download (see conditional_download), 
+     so an unchanged repodata.json file is not downloaded again. The name index (see build_repodata_index) 
+     is rebuilt if the repodata changed. Without an internet connection the cached copy is used. 
+
+    Parameters:
+    -----------
+    1) channel: (str) The conda channel. (Example: ggd-genomics)
+    2) subdir:  (str) The subdir (platform). (Example: noarch)
+
+    Returns:
+    ++++++++
+    1) (dict) The name index for the channel and subdir
+    """
+
+    cache_dir = make_cache_dir(repodata_cache_dir(channel, subdir))
+    repodata_path = os.path.join(cache_dir, "repodata.json")
+
+    ## One ggd process at a time updates the repodata cache
+    with cache_lock(REPODATA_LOCK):
+        if check_for_internet_connection():
+            conditional_download(
+                REPODATA_URL.format(channel=channel, subdir=subdir),
+                repodata_path,
+                timeout=REPODATA_TIMEOUT,
+            )
+
+        ## Use the stored index if it was built from the current repodata
+        validators = {}
+        try:
+            with open(repodata_path + VALIDATORS_SUFFIX) as v:
+                validators = json.load(v)
+            with open(os.path.join(cache_dir, REPODATA_INDEX_NAME)) as i:
+                index = json.load(i)
+            if index.get("sha256") and index["sha256"] == validators.get("sha256"):
+                return index
+        except (IOError, OSError, ValueError):
+            pass
+
+        return build_repodata_index(repodata_path, subdir)
+
+
+def get_repodata_entries(channel, pkg_name, subdirs=["noarch"]):
+    """Method to get the package files available for a package in a conda channel
+
+    get_repodata_entries
+    ====================
+    This method is used to look up a package in the repodata name index of a conda channel, without 
+     loading the full repodata. 
+
+    Parameters:
+    -----------
+    1) channel:  (str)  The conda channel. (Example: ggd-genomics)
+    2) pkg_name: (str)  The name of the package
+    3) subdirs:  (list) The subdirs (platforms) to check. (Default = ["noarch"])
+
+    Returns:
+    ++++++++
+    1) (list) A list of [version, build_number, subdir, md5, tar file] lists for the package
+    """
+
+    import requests
+
+    entries = []
+    for subdir in subdirs:
+        try:
+            index = update_repodata_cache(channel, subdir)
+        except (requests.RequestException, IOError, OSError, ValueError) as e:
+            print(
+                "\n:ggd:repodata: !!ERROR!! A problem occurred loading the repodata for the conda channel: '{}' platform: '{}'".format(
+                    channel, subdir
+                )
+            )
+            print(str(e))
+            sys.exit(1)
+
+        entries.extend(index["packages"].get(pkg_name, []))
+
+    return entries
+
+
+def latest_repodata_entry(entries, version):
+    """Method to find the package file with the latest build for a package version
+
+    latest_repodata_entry
+    =====================
+    This method is used to find the package file (tar file) with the highest build number for a specific 
+     version of a package from the package's repodata entries (see get_repodata_entries)
+
+    Parameters:
+    -----------
+    1) entries: (list)  The [version, build_number, subdir, md5, tar file] entries for a package
+    2) version: (float) The version of the package
+
+    Returns:
+    ++++++++
+    1) (float) The highest build number, or -1 if no file matches the version
+    2) (str)   The subdir (platform) of the file
+    3) (str)   The md5sum of the file
+    4) (str)   The tar file name
+    """
+
+    highest_build = float(-1)
+    newest_tar = ""
+    platform = ""
+    md5 = None
+
+    for entry_version, build_number, subdir, tar_md5, pkg_tar in entries:
+
+        repo_version = float(entry_version)
+        repo_build_number = float(build_number)
+
+        ## Check for a matching version and latest build
+        if repo_version == float(version) and repo_build_number > highest_build:
+
+            highest_build = repo_build_number
+            platform = subdir
+            newest_tar = pkg_tar
+            md5 = tar_md5
+
+    return (highest_build, platform, md5, newest_tar)
+
+
 def get_repodata(channels=["ggd-genomics"], subdirs=["noarch"], return_repodata=True):
     """
     get_repodata
     ============
-    Method to get the conda repodata from the Anaconda Cloud for a list of conda channels 
+    Method to get the conda repodata from the Anaconda Cloud for a list of conda channels. The repodata is 
+     stored in an on-disk cache and only downloaded again when it changes (see update_repodata_cache) 
 
     Parameters:
     -----------
@@ -849,13 +2450,15 @@ def get_repodata(channels=["ggd-genomics"], subdirs=["noarch"], return_repodata=
     Returns:
     ++++++++
     if return_repodata is True:
-        1) (dict)  A dictionary with keys as channels and values as the repodata for that channel starting at the "packages" key.
+        1) (dict)  A dictionary with keys as channels and values as the repodata for that channel (all subdirs) starting at the "packages" key.
         2) (dict)  A dict with keys as channel, subdir, package names and values as a set of tar files.
     if return_repodata is False:
         1) (dict)  A dict with keys as channel, subdir, package names and values as a set of tar files.
     """
     from collections import defaultdict
 
+    import requests
+
     print(
         "\n:ggd:repodata: Loading repodata from the Anaconda Cloud for the following channels: {}".format(
             ", ".join(channels)
@@ -874,13 +2477,19 @@ def get_repodata(channels=["ggd-genomics"], subdirs=["noarch"], return_repodata=
         if channel == "defaults":
             continue
 
+        repodata_by_channel[channel] = dict()
+
         ## Check each platform
         for subdir in subdirs:
-            repodata_url = REPODATA_URL.format(channel=channel, subdir=subdir)
 
             try:
-                repodata_json = requests.get(repodata_url).json()
-            except ValueError as e:
+                index = update_repodata_cache(channel, subdir)
+                if return_repodata:
+                    with open(
+                        os.path.join(repodata_cache_dir(channel, subdir), "repodata.json")
+                    ) as r:
+                        repodata_json = json.load(r)
+            except (requests.RequestException, IOError, OSError, ValueError) as e:
                 print(
                     "\n:ggd:repodata: !!ERROR!! A problem occurred loading the repodata for the conda channel: '{}' platform: '{}'".format(
                         channel, subdir
@@ -890,13 +2499,12 @@ def get_repodata(channels=["ggd-genomics"], subdirs=["noarch"], return_repodata=
                 sys.exit(1)
 
             ## Add to dict
-            repodata_by_channel[channel] = repodata_json["packages"]
+            if return_repodata:
+                repodata_by_channel[channel].update(repodata_json["packages"])
 
             ##Create the name2tar file
-            for tar, pkg in repodata_json["packages"].items():
-                name = pkg["name"]
-
-                name2tar[channel][subdir][name].add(tar)
+            for name, entries in index["packages"].items():
+                name2tar[channel][subdir][name].update(entry[4] for entry in entries)
 
     if return_repodata:
         return (repodata_by_channel, name2tar)
@@ -958,8 +2566,10 @@ def get_meta_recipe_pkg(pkg_name, jdict, ggd_channel, prefix):
 
     channel_key = "ggd-%s" % ggd_channel
 
-    ## Get the pkg names and tar files for each ggd package in the specific channel
-    repodata_dict, name2tar = get_repodata(channels=[channel_key])
+    ## Get the tar files for the ggd package in the specific channel from the repodata name index
+    entries = report_peak_memory(
+        "loading the repodata", get_repodata_entries, channel_key, pkg_name
+    )
 
     assert (
         pkg_name in jdict["packages"]
@@ -968,38 +2578,11 @@ def get_meta_recipe_pkg(pkg_name, jdict, ggd_channel, prefix):
     )
 
     matching_version = float(jdict["packages"][pkg_name]["version"])
-    highest_build = float(-1)
-    newest_tar = ""
-    platform = ""
 
     ## Find the latest version-build tar file
-    for subdir in name2tar[channel_key].keys():
-
-        if pkg_name in name2tar[channel_key][subdir]:
-
-            for pkg_tar in name2tar[channel_key][subdir][pkg_name]:
-
-                repo_version = float(repodata_dict[channel_key][pkg_tar]["version"])
-                repo_build_number = float(
-                    repodata_dict[channel_key][pkg_tar]["build_number"]
-                )
-
-                ## Check for a matching version and latest build
-                if (
-                    repo_version == matching_version
-                    and repo_build_number > highest_build
-                ):
-
-                    highest_build = repo_build_number
-                    platform = subdir
-                    newest_tar = pkg_tar
-
-    ## Get the md5sum
-    md5 = repodata_dict[channel_key][newest_tar]["md5"]
-
-    ## Remove the repodata files
-    del repodata_dict
-    del name2tar
+    highest_build, platform, md5, newest_tar = latest_repodata_entry(
+        entries, matching_version
+    )
 
     ## Get the url for the tar file
     download_url = "https://anaconda.org/ggd-{channel}/{pkg_name}/{version}/download/{platform}/{tar_file}".format(
@@ -1031,6 +2614,17 @@ def get_meta_recipe_pkg(pkg_name, jdict, ggd_channel, prefix):
     ## Download dir: The pkgs directory in the designated install prefix
     dest_dir = os.path.join(prefix, "pkgs")
 
+    ## Use a previous download, or a package added to the conda package cache by 'ggd bundle import', if it is complete
+    for pkg_dir in (dest_dir, conda_pkgs_dir()):
+        target_path = os.path.join(pkg_dir, newest_tar)
+        if os.path.isfile(target_path) and get_file_md5sum(target_path) == md5:
+            print(
+                "\n:ggd:meta-recipe: Using the meta-recipe package already in: '{}'".format(
+                    pkg_dir
+                )
+            )
+            return (pkg_dir, newest_tar, target_path)
+
     ## Remove previous download
     if os.path.exists(os.path.join(dest_dir, newest_tar)):
         os.remove(os.path.join(dest_dir, newest_tar))
@@ -1545,17 +3139,26 @@ def get_meta_recipe_checksum(
     2) id_specific_name: (str) Name of the id specific recipe installed from the meta-recipe
     3) file_name:        (str) Name of the file to load. Default = checksums.json
 
+     In offline mode (GGD_OFFLINE) the local copy of the file in META_RECIPE_CACHE_DIR is used if it exists. (See 'ggd bundle')
+
     Returns:
     ++++++++
     1) (dict) Checksum values for the files of the id specific recipe or an empty dict if no checksum values exists
     """
+    import requests
+
+    local_path = os.path.join(META_RECIPE_CACHE_DIR, meta_recipe_name, file_name)
     try:
-        checksum_dict = requests.get(
-            GGD_META_RECIPE_URL.format(
-                meta_recipe_name=meta_recipe_name, file_name=file_name
-            )
-        ).json()
-    except ValueError as e:
+        if offline_mode() and os.path.exists(local_path):
+            with open(local_path) as c:
+                checksum_dict = json.load(c)
+        else:
+            checksum_dict = transport.get(
+                GGD_META_RECIPE_URL.format(
+                    meta_recipe_name=meta_recipe_name, file_name=file_name
+                )
+            ).json()
+    except (ValueError, requests.RequestException, RuntimeError) as e:
         print(
             "\n:ggd:meta-recipe: !!ERROR!! There was a problem loading the checksum file for the meta-recipe: {}".format(
                 meta_recipe_name
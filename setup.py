@@ -24,7 +24,8 @@ setup(
 
     entry_points={
         'console_scripts': [
-            'ggd = ggd.__main__:main'
+            'ggd = ggd.__main__:main',
+            'ggd-complete = ggd.completion:main'
         ]
     },
 
@@ -0,0 +1,9 @@
+import os
+
+## The tests turn network access on and off with pytest-socket. Disable the cached connectivity verdict
+##  so that every utils.check_for_internet_connection() call probes the network
+os.environ["GGD_CONNECTIVITY_TTL"] = "0"
+
+## Keep the metadata reads synchronous during testing. (No stale-while-revalidate and no background refresh)
+os.environ["GGD_METADATA_TTL"] = "0"
+os.environ["GGD_METADATA_MAX_STALE"] = "0"
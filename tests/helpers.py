@@ -204,3 +204,73 @@ class CreateRecipe(object):
         nested_recipe(self.recipes,basedir)
 
 
+
+
+class MetadataServer(object):
+    def __init__(self, files):
+        """
+        A local http stand-in for the ggd-metadata repo. 
+
+        Serves the files in the `files` dict (key = url path, value = file content as bytes) from a 
+         localhost http server running in a background thread. Each file is served with an ETag 
+         (the md5sum of the content) and requests with a matching If-None-Match header get a 
+         304 (Not Modified) response. 
+
+        Useful attributes:
+        * url:      The base url of the server. (Example: http://127.0.0.1:<port>)
+        * files:    The files being served. Update a value to change the served content
+        * requests: A list of (path, status code) tuples, one for each request handled
+        """
+        import hashlib
+        import threading
+
+        if sys.version_info[0] == 3:
+            from http.server import BaseHTTPRequestHandler, HTTPServer
+        elif sys.version_info[0] == 2:
+            from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+        self.files = files
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in server.files:
+                    server.requests.append((self.path, 404))
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+
+                content = server.files[self.path]
+                etag = '"%s"' % hashlib.md5(content).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    server.requests.append((self.path, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                server.requests.append((self.path, 200))
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_HEAD(self):
+                server.requests.append((self.path, 200))
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1485,11 +1485,15 @@ def test_get_ggd_metadata():
     metadata = predict_path.get_ggd_metadata("genomics")
     assert len(metadata["packages"]) > 0
 
-    ## Test without internet connection
+    ## Test without internet connection. The local copy of the metadata is used
     pytest_disable_socket()
 
+    offline_metadata = predict_path.get_ggd_metadata("genomics")
+    assert sorted(offline_metadata["packages"].keys()) == sorted(metadata["packages"].keys())
+
+    ## Test without internet connection and without a local copy of the metadata
     with pytest.raises(SystemExit) as pytest_wrapped_e:
-        predict_path.get_ggd_metadata("genomics")
+        predict_path.get_ggd_metadata("not-a-local-channel")
     assert "SystemExit" in str(pytest_wrapped_e.exconly()) ## test that SystemExit was raised by sys.exit() 
     assert pytest_wrapped_e.match("A internet connection is required to use this function. Please try again when you have secured an internet connection") 
 
@@ -1,5 +1,6 @@
 from __future__ import print_function
 import os
+import shutil
 import sys
 import subprocess as sp
 import pytest
@@ -180,6 +181,327 @@ def test_search_packages_keyword_match():
     assert search.search_packages(json_dict,[search_term]) == []
 
 
+def test_search_packages_with_index():
+    """
+    Test that searching with the catalog search index gives the same results, in the same order, as scoring every package
+    """
+    pytest_enable_socket()
+
+    import random
+    import shutil
+    from ggd import catalog
+
+    random.seed(16)
+    words = ["hg19", "hg38", "gaps", "ucsc", "gene", "genome", "reference", "cpg", "islands", "repeat", "gtf", "grch38", "mm10", "gnomad", "region", "v1"]
+    packages = {}
+    for i in range(300):
+        name = "-".join(random.choice(words) for _ in range(random.randint(1, 4))) + "-{}".format(i)
+        if i % 50 == 0:
+            name = "aa{}".format(i)
+        packages[name] = {"version": "1",
+                          "keywords": ["-".join(random.choice(words) for _ in range(random.randint(1, 2))) for _ in range(random.randint(1, 3))],
+                          "identifiers": {"species": "Homo_sapiens", "genome-build": "hg19"}}
+    json_dict = {"channeldata_version": 1, "packages": packages}
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        channeldata_path = os.path.join(tmp_dir, "channeldata.json")
+        with open(channeldata_path, "w") as j:
+            json.dump(json_dict, j)
+        index = catalog.open_catalog(channeldata_path)
+
+        for score_cutoff in [0, 50, 70, 80, 90, 95, 100]:
+            for terms in [["hg19"], ["gaps"], ["reference", "genome"], ["cpg", "islands"], ["aa"], ["g"], ["GRCh38", "GTF"], ["ucsc-gaps"], ["zzzz"]]:
+                for search_type in ["both", "combined-only", "non-combined-only"]:
+                    assert search.search_packages(json_dict, terms, search_type, score_cutoff, index) == search.search_packages(json_dict, terms, search_type, score_cutoff)
+
+        ## Only the candidate packages are scored
+        candidates = index.search_candidates("gnomad", 90)
+        assert candidates is not None
+        assert len(candidates) < len(packages)
+        assert set(search.search_packages(json_dict, ["gnomad"], "both", 90)) <= set(candidates)
+
+        ## A filtered json dict only returns packages in the dict
+        filtered = {"packages": {name: pkg for name, pkg in packages.items() if name.startswith("gnomad")}}
+        assert search.search_packages(filtered, ["gnomad"], "both", 90, index) == search.search_packages(filtered, ["gnomad"], "both", 90)
+
+        ## Too low a score cutoff uses every package
+        assert index.search_candidates("gnomad", 50) is None
+        index.close()
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_search_packages_batch_scores(monkeypatch):
+    """
+    Test that the batch scoring engine gives the same results, in the same order, as scoring one package at a time
+    """
+    pytest_enable_socket()
+    pytest.importorskip("numpy")
+    pytest.importorskip("rapidfuzz")
+
+    import random
+
+    random.seed(17)
+    words = ["hg19", "hg38", "gaps", "ucsc", "gene", "genome", "reference", "human", "cpg", "islands", "GRCh38", "gtf", "mm10", "region", "v1"]
+    packages = {}
+    for i in range(300):
+        name = "-".join(random.choice(words) for _ in range(random.randint(1, 4))) + "-{}".format(i)
+        packages[name] = {"version": "1",
+                          "keywords": ["_".join(random.choice(words) for _ in range(random.randint(1, 2))) for _ in range(random.randint(1, 3))]}
+    json_dict = {"channeldata_version": 1, "packages": packages}
+
+    for score_cutoff in [0, 50, 75, 90, 100]:
+        for terms in [["human"], ["reference", "genome"], ["grch38", "gtf"], ["hg19-gaps"], ["zzzz"]]:
+            for search_type in ["both", "non-combined-only"]:
+                monkeypatch.setattr(search, "BATCH_SCORE_MIN_PACKAGES", 10 ** 9)
+                expected = search.search_packages(json_dict, terms, search_type, score_cutoff)
+                monkeypatch.setattr(search, "BATCH_SCORE_MIN_PACKAGES", 0)
+                assert search.search_packages(json_dict, terms, search_type, score_cutoff) == expected
+
+    ## The batch scores match the single package scores for the packages that could reach the cutoff
+    pkgs = list(packages.keys())
+    term_scores = search.batch_score_packages(["human", "hg19 gaps"], [pkgs, pkgs[:100]], json_dict, 75)
+    assert set(term_scores[1].keys()) <= set(pkgs[:100])
+    for term, term_pkgs, scores in zip(["human", "hg19 gaps"], [pkgs, pkgs[:100]], term_scores):
+        for pkg in term_pkgs:
+            if pkg in scores:
+                assert scores[pkg] == search.score_package(term, pkg, json_dict)
+            else:
+                assert max(search.score_package(term, pkg, json_dict)) < 75
+
+
+def test_search_output_formats():
+    """
+    Test the json, jsonl, and tsv output of search results and that the top results match the full ranking
+    """
+    pytest_enable_socket()
+
+    from ggd import output
+
+    json_dict = {"channeldata_version": 1, "packages": {
+        "hg19-gaps-ucsc-v1": {"version": "1", "summary": "Assembly gaps from UCSC", "keywords": ["gaps", "region"],
+                              "identifiers": {"species": "Homo_sapiens", "genome-build": "hg19"},
+                              "tags": {"ggd-channel": "genomics", "data-provider": "UCSC", "file-type": ["bed"]}},
+        "hg38-gaps-ucsc-v1": {"version": "1", "summary": "Assembly\tgaps\nfrom UCSC", "keywords": ["gaps", "region"],
+                              "identifiers": {"species": "Homo_sapiens", "genome-build": "hg38"},
+                              "tags": {"ggd-channel": "genomics", "data-provider": "UCSC", "file-type": ["bed"]}},
+    }}
+    installed_paths = {"hg19-gaps-ucsc-v1": "/conda/share/ggd/Homo_sapiens/hg19/hg19-gaps-ucsc-v1/1"}
+    field_getters = search.search_result_fields(json_dict, installed_paths)
+    assert list(field_getters.keys()) == search.SEARCH_OUTPUT_FIELDS
+
+    ## Only requested fields are included
+    fields = output.select_fields("name,installed,installed-path,file-type", field_getters, "search")
+    pkgs = ["hg19-gaps-ucsc-v1", "hg38-gaps-ucsc-v1"]
+
+    temp_stdout = StringIO()
+    assert output.write_records(output.iter_records(pkgs, field_getters, fields), fields, "jsonl", temp_stdout) == 2
+    lines = temp_stdout.getvalue().strip().split("\n")
+    assert [json.loads(x) for x in lines] == [
+        {"name": "hg19-gaps-ucsc-v1", "installed": True, "installed-path": installed_paths["hg19-gaps-ucsc-v1"], "file-type": ["bed"]},
+        {"name": "hg38-gaps-ucsc-v1", "installed": False, "installed-path": None, "file-type": ["bed"]},
+    ]
+
+    temp_stdout = StringIO()
+    output.write_records(output.iter_records(pkgs, field_getters, fields), fields, "json", temp_stdout)
+    assert json.loads(temp_stdout.getvalue()) == [json.loads(x) for x in lines]
+
+    ## Tabs and new lines are removed from tsv values
+    fields = output.select_fields("name,summary,keywords", field_getters, "search")
+    temp_stdout = StringIO()
+    output.write_records(output.iter_records(pkgs, field_getters, fields), fields, "tsv", temp_stdout)
+    assert temp_stdout.getvalue().split("\n") == [
+        "name\tsummary\tkeywords",
+        "hg19-gaps-ucsc-v1\tAssembly gaps from UCSC\tgaps,region",
+        "hg38-gaps-ucsc-v1\tAssembly gaps from UCSC\tgaps,region",
+        "",
+    ]
+
+    ## No results
+    temp_stdout = StringIO()
+    assert output.write_records(output.iter_records([], field_getters, fields), fields, "json", temp_stdout) == 0
+    assert json.loads(temp_stdout.getvalue()) == []
+
+    ## An unknown field is a usage error
+    with pytest.raises(SystemExit) as pytest_wrapped_e:
+        output.select_fields("name,not-a-field", field_getters, "search")
+    assert "not-a-field" in str(pytest_wrapped_e.exconly())
+
+    ## The top results match the full ranking, including the order of ties
+    scores = {"a": 90.0, "b": 100.0, "c": 90.0, "d": 95.0, "e": 90.0, "f": 80.0}
+    full = search.rank_matches(scores)
+    assert full == ["b", "d", "a", "c", "e", "f"]
+    for limit in range(0, 8):
+        assert search.rank_matches(scores, limit) == full[:limit]
+
+
+def test_search_all_channels(monkeypatch, capsys):
+    """
+    Test that searching all ggd channels ranks the matches of every channel together and tags each result with its channel
+    """
+    pytest_enable_socket()
+
+    class FakeChannelData(object):
+        field_index = None
+        search_index = None
+        fingerprint = None
+
+        def __init__(self, packages):
+            self.packages = packages
+
+        def copy(self):
+            return {"channeldata_version": 1, "packages": dict(self.packages)}
+
+    def package(channel, keywords):
+        return {"version": "1", "keywords": keywords, "identifiers": {"species": "Homo_sapiens", "genome-build": "hg19"},
+                "tags": {"ggd-channel": channel}}
+
+    channeldata = {
+        "genomics": FakeChannelData({"hg19-gaps-ucsc-v1": package("genomics", ["gaps"]),
+                                     "hg19-cpg-islands-ucsc-v1": package("genomics", ["cpg"])}),
+        "proteomics": FakeChannelData({"hg19-gaps-v1": package("proteomics", ["gaps"]),
+                                       "hg19-gaps-ucsc-v1": package("proteomics", ["gaps"])}),
+        "dev": FakeChannelData({}),
+    }
+    monkeypatch.setattr(utils, "load_channeldata", lambda channel: channeldata[channel])
+    monkeypatch.setattr(utils, "update_channels_data", lambda channels: [])
+    monkeypatch.setattr(utils, "get_ggd_channels", lambda: ["genomics", "dev", "proteomics"])
+    monkeypatch.setattr(search, "get_species", lambda update_files=True: ["Homo_sapiens"])
+    monkeypatch.setattr(utils, "get_builds", lambda species: ["hg19"])
+
+    ## Each channel is searched on its own, in channel order
+    results = search.search_all_channels(["genomics", "dev", "proteomics"], ["gaps"], [], [], [], "both", 75, 5)
+    assert [channel for channel, result in results] == ["genomics", "dev", "proteomics"]
+    assert list(results[0][1][1].keys()) == ["hg19-gaps-ucsc-v1"]
+    assert results[1][1][2] == 0
+    assert sorted(results[2][1][1].keys()) == ["hg19-gaps-ucsc-v1", "hg19-gaps-v1"]
+
+    ## The matches are ranked together. A package name in two channels is reported once, from the higher ranked channel
+    args = Namespace(channel='all', command='search', format='jsonl', fields="name,channel", display_number=5, genome_build=[],
+                     match_score='75', search_type="both", search_term=['gaps'], species=[])
+    temp_stdout = StringIO()
+    with redirect_stdout(temp_stdout):
+        assert search.search((), args) == True
+    records = [json.loads(x) for x in temp_stdout.getvalue().strip().split("\n")]
+    assert records == [{"name": "hg19-gaps-ucsc-v1", "channel": "genomics"}, {"name": "hg19-gaps-v1", "channel": "proteomics"}]
+
+    ## Warnings are written to stderr, so the output stays valid json
+    args.format = "json"
+    args.species = ["Mus_musculus"]
+    capsys.readouterr()
+    temp_stdout = StringIO()
+    with redirect_stdout(temp_stdout):
+        assert search.search((), args) == True
+    assert [x["name"] for x in json.loads(temp_stdout.getvalue())] == ["hg19-gaps-ucsc-v1", "hg19-gaps-v1"]
+    assert "WARNING: Unable to filter packages using: 'Mus_musculus'" in capsys.readouterr().err
+    args.format = "jsonl"
+    args.species = []
+
+    ## The top results of all channels are the top of the full ranking
+    args.display_number = 1
+    temp_stdout = StringIO()
+    with redirect_stdout(temp_stdout):
+        assert search.search((), args) == True
+    assert [json.loads(x) for x in temp_stdout.getvalue().strip().split("\n")] == records[:1]
+
+    ## The text output shows the channel and how to install from it
+    args.format = "text"
+    args.display_number = 5
+    temp_stdout = StringIO()
+    with redirect_stdout(temp_stdout):
+        assert search.search((), args) == True
+    output = temp_stdout.getvalue().strip()
+    assert "GGD Channel:\033[0m proteomics" in output
+    assert "ggd install hg19-gaps-v1 -c proteomics" in output
+
+
+def test_search_cache(monkeypatch, tmpdir, capsys):
+    """
+    Test that repeated searches use the cached results until the channel metadata changes
+    """
+    pytest_enable_socket()
+
+    def package(keywords):
+        return {"version": "1", "keywords": keywords, "identifiers": {"species": "Homo_sapiens", "genome-build": "hg19"},
+                "tags": {"ggd-channel": "genomics"}}
+
+    packages = {"hg19-gaps-ucsc-v1": package(["gaps"]), "hg38-gaps-ucsc-v1": package(["gaps"]),
+                "hg19-cpg-islands-ucsc-v1": package(["cpg"])}
+    channel_dir = tmpdir.mkdir("channeldata")
+    channel_dir.mkdir("genomics").join("channeldata.json").write(json.dumps({"channeldata_version": 1, "packages": packages}))
+    cache_dir = str(tmpdir.join("search_cache"))
+
+    monkeypatch.setattr(utils, "CHANNEL_DATA_DIR", str(channel_dir))
+    monkeypatch.setattr(utils, "SEARCH_CACHE_DIR", cache_dir)
+    monkeypatch.setattr(utils, "get_channel_data", lambda channel: None)
+    monkeypatch.setattr(utils, "_CHANNELDATA", {})
+
+    search_args = (["gaps"], [], [], [], "both", 75)
+    j_dict, matches, count = search.search_channel("genomics", *search_args, limit=5)
+    assert sorted(matches.keys()) == ["hg19-gaps-ucsc-v1", "hg38-gaps-ucsc-v1"]
+    assert count == 2
+    assert len(os.listdir(cache_dir)) == 1
+
+    ## A repeated search (with different case) does not score any packages or read the channeldata.json file
+    def no_scoring(*args, **kwargs):
+        raise AssertionError("Search results were not cached")
+
+    original_match_scores = search.match_scores
+    monkeypatch.setattr(search, "match_scores", no_scoring)
+    monkeypatch.setattr(utils, "_CHANNELDATA", {})
+    for limit in [5, 1]:
+        cached_dict, cached_matches, cached_count = search.search_channel("genomics", ["GAPS"], [], [], [], "both", 75, limit=limit)
+        assert list(cached_matches.items()) == list(matches.items())[:limit]
+        assert cached_count == count
+        assert cached_dict["packages"] == dict((pkg, packages[pkg]) for pkg in cached_matches)
+    assert utils._CHANNELDATA["genomics"]._json_dict is None
+
+    ## New channel metadata is searched again
+    packages["hg19-gaps-v2"] = package(["gaps"])
+    channel_dir.join("genomics", "channeldata.json").write(json.dumps({"channeldata_version": 1, "packages": packages}))
+    monkeypatch.setattr(search, "match_scores", original_match_scores)
+    monkeypatch.setattr(utils, "_CHANNELDATA", {})
+    j_dict, matches, count = search.search_channel("genomics", *search_args, limit=5)
+    assert "hg19-gaps-v2" in matches
+    assert count == 3
+
+    ## A new ggd version has new cache keys
+    import importlib
+
+    channeldata = utils.load_channeldata("genomics")
+    key = search.search_cache_key(channeldata, ["gaps"], [], [], [], "both", 75)
+    monkeypatch.setattr(importlib.import_module("ggd.__init__"), "__version__", "999.0.0")
+    assert search.search_cache_key(channeldata, ["gaps"], [], [], [], "both", 75) != key
+
+    ## A repeated search warns again that the packages could not be filtered
+    for i in range(2):
+        search.search_channel("genomics", ["gaps"], [], ["Mus_musculus"], [], "both", 75, limit=5)
+        assert "Unable to filter packages using: 'Mus_musculus'" in capsys.readouterr().out
+
+    ## Only the most recently used searches are kept (without os.scandir on python 2)
+    scandir = getattr(os, "scandir", None)
+    monkeypatch.delattr(os, "scandir", raising=False)
+    monkeypatch.setenv("GGD_SEARCH_CACHE_SIZE", "2")
+    for term in ["cpg", "islands", "gaps"]:
+        search.search_channel("genomics", [term], [], [], [], "both", 75, limit=5)
+    assert len(os.listdir(cache_dir)) == 2
+    if scandir is not None:
+        monkeypatch.setattr(os, "scandir", scandir, raising=False)
+
+    ## The cache can be turned off
+    monkeypatch.setenv("GGD_SEARCH_CACHE_SIZE", "0")
+    shutil.rmtree(cache_dir)
+    search.search_channel("genomics", *search_args, limit=5)
+    assert not os.path.exists(cache_dir)
+
+    ## A cache size that is not a whole number uses the default size
+    monkeypatch.setenv("GGD_SEARCH_CACHE_SIZE", "lots")
+    assert utils.env_int("GGD_SEARCH_CACHE_SIZE", utils.SEARCH_CACHE_SIZE) == utils.SEARCH_CACHE_SIZE
+    assert search.search_cache_key(channeldata, ["gaps"], [], [], [], "both", 75) != None
+
+
 def test_check_installed():
     """
     test the check_installed function properly identifies if something is already installed or not, and provides the path for it
@@ -472,6 +794,65 @@ def test_filter_by_identifiers_multiple_identifiers():
                     u'mm10-reference-genome': {u'activate.d': False, u'version': u'1', u'tags': {u'cached': [u'uploaded_to_aws'], u'ggd-channel': u'genomics', u'data-version': u'phase2_reference'}, u'post_link': True, u'binary_prefix': False, u'run_exports': {}, u'pre_unlink': False, u'subdirs': [u'noarch'], u'deactivate.d': False, u'reference_package': u'noarch/mm10-reference-genome-1-3.tar.bz2', u'pre_link': False, u'keywords': [u'ref', u'reference'], u'summary': u'GRCh37 reference genome from 1000 genomes', u'text_prefix': False, u'identifiers': {u'genome-build': u'mm10', u'species': u'Mus_musculus'}}}} 
 
 
+def test_filter_by_fields():
+    """
+    Test that field-scoped search terms are parsed and filter packages with the field index, with or without a catalog
+    """
+    pytest_enable_socket()
+
+    import shutil
+    from ggd import catalog
+
+    json_dict = {"channeldata_version": 1, "packages": {
+        "hg19-gaps-ucsc-v1": {"keywords": ["gaps"], "identifiers": {"species": "Homo_sapiens", "genome-build": "hg19"},
+                              "tags": {"data-provider": "UCSC", "file-type": ["bed"], "genomic-coordinate-base": "0-based-inclusive", "ggd-channel": "genomics"}},
+        "hg38-gaps-ucsc-v1": {"keywords": ["gaps"], "identifiers": {"species": "Homo_sapiens", "genome-build": "hg38"},
+                              "tags": {"data-provider": "UCSC", "file-type": ["bed"], "genomic-coordinate-base": "0-based-inclusive", "ggd-channel": "genomics"}},
+        "grch38-gtf-ensembl-v1": {"keywords": ["gtf"], "identifiers": {"species": "Homo_sapiens", "genome-build": "GRCh38"},
+                                  "tags": {"data-provider": "Ensembl", "file-type": ["gtf", "bed"], "genomic-coordinate-base": "1-based-inclusive", "ggd-channel": "genomics"}},
+        "mm10-gaps-ucsc-v1": {"keywords": ["gaps"], "identifiers": {"species": "Mus_musculus", "genome-build": "mm10"},
+                              "tags": {"data-provider": "UCSC", "file-type": ["bed"], "ggd-channel": "genomics"}},
+    }}
+
+    ## Parse field-scoped terms. Unknown fields are normal search terms
+    assert search.parse_field_terms(["gaps", "provider:UCSC", "FileType:bed", "chr1:100", "build:"]) == (
+        [("data-provider", "UCSC"), ("file-type", "bed")], ["gaps", "chr1:100", "build:"])
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        channeldata_path = os.path.join(tmp_dir, "channeldata.json")
+        with open(channeldata_path, "w") as j:
+            json.dump(json_dict, j)
+        cat = catalog.open_catalog(channeldata_path)
+
+        for index in [None, cat.field_index()]:
+            ## AND across fields, OR within a field, values ignore case
+            filtered = search.filter_by_fields([("data-provider", "ucsc"), ("file-type", "bed")], json_dict, index)
+            assert list(filtered["packages"].keys()) == ["hg19-gaps-ucsc-v1", "hg38-gaps-ucsc-v1", "mm10-gaps-ucsc-v1"]
+            filtered = search.filter_by_fields([("file-type", "gtf"), ("genome-build", "hg19"), ("genome-build", "GRCh38")], json_dict, index)
+            assert list(filtered["packages"].keys()) == ["grch38-gtf-ensembl-v1"]
+            filtered = search.filter_by_fields([("genomic-coordinate-base", "0-based-inclusive"), ("species", "Mus_musculus")], json_dict, index)
+            assert filtered["packages"] == {}
+
+            ## The package entries are shared, not copied
+            filtered = search.filter_by_fields([("ggd-channel", "genomics")], json_dict, index)
+            assert filtered["packages"] == json_dict["packages"]
+            assert filtered["packages"]["hg19-gaps-ucsc-v1"] is json_dict["packages"]["hg19-gaps-ucsc-v1"]
+
+            ## Identifier filters match any identifier (same results as without an index)
+            filtered = search.filter_by_identifiers(["species", "genome-build"], json_dict, ["Mus_musculus", "hg19"], index)
+            assert list(filtered["packages"].keys()) == ["hg19-gaps-ucsc-v1", "mm10-gaps-ucsc-v1"]
+            assert filtered["packages"]["mm10-gaps-ucsc-v1"] is json_dict["packages"]["mm10-gaps-ucsc-v1"]
+
+        ## A filtered json dict only keeps its own packages
+        subset = {"packages": {"hg38-gaps-ucsc-v1": json_dict["packages"]["hg38-gaps-ucsc-v1"]}}
+        assert list(search.filter_by_fields([("data-provider", "UCSC")], subset, cat.field_index())["packages"].keys()) == ["hg38-gaps-ucsc-v1"]
+        cat.close()
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
 def test_print_summary():
     """
     Test that the print summary function correctly handels no matches, some matches, etc.
@@ -496,13 +877,13 @@ def test_print_summary():
                     u'grch37-reference-genome': {u'activate.d': False, u'version': u'1', u'tags': {u'cached': [u'uploaded_to_aws'], u'ggd-channel': u'genomics', u'data-version': u'phase2_reference'}, u'post_link': True, u'binary_prefix': False, u'run_exports': {}, u'pre_unlink': False, u'subdirs': [u'noarch'], u'deactivate.d': False, u'reference_package': u'noarch/grch37-reference-genome-1-3.tar.bz2', u'pre_link': False, u'keywords': [u'ref', u'reference'], u'summary': u'GRCh37 reference genome from 1000 genomes', u'text_prefix': False, u'identifiers': {u'genome-build': u'GRCh37', u'species': u'Homo_sapiens'}}, 
                     u'hg38-simplerepeats': {u'activate.d': False, u'version': u'1', u'tags': {u'cached': [u'uploaded_to_aws'], u'ggd-channel': u'genomics', u'data-version': u'06-Mar-2014'}, u'post_link': True, u'binary_prefix': False, u'run_exports': {}, u'pre_unlink': False, u'subdirs': [u'noarch'], u'deactivate.d': False, u'reference_package': u'noarch/hg38-simplerepeats-1-3.tar.bz2', u'pre_link': False, u'keywords': [u'simrep', u'regions'], u'summary': u'Simple repeats track from UCSC | name=sequence | score=alignment score | col 7 = period | col 8 = copy_num', u'text_prefix': False, u'identifiers': {u'genome-build': u'hg38', u'species': u'Homo_sapiens'}}}}
 
-    ## test that no results exits correclty
+    ## test that no results returns False without exiting
     search_term = ["Failed Search"]
     matches = []
-    with pytest.raises(SystemExit) as pytest_wrapped_e:
-        search.print_summary(search_term,json_dict,matches,{},[])
-    assert "SystemExit" in str(pytest_wrapped_e.exconly()) ## test that SystemExit was raised by sys.exit() 
-    assert pytest_wrapped_e.match("") ## Check that the exit code is 1
+    temp_stdout = StringIO()
+    with redirect_stdout(temp_stdout):
+        assert search.print_summary(search_term,json_dict,matches,{},[]) == False
+    assert ":ggd:search: No results for Failed Search" in temp_stdout.getvalue()
 
 
     ## Test matches print out and function returns true
@@ -711,10 +1092,10 @@ def test_main_search():
 
     ## Test bad term search 
     args = Namespace(channel='genomics', command='search', display_number=5, genome_build=[], match_score='75', search_type = "both", search_term=['zzzzzzzzzzzzzzzzzzzzzzz'], species=[])
-    with pytest.raises(SystemExit) as pytest_wrapped_e:
-        search.search(parser,args) 
-    assert "SystemExit" in str(pytest_wrapped_e.exconly()) ## test that SystemExit was raised by sys.exit() 
-    assert pytest_wrapped_e.match("") ## Check that the exit code is 1
+    temp_stdout = StringIO()
+    with redirect_stdout(temp_stdout):
+        assert search.search(parser,args) == False
+    assert ":ggd:search: No results for zzzzzzzzzzzzzzzzzzzzzzz" in temp_stdout.getvalue()
 
     ## test meta-recipe
     temp_stdout = StringIO()
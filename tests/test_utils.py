@@ -17,7 +17,7 @@ from argparse import ArgumentParser
 import glob
 import contextlib
 import tarfile
-from helpers import CreateRecipe, install_hg19_gaps_ucsc_v1, uninstall_hg19_gaps_ucsc_v1
+from helpers import CreateRecipe, MetadataServer, install_hg19_gaps_ucsc_v1, uninstall_hg19_gaps_ucsc_v1
 from ggd import utils
 from ggd import install
 
@@ -171,6 +171,231 @@ def test_get_channel_data():
     assert os.path.exists(os.path.expanduser("~/.config/ggd-info/channeldata/genomics/channeldata.json"))
 
 
+def test_load_channeldata(monkeypatch):
+    """
+    Test that load_channeldata returns a single per-process ChannelData object and that copies can be modified
+    """
+    pytest_enable_socket()
+
+    ## The channel metadata is only updated the first time the channel is loaded
+    calls = []
+    monkeypatch.setattr(utils, "_CHANNELDATA", {})
+    monkeypatch.setattr(utils, "get_channel_data", lambda channel: calls.append(channel))
+
+    tmpdir = tempfile.mkdtemp()
+    monkeypatch.setattr(utils, "CHANNEL_DATA_DIR", tmpdir)
+    os.makedirs(os.path.join(tmpdir, "genomics"))
+    with open(os.path.join(tmpdir, "genomics", "channeldata.json"), "w") as out:
+        json.dump({"channeldata_version": 1, "packages": {"ggd": {}, "hg19-gaps-ucsc-v1": {"keywords": ["gaps"]}}}, out)
+
+    cdata = utils.load_channeldata("genomics")
+    assert utils.load_channeldata("genomics") is cdata
+    assert calls == ["genomics"]
+    assert sorted(cdata.packages.keys()) == ["ggd", "hg19-gaps-ucsc-v1"]
+
+    ## Modifying a copy does not change the shared object
+    jdict = cdata.copy()
+    jdict["packages"].pop("ggd")
+    assert "ggd" not in jdict["packages"]
+    assert "ggd" in cdata.packages
+
+    ## A missing channeldata file gives an empty package set
+    empty = utils.load_channeldata("fake")
+    assert empty.packages == {}
+    assert calls == ["genomics", "fake"]
+
+    shutil.rmtree(tmpdir)
+
+
+def test_catalog(monkeypatch):
+    """
+    Test that the SQLite catalog is built from a channeldata.json file and answers single package queries
+    """
+    pytest_enable_socket()
+
+    from ggd import catalog
+
+    tmpdir = tempfile.mkdtemp()
+    channeldata_path = os.path.join(tmpdir, "channeldata.json")
+    packages = {
+        "hg19-gaps-ucsc-v1": {
+            "version": "1",
+            "keywords": ["gaps", "region"],
+            "identifiers": {"species": "Homo_sapiens", "genome-build": "hg19"},
+            "tags": {"final-files": ["hg19-gaps-ucsc-v1.bed.gz", "hg19-gaps-ucsc-v1.bed.gz.tbi"], "ggd-channel": "genomics"},
+        },
+        "grch38-reference-genome-ensembl-v1": {
+            "version": "1",
+            "keywords": ["ref", "reference"],
+            "identifiers": {"species": "Homo_sapiens", "genome-build": "GRCh38"},
+            "tags": {"ggd-channel": "genomics"},
+        },
+    }
+    with open(channeldata_path, "w") as out:
+        json.dump({"channeldata_version": 1, "packages": packages}, out)
+
+    ## No catalog yet
+    assert catalog.catalog_is_current(channeldata_path) == False
+
+    ## Open builds the catalog
+    cat = catalog.open_catalog(channeldata_path)
+    assert os.path.exists(catalog.catalog_path(channeldata_path))
+    assert catalog.catalog_is_current(channeldata_path)
+    assert cat.get_package("hg19-gaps-ucsc-v1") == packages["hg19-gaps-ucsc-v1"]
+    assert cat.get_package("not-a-package") is None
+    assert cat.has_package("grch38-reference-genome-ensembl-v1")
+    assert sorted(cat.package_names()) == sorted(packages.keys())
+    assert cat.final_files("hg19-gaps-ucsc-v1") == ["hg19-gaps-ucsc-v1.bed.gz", "hg19-gaps-ucsc-v1.bed.gz.tbi"]
+    assert cat.final_files("grch38-reference-genome-ensembl-v1") == []
+    assert cat.packages_by_identifier("genome-build", "GRCh38") == ["grch38-reference-genome-ensembl-v1"]
+    cat.close()
+
+    ## A changed channeldata.json file makes the catalog out of date
+    del packages["grch38-reference-genome-ensembl-v1"]
+    with open(channeldata_path, "w") as out:
+        json.dump({"channeldata_version": 1, "packages": packages, "extra": True}, out)
+    assert catalog.catalog_is_current(channeldata_path) == False
+    assert catalog.refresh_catalog(channeldata_path)
+    cat = catalog.open_catalog(channeldata_path)
+    assert cat.has_package("grch38-reference-genome-ensembl-v1") == False
+    cat.close()
+
+    ## The search index arrays are stored as bytes
+    from array import array
+
+    assert list(catalog.int_array(catalog.array_bytes(array("i", [1, -2, 3])))) == [1, -2, 3]
+    assert list(catalog.bytes_array("d", catalog.array_bytes(array("d", [0.5, 2.0])))) == [0.5, 2.0]
+
+    ## The field bitmaps are stored as little-endian bytes
+    assert catalog.bitmap_to_bytes(0b100000001, 3) == b"\x01\x01\x00"
+    assert catalog.bitmap_from_bytes(b"\x01\x01\x00") == 0b100000001
+    assert catalog.bitmap_from_bytes(bytearray(catalog.bitmap_to_bytes(2 ** 70 + 5, 9))) == 2 ** 70 + 5
+
+    ## Any error while building the catalog falls back to the channeldata.json file
+    def broken_index(packages):
+        raise AttributeError("'array.array' object has no attribute 'tobytes'")
+
+    with open(channeldata_path, "w") as out:
+        json.dump({"channeldata_version": 1, "packages": packages}, out)
+    monkeypatch.setattr(catalog.FieldIndex, "from_packages", staticmethod(broken_index))
+    assert catalog.refresh_catalog(channeldata_path) == False
+    assert catalog.open_catalog(channeldata_path) is None
+    monkeypatch.undo()
+
+    ## A bad channeldata.json file has no catalog
+    with open(channeldata_path, "w") as out:
+        out.write("not json")
+    assert catalog.open_catalog(channeldata_path) is None
+
+    shutil.rmtree(tmpdir)
+
+
+
+def test_completion(monkeypatch):
+    """
+    Test that shell completion reads the completion index written with the catalog, and does not import conda or requests
+    """
+    pytest_enable_socket()
+
+    import random
+    from ggd import catalog, completion
+
+    tmpdir = tempfile.mkdtemp()
+    channel_dir = os.path.join(tmpdir, "channeldata", "genomics")
+    os.makedirs(channel_dir)
+    names = ["hg19-gaps-ucsc-v1", "hg38-gaps-ucsc-v1", "hg19-cpg-islands-ucsc-v1", "grch38-reference-genome-ensembl-v1", "ggd"]
+    with open(os.path.join(channel_dir, "channeldata.json"), "w") as out:
+        json.dump({"channeldata_version": 1, "packages": dict((x, {"version": "1", "keywords": []}) for x in names)}, out)
+
+    ## The completion index is written when the catalog is built
+    catalog.build_catalog(os.path.join(channel_dir, "channeldata.json"))
+    for file_name in [completion.NAMES_FILE, completion.TRIE_FILE, completion.BKTREE_FILE]:
+        assert os.path.exists(os.path.join(channel_dir, file_name))
+
+    monkeypatch.setattr(completion, "CHANNEL_DATA_DIR", os.path.join(tmpdir, "channeldata"))
+    monkeypatch.setattr(completion, "GENOME_METADATA_DIR", os.path.join(tmpdir, "genome_metadata"))
+    monkeypatch.setattr(completion, "CONDA_CONTEXT_CACHE", os.path.join(tmpdir, "conda_context.json"))
+
+    ## Prefix completion
+    assert completion.package_names("genomics") == sorted(names[:4])
+    assert completion.package_names("genomics", "hg19") == ["hg19-cpg-islands-ucsc-v1", "hg19-gaps-ucsc-v1"]
+    assert completion.package_names("genomics", "h") == ["hg19-cpg-islands-ucsc-v1", "hg19-gaps-ucsc-v1", "hg38-gaps-ucsc-v1"]
+    assert completion.package_names("genomics", "zz") == []
+    assert completion.package_names("not-a-channel", "hg") == []
+
+    ## Sub-commands, package names, and typo suggestions
+    assert completion.complete(["ggd"], "un") == ["uninstall"]
+    assert completion.complete(["ggd", "install"], "hg19-g") == ["hg19-gaps-ucsc-v1"]
+    assert completion.complete(["ggd", "install", "hg19-gaps-ucsc-v1"], "hg38") == ["hg38-gaps-ucsc-v1"]
+    assert completion.complete(["ggd", "install"], "hg19-gpas-ucsc-v1") == ["hg19-gaps-ucsc-v1"]
+    assert completion.complete(["ggd", "get-files", "-c", "genomics"], "grch") == ["grch38-reference-genome-ensembl-v1"]
+    assert completion.complete(["ggd", "pkg-info"], "hg19-c") == ["hg19-cpg-islands-ucsc-v1"]
+    assert completion.complete(["ggd", "predict-path", "-pn"], "hg38") == ["hg38-gaps-ucsc-v1"]
+    assert completion.complete(["ggd", "predict-path", "--prefix"], "hg38") == []
+    assert completion.complete(["ggd", "get-files", "-s"], "hg") == []
+    assert completion.complete(["ggd", "install"], "--") == []
+    assert completion.complete(["ggd", "search"], "hg") == []
+    assert completion.complete(["ggd", "install", "-c", "dev"], "hg") == []
+
+    ## Channels
+    os.makedirs(os.path.join(tmpdir, "genome_metadata"))
+    with open(os.path.join(tmpdir, "genome_metadata", "ggd_channels.json"), "w") as out:
+        json.dump({"channels": ["genomics", "dev"]}, out)
+    assert completion.complete(["ggd", "install", "-c"], "") == ["genomics", "dev"]
+
+    ## Uninstall completes the installed packages of the conda root
+    conda_root = os.path.join(tmpdir, "conda")
+    os.makedirs(os.path.join(conda_root, "share", "ggd", "Homo_sapiens", "hg19", "hg19-gaps-ucsc-v1", "1"))
+    os.makedirs(os.path.join(conda_root, "share", "ggd", "Homo_sapiens", "hg38", "hg38-cpg-islands-ucsc-v1", "1"))
+    with open(os.path.join(tmpdir, "conda_context.json"), "w") as out:
+        json.dump({"root_prefix": conda_root}, out)
+    assert completion.installed_package_names() == ["hg19-gaps-ucsc-v1", "hg38-cpg-islands-ucsc-v1"]
+    assert completion.complete(["ggd", "uninstall"], "hg38") == ["hg38-cpg-islands-ucsc-v1"]
+
+    ## Without os.scandir (python 2)
+    scandir = getattr(os, "scandir", None)
+    monkeypatch.delattr(os, "scandir", raising=False)
+    assert completion.installed_package_names() == ["hg19-gaps-ucsc-v1", "hg38-cpg-islands-ucsc-v1"]
+    monkeypatch.setattr(os, "scandir", scandir, raising=False)
+
+    ## The BK-tree finds the same names as comparing every name
+    rng = random.Random(1)
+    words = sorted(set("".join(rng.choice("acgt-") for _ in range(rng.randint(3, 8))) for _ in range(300)))
+    bktree = completion.read_bktree(_bktree_file(completion, words))
+    for word in words[:20] + ["acg", "tttttt", "zzzz"]:
+        expected = sorted((completion.levenshtein(word, x), x) for x in words if completion.levenshtein(word, x) <= 2)
+        assert completion.search_bktree(bktree, words, word, 2) == expected
+
+    ## The command line from bash or --line
+    monkeypatch.setenv("COMP_LINE", "ggd install hg38 -c genomics")
+    monkeypatch.setenv("COMP_POINT", "16")
+    temp_stdout = StringIO()
+    with redirect_stdout(temp_stdout):
+        completion.main(["ggd", "hg38", "install"])
+    assert temp_stdout.getvalue() == "hg38-gaps-ucsc-v1\n"
+
+    ## Completion does not import conda, requests, or the rest of ggd
+    env = dict(os.environ, GGD_LOCAL=tmpdir)
+    code = ("import sys; from ggd import completion; completion.main(['--line', 'ggd install hg1']);"
+            " assert not [x for x in ['conda', 'requests', 'ggd.utils'] if x in sys.modules]")
+    output = sp.check_output([sys.executable, "-c", code], env=env).decode()
+    assert output.split() == ["hg19-cpg-islands-ucsc-v1", "hg19-gaps-ucsc-v1"]
+
+    shutil.rmtree(tmpdir)
+
+
+def _bktree_file(completion, words):
+    """
+    Write a BK-tree of words to an in memory binary file
+    """
+    import io
+
+    f = io.BytesIO()
+    completion.write_bktree(completion.build_bktree(words), f)
+    f.seek(0)
+    return f
+
+
 def test_get_channeldata_url():
     """
     Test the get_channeldata_url properly returns the url to the channel data
@@ -218,6 +443,55 @@ def test_get_required_conda_version():
         assert int(second_version[0]) == 4
         assert int(second_version[1]) == 9
         assert int(second_version[2]) <= 0
+
+
+def test_get_required_conda_version_cached(monkeypatch):
+    """
+    Test that get_required_conda_version caches the conda version, and uses the env var override and the packaged fallback, using a local http stand-in
+    """
+    pytest_enable_socket()
+
+    server = MetadataServer({"/requirements.txt": b"requests>=2.22.*\npyyaml\nconda=4.8.3\nconda-build>=3.18.12,<=3.19.3\n"})
+    tmp_dir = tempfile.mkdtemp()
+    monkeypatch.setattr(utils, "GGD_CLI_REQUIREMENTS", server.url + "/requirements.txt")
+    monkeypatch.setattr(utils, "CONDA_REQUIREMENT_CACHE", os.path.join(tmp_dir, "conda_requirement.json"))
+    monkeypatch.delenv("GGD_CONDA_VERSION", raising=False)
+    monkeypatch.delenv("GGD_OFFLINE", raising=False)
+
+    try:
+        ## The first lookup downloads the requirements file, later lookups use the cache
+        assert utils.get_required_conda_version() == ("4.8.3", "=")
+        assert utils.get_required_conda_version() == ("4.8.3", "=")
+        assert server.requests == [("/requirements.txt", 200)]
+
+        ## An expired cache is updated
+        server.files["/requirements.txt"] = b"conda>=4.8.2,<=4.9.0\n"
+        monkeypatch.setenv("GGD_CONDA_REQUIREMENT_TTL", "0")
+        assert utils.get_required_conda_version() == ("4.8.2,<=4.9.0", ">=")
+        assert len(server.requests) == 2
+
+        ## The env var override does not make a request
+        monkeypatch.setenv("GGD_CONDA_VERSION", "4.8.4")
+        assert utils.get_required_conda_version() == ("4.8.4", "=")
+        monkeypatch.setenv("GGD_CONDA_VERSION", ">=4.8.2,<=4.9.0")
+        assert utils.get_required_conda_version() == ("4.8.2,<=4.9.0", ">=")
+        assert len(server.requests) == 2
+        monkeypatch.delenv("GGD_CONDA_VERSION")
+
+        ## Offline: an expired cached version is used, or the packaged version if nothing is cached
+        monkeypatch.setenv("GGD_OFFLINE", "1")
+        assert utils.get_required_conda_version() == ("4.8.2,<=4.9.0", ">=")
+        os.remove(utils.CONDA_REQUIREMENT_CACHE)
+        assert utils.get_required_conda_version() == utils.parse_conda_requirement([utils.PACKAGED_CONDA_REQUIREMENT])
+        assert len(server.requests) == 2
+
+    finally:
+        server.stop()
+        shutil.rmtree(tmp_dir)
+
+    ## The packaged version matches the requirements file
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "requirements.txt")) as r:
+        assert utils.parse_conda_requirement(r.readlines()) == utils.parse_conda_requirement([utils.PACKAGED_CONDA_REQUIREMENT])
         
     
 
@@ -313,6 +587,54 @@ def test_check_for_internet_connection():
     pytest_enable_socket()
 
 
+def test_check_for_internet_connection_cached_and_offline(monkeypatch):
+    """
+    Test that check_for_internet_connection caches its verdict and respects the GGD_OFFLINE environment variable
+    """
+    pytest_enable_socket()
+
+    server = MetadataServer({"/README.md": b"ggd-metadata"})
+    tmp_dir = tempfile.mkdtemp()
+    monkeypatch.setattr(utils, "CONNECTIVITY_PROBE_URL", server.url + "/README.md")
+    monkeypatch.setattr(utils, "CONNECTIVITY_CACHE", os.path.join(tmp_dir, "connectivity.json"))
+    monkeypatch.setenv("GGD_CONNECTIVITY_TTL", "60")
+
+    try:
+        ## The probe goes to the metadata host and the verdict is stored
+        assert utils.check_for_internet_connection() == True
+        assert len(server.requests) == 1
+        with open(utils.CONNECTIVITY_CACHE) as c:
+            assert json.load(c)["online"] == True
+
+        ## A fresh verdict is re-used without probing
+        assert utils.check_for_internet_connection() == True
+        assert utils.check_for_internet_connection(3) == True
+        assert len(server.requests) == 1
+
+        ## A ttl of 0 always probes
+        monkeypatch.setenv("GGD_CONNECTIVITY_TTL", "0")
+        assert utils.check_for_internet_connection() == True
+        assert len(server.requests) == 2
+
+        ## An unreachable host is cached as offline
+        server.stop()
+        assert utils.check_for_internet_connection(1) == False
+        monkeypatch.setenv("GGD_CONNECTIVITY_TTL", "60")
+        with open(utils.CONNECTIVITY_CACHE) as c:
+            assert json.load(c)["online"] == False
+        assert utils.check_for_internet_connection() == False
+
+        ## Offline mode never probes
+        os.remove(utils.CONNECTIVITY_CACHE)
+        monkeypatch.setenv("GGD_OFFLINE", "1")
+        assert utils.offline_mode() == True
+        assert utils.check_for_internet_connection() == False
+        assert os.path.exists(utils.CONNECTIVITY_CACHE) == False
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
 def test_update_channel_data_files():
     """
     Test that the update_channel_data_files function correctly updates the local copy of the channeldata.json file
@@ -340,6 +662,62 @@ def test_update_channel_data_files():
     assert os.path.exists(os.path.join(file_path,channel,"channeldata.json"))
 
 
+def test_conditional_download():
+    """
+    Test that conditional_download only re-writes the local file when the remote file has changed, using a local http stand-in 
+    """
+    pytest_enable_socket()
+
+    channeldata = {"channeldata_version": 1, "packages": {"hg19-gaps-ucsc-v1": {"version": "1"}}}
+    server = MetadataServer({"/channeldata/genomics/channeldata.json": json.dumps(channeldata).encode("utf-8")})
+    url = server.url + "/channeldata/genomics/channeldata.json"
+
+    tmp_dir = tempfile.mkdtemp()
+    file_path = os.path.join(tmp_dir, "channeldata.json")
+
+    try:
+        ## First download writes the file and the validators
+        assert utils.conditional_download(url, file_path) == True
+        assert os.path.exists(file_path)
+        assert os.path.exists(file_path + utils.VALIDATORS_SUFFIX)
+        with open(file_path) as f:
+            assert json.load(f) == channeldata
+        with open(file_path + utils.VALIDATORS_SUFFIX) as f:
+            validators = json.load(f)
+        assert validators["url"] == url
+        assert validators["etag"] != None
+        assert validators["sha256"] != None
+        mtime = os.path.getmtime(file_path)
+
+        ## An unchanged file is revalidated with a 304 and not re-written
+        assert utils.conditional_download(url, file_path) == False
+        assert server.requests[-1] == ("/channeldata/genomics/channeldata.json", 304)
+        assert os.path.getmtime(file_path) == mtime
+
+        ## A changed file is downloaded and re-written
+        channeldata["packages"]["hg38-gaps-ucsc-v1"] = {"version": "1"}
+        server.files["/channeldata/genomics/channeldata.json"] = json.dumps(channeldata).encode("utf-8")
+        assert utils.conditional_download(url, file_path) == True
+        assert server.requests[-1] == ("/channeldata/genomics/channeldata.json", 200)
+        with open(file_path) as f:
+            assert "hg38-gaps-ucsc-v1" in json.load(f)["packages"]
+
+        ## If the local file is removed the validators are ignored and the file is downloaded again
+        os.remove(file_path)
+        assert utils.conditional_download(url, file_path) == True
+        assert server.requests[-1] == ("/channeldata/genomics/channeldata.json", 200)
+        assert os.path.exists(file_path)
+
+        ## A bad url raises an error and does not create the file
+        with pytest.raises(requests.HTTPError):
+            utils.conditional_download(server.url + "/not-a-file.json", os.path.join(tmp_dir, "bad.json"))
+        assert os.path.exists(os.path.join(tmp_dir, "bad.json")) == False
+
+    finally:
+        server.stop()
+        shutil.rmtree(tmp_dir)
+
+
 def test_update_genome_metadata_files():
     """
     Test that the update_genome_metadata_files function properly updates the local species_to_build.json,
@@ -362,6 +740,710 @@ def test_update_genome_metadata_files():
     assert os.path.exists(os.path.join(file_path,"ggd_channels.json"))
 
 
+def test_transport_network_report():
+    """
+    Test that the shared transport records every request in the network ledger and reports repeated requests, using a local http stand-in
+    """
+    pytest_enable_socket()
+
+    from ggd import transport
+
+    content = json.dumps({"channels": ["genomics"]}).encode("utf-8")
+    server = MetadataServer({"/ggd_channels.json": content})
+    tmp_dir = tempfile.mkdtemp()
+
+    try:
+        ## One shared session per retry setting, with pooling and compression
+        session = transport.get_session()
+        assert transport.get_session() is session
+        assert transport.get_session(retries=False) is not session
+        assert "gzip" in session.headers["Accept-Encoding"]
+        assert session.get_adapter("https://").max_retries.total == transport.DEFAULT_RETRIES
+        assert transport.get_session(retries=False).get_adapter("https://").max_retries.total == 0
+
+        transport.reset_ledger()
+        assert transport.get(server.url + "/ggd_channels.json").json() == {"channels": ["genomics"]}
+        assert transport.head(server.url + "/ggd_channels.json", retries=False).status_code == 200
+        assert transport.get(server.url + "/not-a-file.json").status_code == 404
+
+        ## Streamed downloads are added to the ledger as they are read
+        file_path = os.path.join(tmp_dir, "ggd_channels.json")
+        assert utils.conditional_download(server.url + "/ggd_channels.json", file_path) == True
+        assert utils.conditional_download(server.url + "/ggd_channels.json", file_path) == False
+
+        entries = transport.ledger()
+        assert [(e["method"], e["status"]) for e in entries] == [("GET", 200), ("HEAD", 200), ("GET", 404), ("GET", 200), ("GET", 304)]
+        assert entries[0]["bytes"] == len(content)
+        assert entries[3]["bytes"] == len(content)
+        assert entries[4]["bytes"] == 0
+        assert all(e["seconds"] >= 0 for e in entries)
+
+        ## The report lists each request and the repeated urls
+        report = transport.network_report()
+        assert ":ggd:network: 5 request(s)" in report
+        assert "4x {}/ggd_channels.json".format(server.url) in report
+        assert "not-a-file.json" in report.split("Repeated requests")[0]
+
+        ## Failed requests are recorded
+        with pytest.raises(requests.RequestException):
+            transport.get("http://127.0.0.1:1/closed", retries=False, timeout=1)
+        assert transport.ledger()[-1]["status"] == "ConnectionError"
+
+        transport.reset_ledger()
+        assert transport.ledger() == []
+
+    finally:
+        server.stop()
+        shutil.rmtree(tmp_dir)
+
+
+def test_refresh_metadata(monkeypatch):
+    """
+    Test that refresh_metadata updates the genome metadata files and the channeldata for every ggd channel, using a local http stand-in
+    """
+    pytest_enable_socket()
+
+    from ggd import metadata
+
+    channeldata = {"channeldata_version": 1, "packages": {"hg19-gaps-ucsc-v1": {"version": "1"}}}
+    files = {
+        "/genome_metadata/build_to_species.json": json.dumps({"hg19": "Homo_sapiens"}).encode("utf-8"),
+        "/genome_metadata/species_to_build.json": json.dumps({"Homo_sapiens": ["hg19"]}).encode("utf-8"),
+        "/genome_metadata/ggd_channels.json": json.dumps({"channels": ["genomics", "proteomics"]}).encode("utf-8"),
+        "/channeldata/genomics/channeldata.json": json.dumps(channeldata).encode("utf-8"),
+        "/channeldata/proteomics/channeldata.json": json.dumps(channeldata).encode("utf-8"),
+    }
+    server = MetadataServer(files)
+
+    tmp_dir = tempfile.mkdtemp()
+    monkeypatch.setattr(utils, "LOCAL_REPO_DIR", tmp_dir)
+    monkeypatch.setattr(utils, "GENOME_METADATA_DIR", os.path.join(tmp_dir, "genome_metadata"))
+    monkeypatch.setattr(utils, "CHANNEL_DATA_DIR", os.path.join(tmp_dir, "channeldata"))
+    monkeypatch.setattr(utils, "GENOME_METADATA_FILE_URL", server.url + "/genome_metadata/{name}")
+    monkeypatch.setattr(utils, "CHANNELDATA_URL", server.url + "/channeldata/{channel}/channeldata.json")
+
+    try:
+        ## Cold start: the channels are found from the downloaded ggd_channels.json file
+        errors = metadata.refresh_metadata()
+        assert sorted(errors.keys()) == sorted(list(utils.GENOME_METADATA_FILES) + ["genomics", "proteomics"])
+        assert all(error is None for error in errors.values())
+        for name in utils.GENOME_METADATA_FILES:
+            assert os.path.exists(os.path.join(tmp_dir, "genome_metadata", name))
+        for channel in ["genomics", "proteomics"]:
+            assert os.path.exists(os.path.join(tmp_dir, "channeldata", channel, "channeldata.json"))
+            assert os.path.exists(os.path.join(tmp_dir, "channeldata", channel, "catalog.sqlite"))
+
+        ## A second refresh only revalidates the files
+        del server.requests[:]
+        errors = metadata.refresh_metadata()
+        assert all(error is None for error in errors.values())
+        assert len(server.requests) == 5
+        assert all(status == 304 for path, status in server.requests)
+
+        ## Only the requested channels are refreshed, and errors are reported by channel
+        errors = metadata.refresh_metadata(channels=["genomics", "not-a-channel"], max_workers=2)
+        assert errors["genomics"] is None
+        assert errors["not-a-channel"] is not None
+        assert "proteomics" not in errors
+
+    finally:
+        server.stop()
+        shutil.rmtree(tmp_dir)
+
+
+def test_bundle_export_and_import(monkeypatch):
+    """
+    Test that a bundle created with export_bundle has everything needed to find and install a package offline after import_bundle, using a local http stand-in
+    """
+    pytest_enable_socket()
+
+    import hashlib
+    from ggd import bundle
+
+    pkg_tar = b"not a real package file"
+    md5 = hashlib.md5(pkg_tar).hexdigest()
+    channeldata = {"channeldata_version": 1, "packages": {"hg19-gaps-ucsc-v1": {"version": "1", "identifiers": {"genome-build": "hg19", "species": "Homo_sapiens"}},
+                                                          "meta-recipe-geo-accession-geo-v1": {"version": "1", "identifiers": {"genome-build": "meta-recipe", "species": "meta-recipe"}}}}
+    repodata = {"packages": {"hg19-gaps-ucsc-v1-1-0.tar.bz2": {"name": "hg19-gaps-ucsc-v1", "version": "1", "build_number": 0, "md5": "old"},
+                             "hg19-gaps-ucsc-v1-1-1.tar.bz2": {"name": "hg19-gaps-ucsc-v1", "version": "1", "build_number": 1, "md5": md5},
+                             "meta-recipe-geo-accession-geo-v1-1-0.tar.bz2": {"name": "meta-recipe-geo-accession-geo-v1", "version": "1", "build_number": 0, "md5": md5},
+                             "grch37-gaps-ucsc-v1-1-0.tar.bz2": {"name": "grch37-gaps-ucsc-v1", "version": "1", "build_number": 0, "md5": "xyz"}}}
+    checksums = {"GSE123": {"GSE123.txt": "123abc"}}
+    server = MetadataServer({
+        "/genome_metadata/build_to_species.json": json.dumps({"hg19": "Homo_sapiens"}).encode("utf-8"),
+        "/genome_metadata/species_to_build.json": json.dumps({"Homo_sapiens": ["hg19"]}).encode("utf-8"),
+        "/genome_metadata/ggd_channels.json": json.dumps({"channels": ["genomics"]}).encode("utf-8"),
+        "/channeldata/genomics/channeldata.json": json.dumps(channeldata).encode("utf-8"),
+        "/ggd-genomics/noarch/repodata.json": json.dumps(repodata).encode("utf-8"),
+        "/ggd-genomics/noarch/hg19-gaps-ucsc-v1-1-1.tar.bz2": pkg_tar,
+        "/ggd-genomics/noarch/meta-recipe-geo-accession-geo-v1-1-0.tar.bz2": pkg_tar,
+        "/meta-recipes/meta-recipe-geo-accession-geo-v1/checksums.json": json.dumps(checksums).encode("utf-8"),
+    })
+
+    def use_local_repo(repo_dir):
+        monkeypatch.setattr(utils, "LOCAL_REPO_DIR", repo_dir)
+        monkeypatch.setattr(utils, "GENOME_METADATA_DIR", os.path.join(repo_dir, "genome_metadata"))
+        monkeypatch.setattr(utils, "CHANNEL_DATA_DIR", os.path.join(repo_dir, "channeldata"))
+        monkeypatch.setattr(utils, "REPODATA_CACHE_DIR", os.path.join(repo_dir, "repodata"))
+        monkeypatch.setattr(utils, "META_RECIPE_CACHE_DIR", os.path.join(repo_dir, "meta-recipes"))
+        monkeypatch.setattr(utils, "_CHANNELDATA", {})
+
+    online_dir = tempfile.mkdtemp()
+    offline_dir = tempfile.mkdtemp()
+    use_local_repo(online_dir)
+    monkeypatch.setattr(utils, "GENOME_METADATA_FILE_URL", server.url + "/genome_metadata/{name}")
+    monkeypatch.setattr(utils, "CHANNELDATA_URL", server.url + "/channeldata/{channel}/channeldata.json")
+    monkeypatch.setattr(utils, "REPODATA_URL", server.url + "/{channel}/{subdir}/repodata.json")
+    monkeypatch.setattr(utils, "CONDA_PKG_URL", server.url + "/{channel}/{subdir}/{tar_file}")
+    monkeypatch.setattr(utils, "GGD_META_RECIPE_URL", server.url + "/meta-recipes/{meta_recipe_name}/{file_name}")
+    monkeypatch.setattr(utils, "check_for_internet_connection", lambda t=5: True)
+
+    try:
+        ## Export
+        bundle_path = os.path.join(online_dir, "ggd-bundle.tar.gz")
+        repodata_loads = []
+        load_repodata_packages = utils.load_repodata_packages
+        monkeypatch.setattr(utils, "load_repodata_packages", lambda path: repodata_loads.append(path) or load_repodata_packages(path))
+        manifest = bundle.export_bundle(bundle_path, ["genomics"], ["hg19-gaps-ucsc-v1", "meta-recipe-geo-accession-geo-v1"])
+        assert [pkg["tar_file"] for pkg in manifest["packages"]] == ["hg19-gaps-ucsc-v1-1-1.tar.bz2", "meta-recipe-geo-accession-geo-v1-1-0.tar.bz2"]
+        ## The repodata is read once for the name index and once for the records of all the packages
+        assert len(repodata_loads) == 2
+        with tarfile.open(bundle_path) as tar:
+            names = tar.getnames()
+            repodata_slice = json.loads(tar.extractfile("repodata/ggd-genomics/noarch/repodata.json").read().decode("utf-8"))
+        assert sorted(repodata_slice["packages"]) == ["hg19-gaps-ucsc-v1-1-1.tar.bz2", "meta-recipe-geo-accession-geo-v1-1-0.tar.bz2"]
+        assert repodata_slice["packages"]["hg19-gaps-ucsc-v1-1-1.tar.bz2"] == repodata["packages"]["hg19-gaps-ucsc-v1-1-1.tar.bz2"]
+        assert sorted(names) == sorted(["genome_metadata/build_to_species.json", "genome_metadata/species_to_build.json", "genome_metadata/ggd_channels.json",
+                                        "channeldata/genomics/channeldata.json", "repodata/ggd-genomics/noarch/repodata.json",
+                                        "meta-recipes/meta-recipe-geo-accession-geo-v1/checksums.json",
+                                        "pkgs/hg19-gaps-ucsc-v1-1-1.tar.bz2", "pkgs/meta-recipe-geo-accession-geo-v1-1-0.tar.bz2", "manifest.json"])
+
+        ## A package that is not in the channel exits, and no partial bundle is left
+        with pytest.raises(SystemExit):
+            bundle.export_bundle(os.path.join(online_dir, "bad.tar.gz"), ["genomics"], ["not-a-package"])
+        assert not os.path.exists(os.path.join(online_dir, "bad.tar.gz"))
+
+        ## A package file that does not match the repodata md5sum is an error
+        server.files["/ggd-genomics/noarch/hg19-gaps-ucsc-v1-1-1.tar.bz2"] = b"corrupt"
+        with pytest.raises(ValueError):
+            bundle.export_bundle(os.path.join(online_dir, "bad.tar.gz"), ["genomics"], ["hg19-gaps-ucsc-v1"])
+        assert not os.path.exists(os.path.join(online_dir, "bad.tar.gz"))
+
+        ## Import without an internet connection
+        use_local_repo(offline_dir)
+        monkeypatch.setattr(utils, "check_for_internet_connection", lambda t=5: False)
+        monkeypatch.setenv("GGD_OFFLINE", "1")
+        pkgs_dir = os.path.join(offline_dir, "pkgs")
+        del server.requests[:]
+
+        ## The host already has a cached repodata with other packages
+        cached_repodata = {"packages": {"other-pkg-1-0.tar.bz2": {"name": "other-pkg", "version": "1", "build_number": 0, "md5": "abc"}}}
+        with utils.atomic_write(os.path.join(utils.repodata_cache_dir("ggd-genomics", "noarch"), "repodata.json")) as out:
+            json.dump(cached_repodata, out)
+
+        assert bundle.import_bundle(bundle_path, pkgs_dir)["packages"] == manifest["packages"]
+        assert os.path.exists(os.path.join(pkgs_dir, "hg19-gaps-ucsc-v1-1-1.tar.bz2"))
+        assert utils.get_file_md5sum(os.path.join(pkgs_dir, "hg19-gaps-ucsc-v1-1-1.tar.bz2")) == md5
+        assert os.path.exists(os.path.join(offline_dir, "channeldata", "genomics", "catalog.sqlite"))
+        assert utils.get_ggd_channels() == ["genomics"]
+        assert utils.load_channeldata("genomics").get_package("hg19-gaps-ucsc-v1")["version"] == "1"
+        assert utils.get_repodata_entries("ggd-genomics", "hg19-gaps-ucsc-v1") == [["1", 1, "noarch", md5, "hg19-gaps-ucsc-v1-1-1.tar.bz2"]]
+        assert utils.get_repodata_entries("ggd-genomics", "grch37-gaps-ucsc-v1") == []
+        ## The bundle records are added to the cached repodata, not replacing it
+        assert utils.get_repodata_entries("ggd-genomics", "other-pkg") == [["1", 0, "noarch", "abc", "other-pkg-1-0.tar.bz2"]]
+        assert utils.get_meta_recipe_checksum("meta-recipe-geo-accession-geo-v1", "GSE123") == {"GSE123.txt": "123abc"}
+        assert server.requests == []
+
+        ## 'ggd bundle import' adds the package files to the conda package cache that 'conda install --offline' reads
+        cache_dir = os.path.join(offline_dir, "conda-pkgs")
+        monkeypatch.setattr(utils, "conda_pkgs_dir", lambda: cache_dir)
+        assert bundle.bundle_import((), Namespace(bundle=bundle_path, pkgs_dir=None)) == True
+        assert os.path.exists(os.path.join(cache_dir, "hg19-gaps-ucsc-v1-1-1.tar.bz2"))
+        assert utils.conda_pkg_path("hg19-gaps-ucsc-v1-1-1.tar.bz2", os.path.join(offline_dir, "env")) == os.path.join(cache_dir, "hg19-gaps-ucsc-v1-1-1.tar.bz2")
+
+        ## An offline meta-recipe install uses the package file in the conda package cache
+        assert utils.get_meta_recipe_pkg("meta-recipe-geo-accession-geo-v1", channeldata, "genomics", os.path.join(offline_dir, "env")) == (
+            cache_dir, "meta-recipe-geo-accession-geo-v1-1-0.tar.bz2", os.path.join(cache_dir, "meta-recipe-geo-accession-geo-v1-1-0.tar.bz2"))
+
+        ## The imported metadata files have no ETag, so they are fully downloaded once online
+        with open(os.path.join(offline_dir, "channeldata", "genomics", "channeldata.json" + utils.VALIDATORS_SUFFIX)) as v:
+            validators = json.load(v)
+        assert validators.get("etag") is None
+        assert validators["sha256"] == hashlib.sha256(json.dumps(channeldata).encode("utf-8")).hexdigest()
+
+        ## Files outside of the bundle dirs are skipped
+        bad_bundle = os.path.join(offline_dir, "bad.tar.gz")
+        with tarfile.open(bad_bundle, "w:gz") as tar:
+            bundle.add_bytes_to_tar(tar, "manifest.json", json.dumps({"bundle_version": 1, "channels": [], "packages": []}).encode("utf-8"))
+            bundle.add_bytes_to_tar(tar, "../escape.json", b"{}")
+            bundle.add_bytes_to_tar(tar, "other/file.json", b"{}")
+        bundle.import_bundle(bad_bundle, pkgs_dir)
+        assert not os.path.exists(os.path.join(os.path.dirname(offline_dir), "escape.json"))
+        assert not os.path.exists(os.path.join(offline_dir, "other"))
+
+        ## A file without a manifest is not a bundle
+        with tarfile.open(bad_bundle, "w:gz") as tar:
+            bundle.add_bytes_to_tar(tar, "genome_metadata/ggd_channels.json", b"{}")
+        with pytest.raises(SystemExit):
+            bundle.import_bundle(bad_bundle, pkgs_dir)
+
+    finally:
+        server.stop()
+        shutil.rmtree(online_dir)
+        shutil.rmtree(offline_dir)
+
+
+def test_shared_cache_atomic_write_and_lock(monkeypatch):
+    """
+    Test that cache files are written atomically, that a group-shared cache dir keeps its files group writable, and that concurrent refreshes only download once
+    """
+    pytest_enable_socket()
+
+    import stat
+    import threading
+
+    tmp_dir = tempfile.mkdtemp()
+    monkeypatch.setattr(utils, "LOCAL_REPO_DIR", tmp_dir)
+
+    try:
+        ## A failed write leaves the old file and no temporary files
+        file_path = os.path.join(tmp_dir, "sub", "file.json")
+        with utils.atomic_write(file_path) as f:
+            json.dump({"version": 1}, f)
+        with pytest.raises(ValueError):
+            with utils.atomic_write(file_path) as f:
+                f.write("partial")
+                raise ValueError("failed")
+        assert json.load(open(file_path)) == {"version": 1}
+        assert os.listdir(os.path.join(tmp_dir, "sub")) == ["file.json"]
+        assert stat.S_IMODE(os.stat(file_path).st_mode) == 0o644
+
+        ## A group-shared cache (setgid on the cache dir) keeps new dirs and files group writable
+        assert utils.shared_cache() == False
+        os.chmod(tmp_dir, 0o2775)
+        assert utils.shared_cache() == True
+        new_dir = utils.make_cache_dir(os.path.join(tmp_dir, "repodata", "ggd-genomics", "noarch"))
+        for dir_path in [new_dir, os.path.dirname(new_dir)]:
+            assert stat.S_IMODE(os.stat(dir_path).st_mode) == 0o2775
+        with utils.atomic_write(os.path.join(new_dir, "file.json")) as f:
+            json.dump({}, f)
+        assert stat.S_IMODE(os.stat(os.path.join(new_dir, "file.json")).st_mode) == 0o664
+
+        ## The lock is held across processes
+        child = sp.Popen([sys.executable, "-c", "import sys, time; from ggd import utils; utils.LOCAL_REPO_DIR = sys.argv[1]\n"
+                                                 "with utils.cache_lock(utils.METADATA_LOCK):\n print('locked'); sys.stdout.flush(); time.sleep(1)", tmp_dir],
+                         stdout=sp.PIPE, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+        assert child.stdout.readline().strip() == b"locked"
+        start = time.time()
+        with utils.cache_lock(utils.METADATA_LOCK):
+            assert time.time() - start > 0.5
+        child.wait()
+
+        ## Processes (threads here) that wait on the lock use the file downloaded by the first one
+        channeldata = {"channeldata_version": 1, "packages": {"hg19-gaps-ucsc-v1": {"version": "1"}}}
+        server = MetadataServer({"/channeldata/genomics/channeldata.json": json.dumps(channeldata).encode("utf-8")})
+        monkeypatch.setattr(utils, "CHANNEL_DATA_DIR", os.path.join(tmp_dir, "channeldata"))
+        monkeypatch.setattr(utils, "GENOME_METADATA_DIR", os.path.join(tmp_dir, "genome_metadata"))
+        monkeypatch.setattr(utils, "CHANNELDATA_URL", server.url + "/channeldata/{channel}/channeldata.json")
+        monkeypatch.setattr(utils, "check_for_internet_connection", lambda t=5: True)
+        monkeypatch.setenv("GGD_METADATA_TTL", "3600")
+        monkeypatch.setenv("GGD_METADATA_MAX_STALE", "3600")
+        with utils.atomic_write(os.path.join(tmp_dir, "genome_metadata", "ggd_channels.json")) as f:
+            json.dump({"channels": ["genomics"]}, f)
+
+        try:
+            threads = [threading.Thread(target=utils.get_channel_data, args=("genomics",)) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert server.requests == [("/channeldata/genomics/channeldata.json", 200)]
+            assert json.load(open(os.path.join(tmp_dir, "channeldata", "genomics", "channeldata.json"))) == channeldata
+        finally:
+            server.stop()
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_conda_context(monkeypatch):
+    """
+    Test that the conda context is read from conda once, reused from the cache file by other processes, and rebuilt when the conda environments change
+    """
+    pytest_enable_socket()
+
+    from conda.core import envs_manager
+
+    tmp_dir = tempfile.mkdtemp()
+    monkeypatch.setenv("HOME", tmp_dir)
+    monkeypatch.delenv("GGD_CONDA_CONTEXT_CACHE", raising=False)
+    monkeypatch.setattr(utils, "CONDA_CONTEXT_CACHE", os.path.join(tmp_dir, "conda_context.json"))
+    monkeypatch.setattr(utils, "_CONDA_CONTEXT", {})
+
+    try:
+        ## Read from conda and written to the cache file
+        conda_context = utils.get_conda_context()
+        root = conda_context.root_prefix.rstrip("/")
+        assert root in conda_context.prefixes
+        assert conda_context.subdir == utils.get_conda_context().subdir
+        assert json.load(open(utils.CONDA_CONTEXT_CACHE))["prefixes"] == conda_context.prefixes
+
+        ## Look up by name or path
+        assert utils.conda_root() == conda_context.root_prefix
+        assert utils.get_conda_prefix_path(root) == root
+        assert utils.get_conda_prefix_path(root + "/") == root
+        assert utils.get_conda_prefix_path(os.path.basename(root)) == root
+        assert utils.get_conda_env(root) == (os.path.basename(root), root)
+        with pytest.raises(utils.CondaEnvironmentNotFound):
+            utils.get_conda_prefix_path("ggd-not-an-env")
+
+        ## Conda is not asked again in this process or in a new process
+        def no_conda():
+            raise AssertionError("conda was asked for the known prefixes")
+
+        monkeypatch.setattr(envs_manager, "list_all_known_prefixes", no_conda)
+        assert utils.get_conda_context() is conda_context
+        monkeypatch.setattr(utils, "_CONDA_CONTEXT", {})
+        assert utils.get_conda_context().prefixes == conda_context.prefixes
+
+        ## The cache file is per user. A file of another user (in a group-shared cache) is not used
+        assert oct(os.stat(utils.CONDA_CONTEXT_CACHE).st_mode & 0o777) == oct(0o644)
+        if os.getuid() == 0:
+            os.chown(utils.CONDA_CONTEXT_CACHE, 12345, -1)
+            monkeypatch.setattr(utils, "_CONDA_CONTEXT", {})
+            with pytest.raises(AssertionError):
+                utils.get_conda_context()
+            os.chown(utils.CONDA_CONTEXT_CACHE, 0, -1)
+
+        ## A new conda environment changes the fingerprint and the context is rebuilt
+        new_env = os.path.join(tmp_dir, "envs", "new-env")
+        os.makedirs(new_env)
+        os.makedirs(os.path.join(tmp_dir, ".conda"))
+        with open(os.path.join(tmp_dir, ".conda", "environments.txt"), "w") as env_file:
+            env_file.write(new_env + "\n")
+        monkeypatch.setattr(envs_manager, "list_all_known_prefixes", lambda: [root, new_env])
+        assert utils.get_conda_prefix_path("new-env") == new_env
+        assert utils.get_conda_env(new_env) == ("new-env", new_env)
+        assert utils.get_base_env(new_env) == new_env
+
+        ## The cache file can be turned off
+        monkeypatch.setattr(utils, "_CONDA_CONTEXT", {})
+        os.remove(utils.CONDA_CONTEXT_CACHE)
+        monkeypatch.setenv("GGD_CONDA_CONTEXT_CACHE", "0")
+        assert utils.get_conda_prefix_path("new-env") == new_env
+        assert not os.path.exists(utils.CONDA_CONTEXT_CACHE)
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_lazy_sub_commands(monkeypatch):
+    """
+    Test that ggd only imports the sub-command being run, and that metadata based choices are checked when the option is parsed
+    """
+    import importlib
+    from ggd import __main__ as ggd_main
+
+    ## The help message of each sub-command matches its full parser
+    for name, module, add_function, help_message in ggd_main.SUB_COMMANDS:
+        sub = ArgumentParser().add_subparsers()
+        getattr(importlib.import_module("ggd." + module), add_function)(sub)
+        assert [(action.dest, action.help) for action in sub._choices_actions] == [(name, help_message)]
+
+    assert ggd_main.selected_sub_command(["--network-report", "install", "hg19-gaps-ucsc-v1"]) == "install"
+    assert ggd_main.selected_sub_command(["-v"]) == None
+    assert ggd_main.selected_sub_command(["not-a-command"]) == None
+
+    ## Starting ggd does not import the other sub-commands, requests, yaml, or conda
+    code = ("import sys\n"
+            "from ggd.__main__ import main\n"
+            "try:\n main(['--version'])\n"
+            "except SystemExit:\n pass\n"
+            "print(' '.join(sorted(m for m in sys.modules if m.split('.')[0] in ('ggd', 'requests', 'yaml', 'conda', 'fuzzywuzzy'))))")
+    output = sp.check_output([sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)), stderr=sp.STDOUT)
+    assert output.decode().strip().split("\n")[-1].split() == ["ggd", "ggd.__init__", "ggd.__main__"]
+
+    ## Choices are checked when the option is parsed
+    calls = []
+    def get_choices():
+        calls.append(1)
+        return ["genomics", "proteomics"]
+
+    parser = ArgumentParser()
+    parser.add_argument("-c", "--channel", default="genomics", type=utils.lazy_choice(get_choices, default="genomics"))
+    assert calls == []
+    ## The default is not checked, so the choices are not loaded
+    assert parser.parse_args([]).channel == "genomics"
+    assert calls == []
+    assert parser.parse_args(["-c", "proteomics"]).channel == "proteomics"
+    assert calls == [1]
+    with pytest.raises(SystemExit):
+        parser.parse_args(["-c", "not-a-channel"])
+
+    ## The help text lists the choices
+    ggd_main.show_lazy_choices(parser)
+    assert "{genomics,proteomics}" in parser.format_help()
+
+    ## 'ggd <sub-command> -h' lists the choices of the sub-command options
+    from ggd import list_files
+
+    monkeypatch.setattr(list_files, "channel_choices", get_choices)
+    monkeypatch.setattr(list_files, "build_choices", lambda: ["hg19", "hg38"])
+    monkeypatch.setattr(list_files, "species_choices", lambda: ["Homo_sapiens"])
+    temp_stdout = StringIO()
+    with redirect_stdout(temp_stdout), pytest.raises(SystemExit):
+        ggd_main.run_command(["get-files", "-h"])
+    assert "-c {genomics,proteomics}" in temp_stdout.getvalue()
+    assert "-g {hg19,hg38}" in temp_stdout.getvalue()
+
+
+def test_serve_daemon(monkeypatch, capsys):
+    """
+    Test that ggd commands are answered by a running ggd serve daemon, that the daemon reloads changed channel metadata, and that it stops cleanly
+    """
+    pytest_enable_socket()
+
+    from ggd import serve
+
+    repo_dir = tempfile.mkdtemp()
+    socket_path = os.path.join(repo_dir, "ggd.sock")
+    channeldata = {"channeldata_version": 1, "packages": {"hg19-gaps-ucsc-v1": {"version": "1", "keywords": ["gaps", "region"],
+                                                                                "identifiers": {"genome-build": "hg19", "species": "Homo_sapiens"},
+                                                                                "tags": {"ggd-channel": "genomics"}}}}
+    os.makedirs(os.path.join(repo_dir, "genome_metadata"))
+    os.makedirs(os.path.join(repo_dir, "channeldata", "genomics"))
+    for file_name, content in [("genome_metadata/species_to_build.json", {"Homo_sapiens": ["hg19", "hg38"]}),
+                               ("genome_metadata/build_to_species.json", {"hg19": "Homo_sapiens", "hg38": "Homo_sapiens"}),
+                               ("genome_metadata/ggd_channels.json", {"channels": ["genomics"]}),
+                               ("channeldata/genomics/channeldata.json", channeldata)]:
+        with open(os.path.join(repo_dir, file_name), "w") as out:
+            json.dump(content, out)
+
+    ## The daemon and the client have the same ggd settings
+    monkeypatch.setenv("GGD_LOCAL", repo_dir)
+    monkeypatch.setenv("GGD_OFFLINE", "1")
+    monkeypatch.delenv("GGD_SERVE", raising=False)
+    search_args = ["search", "gaps", "--format", "jsonl", "--fields", "name,genome-build"]
+
+    ## No daemon
+    assert serve.run_in_daemon(search_args, socket_path) == None
+    assert serve.daemon_request({"status": True}, socket_path) == None
+
+    daemon = sp.Popen([sys.executable, "-m", "ggd", "serve", "--workers", "1", "--socket", socket_path],
+                      env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)), stdout=sp.PIPE, stderr=sp.STDOUT)
+    try:
+        for i in range(300):
+            if serve.daemon_request({"status": True}, socket_path) != None:
+                break
+            time.sleep(0.1)
+        assert serve.daemon_request({"status": True}, socket_path) == {"pid": daemon.pid, "stopping": False}
+
+        ## Only the current user can use the socket
+        assert oct(os.stat(socket_path).st_mode & 0o777) == oct(0o600)
+
+        ## Commands are answered by the daemon, with the same output and exit codes as a ggd process
+        capsys.readouterr()
+        assert serve.run_in_daemon(search_args, socket_path) == 0
+        assert [json.loads(x) for x in capsys.readouterr().out.strip().split("\n")] == [{"name": "hg19-gaps-ucsc-v1", "genome-build": "hg19"}]
+
+        assert serve.run_in_daemon(["search", "gaps", "--fields", "bad-field", "--format", "json"], socket_path) == 1
+        assert "Unknown output field(s): bad-field" in capsys.readouterr().err
+
+        ## The daemon reloads the channel metadata when the local file changes
+        channeldata["packages"]["hg38-gaps-ucsc-v1"] = {"version": "1", "keywords": ["gaps", "region"],
+                                                        "identifiers": {"genome-build": "hg38", "species": "Homo_sapiens"},
+                                                        "tags": {"ggd-channel": "genomics"}}
+        time.sleep(0.01)
+        with open(os.path.join(repo_dir, "channeldata", "genomics", "channeldata.json"), "w") as out:
+            json.dump(channeldata, out)
+        assert serve.run_in_daemon(search_args, socket_path) == 0
+        assert sorted(json.loads(x)["name"] for x in capsys.readouterr().out.strip().split("\n")) == ["hg19-gaps-ucsc-v1", "hg38-gaps-ucsc-v1"]
+
+        ## Commands are run in this process if the daemon is turned off or has different settings
+        monkeypatch.setenv("GGD_SERVE", "0")
+        assert serve.run_in_daemon(search_args, socket_path) == None
+        monkeypatch.delenv("GGD_SERVE")
+        monkeypatch.setenv("GGD_METADATA_TTL", "10")
+        assert serve.run_in_daemon(search_args, socket_path) == None
+        monkeypatch.delenv("GGD_METADATA_TTL")
+
+        ## Stop the daemon
+        assert serve.daemon_request({"status": True, "stop": True}, socket_path) == {"pid": daemon.pid, "stopping": True}
+        assert daemon.wait(timeout=30) == 0
+        assert os.path.exists(socket_path) == False
+        assert serve.run_in_daemon(search_args, socket_path) == None
+
+        ## A socket of another user (for example in a shared GGD_LOCAL) is never used or removed
+        import socket
+
+        other_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        other_socket.bind(socket_path)
+        other_socket.listen(1)
+        assert serve.owned_by_user(socket_path) == True
+        if os.getuid() == 0:
+            os.chown(socket_path, 12345, -1)
+            assert serve.owned_by_user(socket_path) == False
+            assert serve.run_in_daemon(search_args, socket_path) == None
+            assert serve.daemon_request({"status": True}, socket_path) == None
+            with pytest.raises(SystemExit) as pytest_wrapped_e:
+                serve.serve((), Namespace(socket=socket_path, status=False, stop=False, channel=[], workers=1))
+            assert "is not a socket owned by the current user" in str(pytest_wrapped_e.value)
+            assert os.path.exists(socket_path) == True
+        other_socket.close()
+
+        ## A file that is not a socket is not used
+        os.remove(socket_path)
+        open(socket_path, "w").close()
+        assert serve.owned_by_user(socket_path) == False
+        assert serve.run_in_daemon(search_args, socket_path) == None
+
+    finally:
+        if daemon.poll() is None:
+            daemon.kill()
+        shutil.rmtree(repo_dir)
+
+
+def test_metadata_state_and_background_refresh(monkeypatch):
+    """
+    Test the stale-while-revalidate state of local metadata files, and that background refreshes are not started offline or twice
+    """
+    pytest_enable_socket()
+
+    tmp_dir = tempfile.mkdtemp()
+    file_path = os.path.join(tmp_dir, "channeldata.json")
+    monkeypatch.setenv("GGD_METADATA_TTL", "100")
+    monkeypatch.setenv("GGD_METADATA_MAX_STALE", "1000")
+
+    try:
+        ## A missing file is expired
+        assert utils.metadata_state([file_path]) == utils.METADATA_EXPIRED
+
+        ## A new file is fresh
+        with open(file_path, "w") as f:
+            f.write("{}")
+        assert utils.metadata_state([file_path]) == utils.METADATA_FRESH
+
+        ## The age comes from the validators file if there is one
+        with open(file_path + utils.VALIDATORS_SUFFIX, "w") as f:
+            f.write("{}")
+        os.utime(file_path, (time.time() - 5000, time.time() - 5000))
+        assert utils.metadata_state([file_path]) == utils.METADATA_FRESH
+
+        ## Stale and expired files
+        os.utime(file_path + utils.VALIDATORS_SUFFIX, (time.time() - 500, time.time() - 500))
+        assert utils.metadata_state([file_path]) == utils.METADATA_STALE
+        os.utime(file_path + utils.VALIDATORS_SUFFIX, (time.time() - 5000, time.time() - 5000))
+        assert utils.metadata_state([file_path]) == utils.METADATA_EXPIRED
+
+        ## The worst state of all files is used
+        other_path = os.path.join(tmp_dir, "other.json")
+        with open(other_path, "w") as f:
+            f.write("{}")
+        os.utime(file_path + utils.VALIDATORS_SUFFIX, (time.time() - 500, time.time() - 500))
+        assert utils.metadata_state([other_path, file_path]) == utils.METADATA_STALE
+
+        ## The legacy (test) settings always refresh
+        monkeypatch.setenv("GGD_METADATA_TTL", "0")
+        monkeypatch.setenv("GGD_METADATA_MAX_STALE", "0")
+        assert utils.metadata_state([other_path]) == utils.METADATA_EXPIRED
+
+        ## No background refresh offline, or while another background refresh is running
+        monkeypatch.setattr(utils, "LOCAL_REPO_DIR", tmp_dir)
+        monkeypatch.setattr(utils, "REFRESH_MARKER", os.path.join(tmp_dir, "refresh.running"))
+        monkeypatch.setenv("GGD_OFFLINE", "1")
+        assert utils.start_background_refresh() == False
+        assert os.path.exists(utils.REFRESH_MARKER) == False
+        monkeypatch.delenv("GGD_OFFLINE")
+        with open(utils.REFRESH_MARKER, "w") as m:
+            m.write("1")
+        assert utils.start_background_refresh() == False
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+
+def test_thread_pool_without_concurrent_futures(monkeypatch):
+    """
+    Test that tasks are run one at a time when concurrent.futures is not available (Python 2 without the futures backport)
+    """
+    pytest_enable_socket()
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with utils.thread_pool(2) as pool:
+        assert isinstance(pool, ThreadPoolExecutor)
+
+    monkeypatch.setitem(sys.modules, "concurrent.futures", None)
+    with utils.thread_pool(2) as pool:
+        assert isinstance(pool, utils.SerialExecutor)
+        assert pool.submit(lambda x, y=1: x + y, 1, y=2).result() == 3
+        assert list(pool.map(lambda x: x * 2, [1, 2, 3])) == [2, 4, 6]
+        task = pool.submit(int, "not a number")
+        with pytest.raises(ValueError):
+            task.result()
+
+    ## Every genome metadata file is still updated
+    updated = []
+    monkeypatch.setattr(utils, "update_genome_metadata_file", lambda file_name: updated.append(file_name))
+    monkeypatch.setattr(utils, "GENOME_METADATA_DIR", tempfile.mkdtemp())
+    assert utils.update_genome_metadata_files() == True
+    assert updated == list(utils.GENOME_METADATA_FILES)
+    shutil.rmtree(utils.GENOME_METADATA_DIR)
+
+
+def test_update_channels_data(monkeypatch):
+    """
+    Test that the expired channels of several ggd channels are downloaded at the same time under one metadata lock
+    """
+    pytest_enable_socket()
+
+    import threading
+
+    tmp_dir = tempfile.mkdtemp()
+    monkeypatch.setattr(utils, "LOCAL_REPO_DIR", tmp_dir)
+    monkeypatch.setattr(utils, "CHANNEL_DATA_DIR", os.path.join(tmp_dir, "channeldata"))
+    monkeypatch.setattr(utils, "check_for_internet_connection", lambda *args, **kwargs: True)
+    monkeypatch.setenv("GGD_METADATA_TTL", "100")
+    monkeypatch.setenv("GGD_METADATA_MAX_STALE", "1000")
+
+    downloads = []
+    running = set()
+    overlap = []
+    lock = threading.Lock()
+
+    def fake_update(channel, session=None):
+        with lock:
+            running.add(channel)
+        time.sleep(0.3)
+        with lock:
+            overlap.append(len(running))
+            running.discard(channel)
+            downloads.append(channel)
+        os.makedirs(os.path.join(tmp_dir, "channeldata", channel))
+        with open(os.path.join(tmp_dir, "channeldata", channel, "channeldata.json"), "w") as f:
+            f.write("{}")
+        with open(os.path.join(tmp_dir, "channeldata", channel, "channeldata.json" + utils.VALIDATORS_SUFFIX), "w") as f:
+            f.write("{}")
+
+    monkeypatch.setattr(utils, "update_channel_data_files", fake_update)
+
+    try:
+        channels = ["genomics", "dev", "proteomics"]
+        paths = utils.update_channels_data(channels)
+        assert paths == [os.path.join(tmp_dir, "channeldata", x, "channeldata.json") for x in channels]
+        assert sorted(downloads) == sorted(channels)
+        ## The downloads ran at the same time
+        assert max(overlap) > 1
+
+        ## Up to date channels are not downloaded again
+        assert utils.update_channels_data(channels) == paths
+        assert utils.get_channel_data("dev") == paths[1]
+        assert len(downloads) == 3
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
 def test_get_run_deps_from_tar():
     """
     Test the get_run_deps_from_tar function correctly returns ggd recipes that are listed as run dependencies 
@@ -965,6 +2047,55 @@ def test_get_conda_env():
     assert os.path.exists(temp_env) == False
 
 
+def test_installed_data_packages(monkeypatch):
+    """
+    Test that installed_data_packages finds every installed data package with one scan of the ggd data dir
+    """
+    pytest_enable_socket()
+
+    tmp_prefix = tempfile.mkdtemp()
+
+    ## No ggd data dir
+    assert utils.installed_data_packages(tmp_prefix) == {}
+
+    ## Installed data packages
+    hg19_gaps = os.path.join(tmp_prefix, "share", "ggd", "Homo_sapiens", "hg19", "hg19-gaps-ucsc-v1", "1")
+    grch38_gaps = os.path.join(tmp_prefix, "share", "ggd", "Homo_sapiens", "GRCh38", "grch38-gaps-ucsc-v1", "1")
+    mm10_gaps = os.path.join(tmp_prefix, "share", "ggd", "Mus_musculus", "mm10", "mm10-gaps-ucsc-v1", "2")
+    for path in [hg19_gaps, grch38_gaps, mm10_gaps]:
+        os.makedirs(path)
+
+    ## A data package without a version dir and a stray file are not installed packages
+    os.makedirs(os.path.join(tmp_prefix, "share", "ggd", "Homo_sapiens", "hg38", "hg38-gaps-ucsc-v1"))
+    open(os.path.join(tmp_prefix, "share", "ggd", "Homo_sapiens", "hg19", "hg19-gaps-ucsc-v1", "file.txt"), "w").close()
+
+    installed = utils.installed_data_packages(tmp_prefix)
+    assert installed == {
+        ("Homo_sapiens", "hg19", "hg19-gaps-ucsc-v1", "1"): hg19_gaps,
+        ("Homo_sapiens", "GRCh38", "grch38-gaps-ucsc-v1", "1"): grch38_gaps,
+        ("Mus_musculus", "mm10", "mm10-gaps-ucsc-v1", "2"): mm10_gaps,
+    }
+
+    ## The same packages are found without os.scandir (Python 2)
+    monkeypatch.delattr(os, "scandir")
+    assert utils.installed_data_packages(tmp_prefix) == installed
+    monkeypatch.undo()
+
+    ## The scan is reused to check packages
+    from ggd import search
+
+    ggd_jdict = {"packages": {
+        "hg19-gaps-ucsc-v1": {"version": "1", "identifiers": {"species": "Homo_sapiens", "genome-build": "hg19"}},
+        "mm10-gaps-ucsc-v1": {"version": "1", "identifiers": {"species": "Mus_musculus", "genome-build": "mm10"}},
+    }}
+    assert search.check_installed("hg19-gaps-ucsc-v1", ggd_jdict, installed) == (True, hg19_gaps)
+    assert search.check_installed("mm10-gaps-ucsc-v1", ggd_jdict, installed) == (False, None)
+    assert install.check_if_installed("hg19-gaps-ucsc-v1", ggd_jdict, prefix=tmp_prefix, installed=installed) == True
+    assert install.check_if_installed("mm10-gaps-ucsc-v1", ggd_jdict, prefix=tmp_prefix) == False
+
+    shutil.rmtree(tmp_prefix)
+
+
 def test_get_conda_prefix_path():
     """
     Test that get_conda_prefix_path() returns the correct prefix path 
@@ -1266,6 +2397,128 @@ def test_get_repodata():
     assert pytest_wrapped_e.match("1") 
 
 
+def test_repodata_cache(monkeypatch):
+    """
+    Test that the repodata is cached on disk per channel and subdir, revalidated, and indexed by package name, using a local http stand-in
+    """
+    pytest_enable_socket()
+
+    noarch = {"packages": {"hg19-gaps-ucsc-v1-1-0.tar.bz2": {"name": "hg19-gaps-ucsc-v1", "version": "1", "build_number": 0, "md5": "abc"},
+                           "hg19-gaps-ucsc-v1-1-1.tar.bz2": {"name": "hg19-gaps-ucsc-v1", "version": "1", "build_number": 1, "md5": "def"}}}
+    linux = {"packages": {"samtools-1.10-0.tar.bz2": {"name": "samtools", "version": "1.10", "build_number": 0, "md5": "ghi"}}}
+    server = MetadataServer({"/ggd-genomics/noarch/repodata.json": json.dumps(noarch).encode("utf-8"),
+                             "/ggd-genomics/linux-64/repodata.json": json.dumps(linux).encode("utf-8")})
+
+    tmp_dir = tempfile.mkdtemp()
+    monkeypatch.setattr(utils, "REPODATA_CACHE_DIR", tmp_dir)
+    monkeypatch.setattr(utils, "REPODATA_URL", server.url + "/{channel}/{subdir}/repodata.json")
+    monkeypatch.setattr(utils, "check_for_internet_connection", lambda t=5: True)
+
+    try:
+        ## The repodata for each subdir is kept
+        repodata_dict, name2tar = utils.get_repodata(channels = ["ggd-genomics"], subdirs = ["noarch", "linux-64"])
+        assert sorted(repodata_dict["ggd-genomics"].keys()) == sorted(list(noarch["packages"].keys()) + list(linux["packages"].keys()))
+        assert name2tar["ggd-genomics"]["noarch"]["hg19-gaps-ucsc-v1"] == set(noarch["packages"].keys())
+        assert name2tar["ggd-genomics"]["linux-64"]["samtools"] == set(["samtools-1.10-0.tar.bz2"])
+        assert os.path.exists(os.path.join(tmp_dir, "ggd-genomics", "noarch", "repodata.json"))
+        assert os.path.exists(os.path.join(tmp_dir, "ggd-genomics", "noarch", utils.REPODATA_INDEX_NAME))
+
+        ## Lookups use the index and the repodata is only revalidated
+        del server.requests[:]
+        entries = utils.get_repodata_entries("ggd-genomics", "hg19-gaps-ucsc-v1")
+        assert sorted(entries) == [["1", 0, "noarch", "abc", "hg19-gaps-ucsc-v1-1-0.tar.bz2"], ["1", 1, "noarch", "def", "hg19-gaps-ucsc-v1-1-1.tar.bz2"]]
+        assert server.requests == [("/ggd-genomics/noarch/repodata.json", 304)]
+        assert utils.get_repodata_entries("ggd-genomics", "samtools") == []
+        assert utils.get_repodata_entries("ggd-genomics", "samtools", subdirs = ["noarch", "linux-64"]) == [["1.10", 0, "linux-64", "ghi", "samtools-1.10-0.tar.bz2"]]
+
+        ## A changed repodata file rebuilds the index
+        noarch["packages"]["hg19-gaps-ucsc-v1-1-2.tar.bz2"] = {"name": "hg19-gaps-ucsc-v1", "version": "1", "build_number": 2, "md5": "jkl"}
+        server.files["/ggd-genomics/noarch/repodata.json"] = json.dumps(noarch).encode("utf-8")
+        assert len(utils.get_repodata_entries("ggd-genomics", "hg19-gaps-ucsc-v1")) == 3
+
+        ## The cached copy is used offline
+        monkeypatch.setattr(utils, "check_for_internet_connection", lambda t=5: False)
+        del server.requests[:]
+        assert len(utils.get_repodata_entries("ggd-genomics", "hg19-gaps-ucsc-v1")) == 3
+        assert server.requests == []
+
+        ## A channel without any repodata exits
+        with pytest.raises(SystemExit):
+            utils.get_repodata_entries("bad-ggd-genomics", "hg19-gaps-ucsc-v1")
+
+    finally:
+        server.stop()
+        shutil.rmtree(tmp_dir)
+
+
+def test_iter_repodata_packages():
+    """
+    Test that iter_repodata_packages streams only the matching records out of a repodata.json file, using less memory than loading the full file
+    """
+    import tracemalloc
+
+    tmp_dir = tempfile.mkdtemp()
+    repodata_path = os.path.join(tmp_dir, "repodata.json")
+    repodata = {"info": {"subdir": "noarch"},
+                "packages": dict(("pkg-{}-1-{}.tar.bz2".format(i % 500, i), {"name": "pkg-{}".format(i % 500), "version": "1", "build_number": i,
+                                                                             "depends": ["gsort", "htslib", "zlib"], "md5": "{:032d}".format(i), "size": 12345.5})
+                                 for i in range(20000)),
+                "packages.conda": {"other-1-0.conda": {"name": "pkg-1", "version": "1", "build_number": 0}},
+                "removed": [],
+                "repodata_version": 1}
+    with open(repodata_path, "w") as out:
+        json.dump(repodata, out, indent=1)
+
+    try:
+        ## Only the matching records from the "packages" section are returned
+        expected = dict((tar, rec) for tar, rec in repodata["packages"].items() if rec["name"] == "pkg-1")
+        assert dict(utils.iter_repodata_packages(repodata_path, "pkg-1")) == expected
+        assert len(list(utils.iter_repodata_packages(repodata_path))) == 20000
+
+        ## Chunk boundaries anywhere in the file give the same records
+        small_path = os.path.join(tmp_dir, "small_repodata.json")
+        small = dict(repodata, packages=dict(list(repodata["packages"].items())[:600]))
+        with open(small_path, "w") as out:
+            json.dump(small, out)
+        small_expected = dict((tar, rec) for tar, rec in small["packages"].items() if rec["name"] == "pkg-1")
+        for chunk_size in [1, 7, 1000]:
+            assert dict(utils.iter_repodata_packages(small_path, "pkg-1", chunk_size=chunk_size)) == small_expected
+
+        ## The streaming scan uses less memory than loading the full file
+        tracemalloc.start()
+        with open(repodata_path) as r:
+            full = json.load(r)
+            records = [rec for rec in full["packages"].values() if rec["name"] == "pkg-1"]
+        full_peak = tracemalloc.get_traced_memory()[1]
+        del full
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        records = list(utils.iter_repodata_packages(repodata_path, "pkg-1"))
+        stream_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert len(records) == 40
+        assert stream_peak * 5 < full_peak
+
+        ## Invalid json raises a ValueError
+        for bad in ['{"packages": {"a": 1,}}', '{"packages": {"a" 1}}', '{"packages": {}} extra', '', '{"packages": {"a": tru']:
+            with open(repodata_path, "w") as out:
+                out.write(bad)
+            with pytest.raises(ValueError):
+                list(utils.iter_repodata_packages(repodata_path, chunk_size=3))
+            with pytest.raises(ValueError):
+                utils.validate_json_file(repodata_path)
+
+        ## Valid json of any type passes validation
+        for good in ['{}', '[1, 2, {"a": [3]}]', '12345', ' {"a": {"b": {"c": 1.5e10}}, "d": null} ']:
+            with open(repodata_path, "w") as out:
+                out.write(good)
+            utils.validate_json_file(repodata_path)
+
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
 def test_check_for_meta_recipes():
     """
     Method to test the check_for_meta_recipes() method correctly determines if a recipe is a meta-recipe or not